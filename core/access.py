@@ -0,0 +1,70 @@
+"""
+Row-level access for users outside the staff roles, materialized in
+``ObjectAccess``.
+
+A client's own account may see the client and every case of it; a lawyer
+may see the cases they are assigned to and those cases' clients. ``sync``
+rewrites a client's rows from those rules; the Client and Case signals call
+it when an account or assignment changes. ``visible_clients`` and
+``visible_cases`` then filter with a single semi-join on the table's
+indexes.
+"""
+from . import snapshots
+from .models import Case, Client, ObjectAccess
+
+
+def expected_rows(client_ids):
+    """``(user_id, client_id, case_id)`` rows the rules grant for ``client_ids``."""
+    rows = set()
+    for client_id, user_id in Client.objects.filter(pk__in=client_ids).values_list('pk', 'user_id'):
+        if user_id is not None:
+            rows.add((user_id, client_id, None))
+    cases = Case.objects.filter(client_id__in=client_ids).values_list('pk', 'client_id', 'client__user_id', 'lawyer_id')
+    for case_id, client_id, owner_id, lawyer_id in cases:
+        for user_id in {owner_id, lawyer_id} - {None}:
+            rows.add((user_id, client_id, case_id))
+    return rows
+
+
+def sync(client_ids):
+    """Bring the rows of ``client_ids`` (and all their cases) up to date."""
+    client_ids = {pk for pk in client_ids if pk is not None}
+    if not client_ids:
+        return
+    expected = expected_rows(client_ids)
+    existing = {
+        (user_id, client_id, case_id): pk
+        for pk, user_id, client_id, case_id in ObjectAccess.objects.filter(
+            client_id__in=client_ids,
+        ).values_list('pk', 'user_id', 'client_id', 'case_id')
+    }
+    stale = [pk for row, pk in existing.items() if row not in expected]
+    if stale:
+        ObjectAccess.objects.filter(pk__in=stale).delete()
+    ObjectAccess.objects.bulk_create(
+        [ObjectAccess(user_id=user_id, client_id=client_id, case_id=case_id)
+         for user_id, client_id, case_id in expected - existing.keys()],
+        ignore_conflicts=True,
+    )
+
+
+def case_saved(instance, created):
+    before = snapshots.before(instance) or {}
+    if created or (before.get('client_id'), before.get('lawyer_id')) != (instance.client_id, instance.lawyer_id):
+        sync({instance.client_id, before.get('client_id')})
+
+
+def client_saved(instance, created):
+    before = snapshots.before(instance) or {}
+    if created or before.get('user_id') != instance.user_id:
+        sync({instance.pk})
+
+
+def visible_clients(user, queryset):
+    """The clients in ``queryset`` that ``user`` has rows for."""
+    return queryset.filter(pk__in=ObjectAccess.objects.filter(user=user).values('client_id'))
+
+
+def visible_cases(user, queryset):
+    """The cases in ``queryset`` that ``user`` has rows for."""
+    return queryset.filter(pk__in=ObjectAccess.objects.filter(user=user, case__isnull=False).values('case_id'))
@@ -0,0 +1,78 @@
+"""
+Account activation for staff-provisioned clients.
+
+Clients created by staff (``client_create``, ``import_clients``) start with an
+unusable password. They receive a link carrying a signed token that expires
+after ``settings.PASSWORD_RESET_TIMEOUT`` and stops working once a password
+has been set, and redeem it at ``activate_account`` to choose their password.
+Issuing a token is a single HMAC, so provisioning never pays for hashing.
+
+``import_clients`` runs outside a request, so its links are built on
+``settings.SITE_URL`` (or its ``--base-url``); ``--no-activation`` skips them.
+"""
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core.mail import send_mail
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+
+class AccountActivationTokenGenerator(PasswordResetTokenGenerator):
+    key_salt = 'core.accounts.AccountActivationTokenGenerator'
+
+
+activation_token_generator = AccountActivationTokenGenerator()
+
+
+def activation_path(user):
+    return reverse('activate_account', kwargs={
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': activation_token_generator.make_token(user),
+    })
+
+
+def send_activation_email(request, user):
+    """Queue ``user``'s activation email. Returns True if one was queued."""
+    from . import jobs
+
+    if not user.email:
+        return False
+    jobs.enqueue(deliver_activation_email, priority=10, user_id=user.pk, base_url=request.build_absolute_uri('/'))
+    return True
+
+
+def queue_activation_emails(users, base_url, batch_size=None):
+    """Queue activation emails for ``users`` in bulk, e.g. after an import. Returns how many."""
+    from . import jobs
+
+    return jobs.enqueue_many(
+        deliver_activation_email,
+        ({'user_id': user.pk, 'base_url': base_url} for user in users if user.email),
+        priority=10,
+        batch_size=batch_size,
+    )
+
+
+def deliver_activation_email(user_id, base_url):
+    """Job entry point: send the activation email. Errors propagate so the job is retried."""
+    from .models import User
+
+    user = User.objects.filter(pk=user_id).first()
+    if user is None or not user.email or user.has_usable_password():
+        # Deleted, or already activated before the job ran.
+        return
+    context = {
+        'user': user,
+        'activation_url': urljoin(base_url, activation_path(user)),
+        'valid_days': settings.PASSWORD_RESET_TIMEOUT // (60 * 60 * 24),
+    }
+    send_mail(
+        'Activate your LawFirm account',
+        render_to_string('registration/activation_email.txt', context),
+        None,
+        [user.email],
+    )
@@ -3,9 +3,13 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
 from django.urls import reverse
+from django.db import transaction
 from django.db.models import Q
-from .models import User, Client, Case, Document, Visitor, Appointment
+from django.template.defaultfilters import filesizeformat
+from .models import User, PendingRegistration, Client, Case, Document, Visitor, Appointment, Notification, Job
 from django.contrib.auth.models import Group
+from . import access, availability, notifications, search, thumbnails
+from .principal import invalidate_principal
 
 # Customize the admin site
 admin.site.site_header = 'Law Firm Administration'
@@ -30,14 +34,61 @@ class UserAdmin(BaseUserAdmin):
         ('Important dates', {'fields': ('last_login', 'date_joined')}),
     )
 
+@admin.register(PendingRegistration)
+class PendingRegistrationAdmin(admin.ModelAdmin):
+    list_display = ('username', 'client_name', 'email', 'client_phone', 'date_joined')
+    list_filter = ('date_joined',)
+    search_fields = ('username', 'email', 'client_profile__name', 'client_profile__phone')
+    date_hierarchy = 'date_joined'
+    ordering = ('date_joined',)
+    list_select_related = ('client_profile',)
+    list_per_page = 200
+    actions = ['approve_selected']
+
+    def has_add_permission(self, request):
+        return False
+
+    def client_name(self, obj):
+        return obj.client_profile.name
+    client_name.short_description = 'Name'
+    client_name.admin_order_field = 'client_profile__name'
+
+    def client_phone(self, obj):
+        return obj.client_profile.phone or ''
+    client_phone.short_description = 'Phone'
+
+    @admin.action(description='Approve selected registrations', permissions=['change'])
+    def approve_selected(self, request, queryset):
+        """
+        Activate the selected accounts with one UPDATE, add them to the
+        Clients group with one bulk INSERT and queue their welcome emails.
+        """
+        with transaction.atomic():
+            user_ids = list(queryset.select_for_update().values_list('pk', flat=True))
+            if not user_ids:
+                return
+            User.objects.filter(pk__in=user_ids).update(is_active=True)
+
+            clients_group, created = Group.objects.get_or_create(name='Clients')
+            Membership = User.groups.through
+            Membership.objects.bulk_create(
+                [Membership(user_id=user_id, group_id=clients_group.pk) for user_id in user_ids],
+                ignore_conflicts=True,
+            )
+            notifications.queue('welcome', user_ids)
+        # bulk_create bypasses m2m_changed, so drop cached roles explicitly.
+        invalidate_principal(*user_ids)
+        self.message_user(request, f'Approved {len(user_ids)} registrations; welcome emails are queued.')
+
 @admin.register(Client)
 class ClientAdmin(admin.ModelAdmin):
-    list_display = ('name', 'email', 'phone', 'case_count', 'created_at', 'user_link')
+    list_display = ('name', 'email', 'phone', 'case_count', 'open_case_count', 'storage_used', 'created_at', 'user_link')
     search_fields = ('name', 'email', 'phone', 'user__username', 'user__email')
     list_filter = ('created_at',)
     date_hierarchy = 'created_at'
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'user_link')
+    list_select_related = ('user',)
     # Remove conditional filter_horizontal for clarity
     # If you want to relate clients to cases, add a ManyToManyField in the model
     # filter_horizontal = ('cases',)
@@ -45,7 +96,8 @@ class ClientAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         if not request.user.is_superuser:
-            qs = qs.filter(Q(user=request.user) | Q(case__lawyer=request.user)).distinct()
+            # Their own profile or clients of cases they're assigned to
+            qs = access.visible_clients(request.user, qs)
         return qs
 
     def get_readonly_fields(self, request, obj=None):
@@ -62,10 +114,15 @@ class ClientAdmin(admin.ModelAdmin):
     user_link.short_description = 'User Account'
 
     def case_count(self, obj):
-        count = obj.case_set.count()
         url = reverse('admin:core_case_changelist') + f'?client__id__exact={obj.id}'
-        return format_html('<a href="{0}">{1}</a>', url, count)
+        return format_html('<a href="{0}">{1}</a>', url, obj.case_count)
     case_count.short_description = 'Cases'
+    case_count.admin_order_field = 'case_count'
+
+    def storage_used(self, obj):
+        return f'{filesizeformat(obj.document_bytes)} in {obj.document_count}'
+    storage_used.short_description = 'Documents'
+    storage_used.admin_order_field = 'document_bytes'
 
 @admin.register(Case)
 class CaseAdmin(admin.ModelAdmin):
@@ -78,15 +135,27 @@ class CaseAdmin(admin.ModelAdmin):
     list_editable = ('status', 'lawyer')
     list_display_links = ('title',)
     readonly_fields = ('opened_on',)
+    list_select_related = ('client', 'lawyer')
     filter_horizontal = ('lawyers',) if 'lawyers' in [f.name for f in Case._meta.get_fields()] else ()
     
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         if not request.user.is_superuser:
             # For non-superusers, only show their cases or cases they're assigned to
-            qs = qs.filter(Q(client__user=request.user) | Q(lawyer=request.user))
+            qs = access.visible_cases(request.user, qs)
         return qs
         
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        # list_editable builds one lawyer <select> per row; evaluate the
+        # choices once per request instead of once per row.
+        if db_field.name == 'lawyer' and request is not None:
+            choices = getattr(request, '_lawyer_choices', None)
+            if choices is None:
+                choices = request._lawyer_choices = [choice for choice in formfield.choices]
+            formfield.choices = choices
+        return formfield
+
     def get_readonly_fields(self, request, obj=None):
         # Make certain fields read-only based on user permissions
         if not request.user.is_superuser:
@@ -167,12 +236,25 @@ class DocumentAdmin(admin.ModelAdmin):
     form = DocumentForm
     list_display = ('title', 'case_display', 'file_type_display', 'file_size_display', 'uploaded_at', 'file_actions')
     list_filter = ('uploaded_at', 'case')
-    search_fields = ('title', 'case__title', 'description')
+    search_fields = ('title', 'case__title', 'original_name')
     date_hierarchy = 'uploaded_at'
-    readonly_fields = ('uploaded_at', 'file_type_display', 'file_size_display', 'preview')
+    readonly_fields = ('uploaded_at', 'original_name', 'file_type_display', 'file_size_display', 'mime_type', 'sha256', 'preview')
     list_per_page = 25
+    list_select_related = ('case',)
     actions = ['download_selected_documents']
     
+    def get_search_results(self, request, queryset, search_term):
+        """Also match on the extracted document text."""
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            matches = search.search_documents(Document.objects.only('pk'), search_term)
+            if matches:
+                # Narrow the incoming queryset so filters and access scoping still apply.
+                return queryset.filter(
+                    Q(pk__in=results.values('pk')) | Q(pk__in=[document.pk for document in matches])
+                ), False
+        return results, may_have_duplicates
+
     def case_display(self, obj):
         if obj.case:
             return obj.case.title
@@ -181,14 +263,15 @@ class DocumentAdmin(admin.ModelAdmin):
     case_display.admin_order_field = 'case__title'
     
     def file_type_display(self, obj):
-        if obj.file:
-            return obj.file.name.split('.')[-1].upper()
+        if obj.extension:
+            return obj.extension.upper()
         return 'N/A'
     file_type_display.short_description = 'File Type'
+    file_type_display.admin_order_field = 'extension'
     
     def file_size_display(self, obj):
-        if obj.file:
-            size = obj.file.size
+        size = obj.size_bytes
+        if size is not None:
             if size < 1024:
                 return f"{size} B"
             elif size < 1024 * 1024:
@@ -197,17 +280,18 @@ class DocumentAdmin(admin.ModelAdmin):
                 return f"{size / (1024 * 1024):.1f} MB"
         return 'N/A'
     file_size_display.short_description = 'Size'
+    file_size_display.admin_order_field = 'size_bytes'
     
     fieldsets = (
         (None, {
-            'fields': ('title', 'description', 'case')
+            'fields': ('title', 'case')
         }),
         ('File', {
             'fields': ('file', 'files'),
             'description': 'Upload a single file or multiple files at once.'
         }),
         ('Metadata', {
-            'fields': ('file_type', 'file_size', 'uploaded_at', 'preview'),
+            'fields': ('original_name', 'file_type_display', 'file_size_display', 'mime_type', 'sha256', 'uploaded_at', 'preview'),
             'classes': ('collapse',)
         }),
     )
@@ -216,17 +300,20 @@ class DocumentAdmin(admin.ModelAdmin):
     
     def preview(self, obj):
         if obj.file:
-            if obj.file_type.lower() in ['jpg', 'jpeg', 'png', 'gif']:
+            if thumbnails.supports(obj):
+                # The digest in the query string makes the URL change with
+                # the content, so the thumbnail can be cached indefinitely.
                 return format_html(
-                    '<div style="max-width: 200px; max-height: 200px; overflow: hidden;">'
-                    '<img src="{}" style="max-width: 100%; height: auto;" />'
-                    '</div>',
-                    obj.file.url
+                    '<a href="{}" target="_blank"><img src="{}?v={}" alt="{}" loading="lazy" '
+                    'style="max-width: 320px; max-height: 320px; height: auto;" /></a>',
+                    reverse('document_download', args=[obj.pk]),
+                    reverse('admin:document_thumbnail', args=[obj.pk]),
+                    (obj.sha256 or obj.blob_id or '')[:16],
+                    obj.display_name,
                 )
-            elif obj.file_type.lower() == 'pdf':
+            elif obj.extension == 'pdf':
                 return format_html(
-                    '<iframe src="{}" width="100%" height="300" style="border: 1px solid #ddd;"></iframe>',
-                    obj.file.url
+                    '<a href="{}" target="_blank">Open PDF</a>', reverse('document_download', args=[obj.pk]),
                 )
         return 'No preview available'
     preview.short_description = 'Preview'
@@ -236,10 +323,10 @@ class DocumentAdmin(admin.ModelAdmin):
             return format_html(
                 '<div class="actions">'
                 '<a href="{}" class="button" target="_blank">View</a> '
-                '<a href="{}" class="button" download>Download</a>'
+                '<a href="{}" class="button">Download</a>'
                 '</div>',
-                obj.file.url,
-                obj.file.url
+                reverse('document_download', args=[obj.pk]),
+                reverse('document_download', args=[obj.pk]) + '?download=1',
             )
         return 'No file'
     file_actions.short_description = 'Actions'
@@ -253,38 +340,36 @@ class DocumentAdmin(admin.ModelAdmin):
                 Document.objects.create(
                     title=file.name,
                     file=file,
-                    case=obj.case,
-                    uploaded_by=request.user
+                    case=obj.case
                 )
         super().save_model(request, obj, form, change)
     
     def download_selected_documents(self, request, queryset):
         """
-        Download selected documents as a zip file
+        Download selected documents as a zip file, streamed while it is built
         """
-        import zipfile
         import os
-        from django.http import HttpResponse
-        import tempfile
-        
-        # Create a temporary file to store the zip
-        temp_file = tempfile.NamedTemporaryFile(delete=False)
-        
-        with zipfile.ZipFile(temp_file.name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for document in queryset:
-                if document.file and os.path.exists(document.file.path):
-                    # Add file to zip with a subfolder structure
-                    arcname = f"{document.case.title}/{document.file.name.split('/')[-1]}"
-                    zipf.write(document.file.path, arcname)
-        
-        # Prepare the response
-        response = HttpResponse(open(temp_file.name, 'rb'), content_type='application/zip')
+        from django.http import StreamingHttpResponse
+        from .exports import stream_zip
+
+        def entries():
+            seen = set()
+            for document in queryset.select_related('case').order_by('case__title', 'pk').iterator():
+                if not document.file:
+                    continue
+                # Add file to zip with a subfolder structure
+                filename = document.original_name or document.file.name.split('/')[-1]
+                stem, extension = os.path.splitext(filename)
+                arcname = f"{document.case.title}/{filename}"
+                counter = 2
+                while arcname in seen:
+                    arcname = f"{document.case.title}/{stem} ({counter}){extension}"
+                    counter += 1
+                seen.add(arcname)
+                yield arcname, lambda file=document.file: file.storage.open(file.name, 'rb'), document.uploaded_at
+
+        response = StreamingHttpResponse(stream_zip(entries()), content_type='application/zip')
         response['Content-Disposition'] = 'attachment; filename="documents.zip"'
-        response['Content-Length'] = os.path.getsize(temp_file.name)
-        
-        # Clean up
-        os.unlink(temp_file.name)
-        
         return response
     download_selected_documents.short_description = 'Download selected documents (ZIP)'
     
@@ -299,32 +384,145 @@ class DocumentAdmin(admin.ModelAdmin):
         urls = super().get_urls()
         custom_urls = [
             path('upload/', self.admin_site.admin_view(self.upload_document), name='document_upload'),
+            path('<int:object_id>/thumbnail/', self.admin_site.admin_view(self.thumbnail_view, cacheable=True),
+                 name='document_thumbnail'),
+            path('upload/sessions/', self.admin_site.admin_view(self.upload_session_create),
+                 name='document_upload_session_create'),
+            path('upload/sessions/<uuid:session_id>/', self.admin_site.admin_view(self.upload_session_status),
+                 name='document_upload_session'),
+            path('upload/sessions/<uuid:session_id>/chunks/<int:index>/',
+                 self.admin_site.admin_view(self.upload_session_chunk), name='document_upload_chunk'),
+            path('upload/sessions/<uuid:session_id>/complete/',
+                 self.admin_site.admin_view(self.upload_session_complete), name='document_upload_complete'),
         ]
         return custom_urls + urls
+
+    def thumbnail_view(self, request, object_id):
+        """Serve the document's thumbnail, or a placeholder while it is generated."""
+        from django.http import FileResponse, Http404, HttpResponse
+        document = self.get_object(request, str(object_id))
+        if document is None or not self.has_view_permission(request, document):
+            raise Http404
+        if thumbnails.thumbnail_exists(document):
+            storage = document.file.storage
+            response = FileResponse(
+                storage.open(thumbnails.thumbnail_name(document.file.name), 'rb'),
+                content_type=thumbnails.content_type(),
+            )
+            response['Cache-Control'] = 'private, max-age=31536000, immutable'
+            return response
+        # Re-queue in case the process that owned the original job went away.
+        thumbnails.schedule(document)
+        response = HttpResponse(thumbnails.PLACEHOLDER_SVG, content_type='image/svg+xml')
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    def _document_json(self, document):
+        return {
+            'success': True,
+            'id': document.id,
+            'name': document.original_name or document.file.name,
+            'url': reverse('document_download', args=[document.pk]),
+            'size': document.blob.size if document.blob_id else document.file.size,
+            'sha256': document.blob_id,
+        }
     
     def upload_document(self, request):
         """Handle AJAX file uploads"""
         from django.http import JsonResponse
+        from .forms import DocumentForm as CaseDocumentForm
+        if not self.has_add_permission(request):
+            return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
         if request.method == 'POST' and request.FILES:
             try:
-                file = request.FILES['file']
-                document = Document(
-                    title=file.name,
-                    file=file,
-                    uploaded_by=request.user
-                )
-                document.save()
-                return JsonResponse({
-                    'success': True,
-                    'id': document.id,
-                    'name': document.file.name,
-                    'url': document.file.url,
-                    'size': document.file.size
-                })
-            except Exception as e:
-                return JsonResponse({'success': False, 'error': str(e)})
+                case = self._upload_cases(request).get(pk=request.POST.get('case'))
+            except (Case.DoesNotExist, ValueError):
+                return JsonResponse({'success': False, 'error': 'A valid case is required'}, status=400)
+            data = request.POST.copy()
+            data.setdefault('title', request.FILES['file'].name)
+            form = CaseDocumentForm(data, request.FILES)
+            if not form.is_valid():
+                return JsonResponse({'success': False, 'error': form.errors.get_json_data()}, status=400)
+            document = form.save(commit=False)
+            document.case = case
+            document.save()
+            return JsonResponse(self._document_json(document))
         return JsonResponse({'success': False, 'error': 'No file provided'})
 
+    def _upload_cases(self, request):
+        """Cases ``request.user`` may upload to: the ones they can see."""
+        cases = Case.objects.all()
+        if not request.user.is_superuser:
+            cases = access.visible_cases(request.user, cases)
+        return cases
+
+    def _upload_session(self, request, session_id):
+        from django.shortcuts import get_object_or_404
+        from .models import UploadSession
+        return get_object_or_404(
+            UploadSession.objects.select_related('case').filter(case__in=self._upload_cases(request)),
+            pk=session_id,
+        )
+
+    def upload_session_create(self, request):
+        """Open a resumable chunked upload (see core.uploads)."""
+        from django.http import JsonResponse
+        from .forms import UploadSessionForm
+        from .uploads import session_status
+        if not self.has_add_permission(request):
+            return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+        if request.method != 'POST':
+            return JsonResponse({'success': False, 'error': 'POST required'}, status=405)
+        form = UploadSessionForm(request.POST, user=request.user)
+        if not form.is_valid():
+            return JsonResponse({'success': False, 'error': form.errors.get_json_data()}, status=400)
+        session = form.save(commit=False)
+        session.created_by = request.user
+        session.save()
+        return JsonResponse({'success': True, **session_status(session)}, status=201)
+
+    def upload_session_status(self, request, session_id):
+        from django.http import JsonResponse
+        from .uploads import discard_chunks, session_status
+        if not self.has_add_permission(request):
+            return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+        session = self._upload_session(request, session_id)
+        if request.method == 'DELETE':
+            discard_chunks(session)
+            session.delete()
+            return JsonResponse({'success': True})
+        return JsonResponse({'success': True, **session_status(session)})
+
+    def upload_session_chunk(self, request, session_id, index):
+        from django.http import JsonResponse
+        from .uploads import ChunkError, session_status, store_chunk
+        if not self.has_add_permission(request):
+            return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+        if request.method not in ('PUT', 'POST'):
+            return JsonResponse({'success': False, 'error': 'PUT required'}, status=405)
+        session = self._upload_session(request, session_id)
+        if session.document_id:
+            return JsonResponse({'success': False, 'error': 'Upload already completed'}, status=409)
+        try:
+            store_chunk(session, index, request, request.headers.get('X-Chunk-SHA256'))
+        except ChunkError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        return JsonResponse({'success': True, **session_status(session)})
+
+    def upload_session_complete(self, request, session_id):
+        from django.http import JsonResponse
+        from .uploads import ChunkError, assemble
+        if not self.has_add_permission(request):
+            return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+        if request.method != 'POST':
+            return JsonResponse({'success': False, 'error': 'POST required'}, status=405)
+        session = self._upload_session(request, session_id)
+        try:
+            document = assemble(session)
+        except ChunkError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=409)
+        return JsonResponse(self._document_json(document))
+
 @admin.register(Visitor)
 class VisitorAdmin(admin.ModelAdmin):
     list_display = ('name', 'email', 'submitted_at', 'message_preview')
@@ -337,9 +535,110 @@ class VisitorAdmin(admin.ModelAdmin):
         return f"{obj.message[:50]}..." if obj.message else ""
     message_preview.short_description = 'Message Preview'
 
+class AppointmentSlotFilter(admin.SimpleListFilter):
+    title = 'slot'
+    parameter_name = 'slot'
+
+    def lookups(self, request, model_admin):
+        return [('booked', 'Booked'), ('conflict', 'No slot (double-booked before slots)')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'booked':
+            return queryset.filter(slot__isnull=False)
+        if self.value() == 'conflict':
+            return queryset.filter(slot__isnull=True)
+        return queryset
+
+
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
-    list_display = ('client', 'date', 'time', 'created_at')
+    list_display = ('client', 'date', 'time', 'lawyer', 'created_at')
+    list_select_related = ('client', 'slot__lawyer')
     search_fields = ('client__name', 'client__email', 'message')
-    list_filter = ('date', 'client')
+    list_filter = ('date', AppointmentSlotFilter, 'client')
     ordering = ('-date', '-time')
+    change_list_template = 'admin/core/appointment/change_list.html'
+
+    def lawyer(self, obj):
+        slot = getattr(obj, 'slot', None)
+        if slot is None:
+            return 'No slot'
+        return slot.lawyer or 'Firm'
+    lawyer.admin_order_field = 'slot__lawyer__username'
+
+    def get_urls(self):
+        from django.urls import path
+        custom_urls = [
+            path('availability/', self.admin_site.admin_view(self.availability_view), name='appointment_availability'),
+        ]
+        return custom_urls + super().get_urls()
+
+    def availability_view(self, request):
+        """A week of slots: who is booked in each, and how many lawyers are still free."""
+        import datetime
+        from django.core.exceptions import PermissionDenied
+        from django.template.response import TemplateResponse
+        from django.utils import timezone
+        from django.utils.dateparse import parse_date
+
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        start = parse_date(request.GET.get('start') or '') or timezone.localdate()
+        days = [start + datetime.timedelta(days=offset) for offset in range(7)]
+        times = sorted({time for day in days for time in availability.day_slots(day)})
+        open_slots = {(day, time) for day in days for time in availability.day_slots(day)}
+        capacity = availability.lawyers().count() or 1
+        bookings = availability.week_bookings(start)
+        rows = []
+        for time in times:
+            cells = []
+            for day in days:
+                booked = bookings.get((day, time), [])
+                cells.append({
+                    'open': (day, time) in open_slots,
+                    'bookings': booked,
+                    'free': max(capacity - len(booked), 0),
+                })
+            rows.append((time, cells))
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f'Availability, week of {start:%d %b %Y}',
+            'days': days,
+            'rows': rows,
+            'previous_week': start - datetime.timedelta(days=7),
+            'next_week': start + datetime.timedelta(days=7),
+        }
+        return TemplateResponse(request, 'admin/core/appointment/availability.html', context)
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'kind', 'created_at', 'sent_at')
+    list_filter = ('kind', 'sent_at', 'created_at')
+    search_fields = ('user__username', 'user__email')
+    list_select_related = ('user',)
+    readonly_fields = ('user', 'kind', 'case', 'appointment', 'due_at', 'created_at', 'sent_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'priority', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'finished_at')
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'last_error')
+    ordering = ('-created_at',)
+    readonly_fields = ('task', 'kwargs', 'attempts', 'locked_by', 'locked_at', 'last_error', 'created_at', 'finished_at')
+    actions = ['retry_jobs']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Retry selected jobs now')
+    def retry_jobs(self, request, queryset):
+        from django.utils import timezone
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(), locked_by='', finished_at=None,
+        )
+        self.message_user(request, f'{updated} jobs queued for retry.')
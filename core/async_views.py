@@ -0,0 +1,85 @@
+"""
+Async versions of the read-heavy views, for ASGI deployments.
+
+They are routed instead of their ``core.views`` counterparts when
+``settings.ASYNC_VIEWS`` is on. Behaviour, templates and permission rules are
+shared with the sync views. The difference is that the independent queries of
+a page go through ``core.concurrency.gather``, so the case or document lookup
+and the principal load concurrently rather than one after another. Anything
+only an authorized user may see (a document search) waits for the permission
+check. Listings that sit in cached template fragments (``core.fragments``)
+load lazily instead, only when the fragment has to be rendered. Templates
+render on the same pool, which keeps every step of a
+request off Django's single thread-sensitive executor. File access runs on the
+I/O pool. Writes (the case page's upload form) are passed to the sync view.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404
+from django.shortcuts import redirect, render
+from django.utils.functional import SimpleLazyObject
+
+from . import objectcache, views
+from .concurrency import gather, run_db, run_io, stream_file
+from .downloads import serve_document
+from .models import Document
+from .principal import get_principal
+
+
+async def dashboard(request):
+    principal = await run_db(get_principal, request.user)
+    loaders = views.dashboard_loaders(request, principal)
+    if request.GET.get('q'):
+        data = dict(zip(loaders, await gather(*loaders.values())))
+    else:
+        data = views.lazy_loaders(loaders)
+    return await run_db(render, request, 'dashboard.html', views.dashboard_context(request, data))
+
+
+async def case_detail(request, pk):
+    if request.method != 'GET':
+        return await sync_to_async(views.case_detail)(request, pk)
+
+    # The session user and the case load together; the case is discarded if
+    # the request turns out to be anonymous or not allowed to see it.
+    principal, case = await gather(
+        lambda: get_principal(request.user),
+        lambda: objectcache.get_case(pk),
+    )
+    if not principal.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    if case is None:
+        raise Http404('No Case matches the given query.')
+    if not views.can_view_case(principal, case):
+        messages.error(request, 'You do not have permission to view this case.')
+        return redirect('dashboard')
+    document_query = request.GET.get('q', '').strip()
+    if document_query:
+        documents = await run_db(views.case_documents, pk, document_query)
+    else:
+        documents = SimpleLazyObject(lambda: views.case_documents(pk))
+    context = {
+        'case': case,
+        'documents': documents,
+        'document_query': document_query,
+        'form': views.DocumentForm(),
+    }
+    return await run_db(render, request, 'case_detail.html', context)
+
+
+async def document_download(request, pk):
+    principal, document = await gather(
+        lambda: get_principal(request.user),
+        lambda: Document.objects.select_related('case').filter(pk=pk).first(),
+    )
+    if not principal.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    if document is None or not document.file or not views.can_view_case(principal, document.case):
+        raise Http404
+    # Opening the file and every read happen on the I/O pool; a plain
+    # FileResponse would be read into memory in one go under ASGI.
+    response = await run_io(serve_document, request, document, as_attachment='download' in request.GET)
+    if getattr(response, 'file_to_stream', None) is not None:
+        response.streaming_content = stream_file(response.file_to_stream, response.block_size)
+    return response
@@ -0,0 +1,156 @@
+"""
+Appointment availability and booking.
+
+Bookable slots come from ``settings.OFFICE_HOURS`` and
+``APPOINTMENT_SLOT_MINUTES``: every open day is cut into slots of that
+length, aligned to midnight, in ``TIME_ZONE``. A booked slot is an
+``AppointmentSlot`` row. While users in the Lawyer group exist, every booking
+is with one of them and a slot stays free until all of them are booked.
+Otherwise the firm takes one appointment per slot.
+
+The free slots of a date range are the grid minus what a single range query
+on the ``(date, time)`` index returns. ``book`` does not rely on what it read:
+it inserts the slot and lets the unique constraints reject one that was taken
+in the meantime, then moves on to the next free lawyer.
+"""
+import datetime
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Appointment, AppointmentSlot, User
+
+LAWYER_GROUP = 'Lawyer'
+
+Slot = namedtuple('Slot', 'date time lawyer_ids')
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+def slot_minutes():
+    return getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 30)
+
+
+def _minutes(value):
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def day_slots(day):
+    """Start times of the slots on ``day`` that fit inside office hours."""
+    hours = getattr(settings, 'OFFICE_HOURS', {}).get(day.weekday())
+    if not hours:
+        return []
+    length = slot_minutes()
+    opens, closes = (_minutes(value) for value in hours)
+    first = -(-opens // length) * length
+    return [datetime.time(start // 60, start % 60) for start in range(first, closes - length + 1, length)]
+
+
+def slot_start(time):
+    """The start of the grid slot that contains ``time``."""
+    start = (time.hour * 60 + time.minute) // slot_minutes() * slot_minutes()
+    return datetime.time(start // 60, start % 60)
+
+
+def lawyers():
+    return User.objects.filter(groups__name=LAWYER_GROUP, is_active=True).order_by('pk')
+
+
+def _local_now():
+    return timezone.localtime().replace(tzinfo=None)
+
+
+def free_slots(start=None, days=7, lawyer_id=None, limit=None):
+    """
+    Free slots from ``start`` (default today) for ``days`` days, soonest first.
+
+    Each ``Slot`` carries the ids of the lawyers free at that time; it is
+    empty when the firm books without lawyers. With ``lawyer_id`` only that
+    lawyer's free slots are returned. Slots that have begun are left out.
+    """
+    now = _local_now()
+    start = start or now.date()
+    end = start + datetime.timedelta(days=days - 1)
+    resources = [lawyer_id] if lawyer_id is not None else list(lawyers().values_list('pk', flat=True))
+
+    booked = AppointmentSlot.objects.filter(date__range=(start, end))
+    booked = booked.filter(lawyer_id__in=resources) if resources else booked.filter(lawyer__isnull=True)
+    taken = defaultdict(set)
+    for date, time, lawyer in booked.values_list('date', 'time', 'lawyer_id'):
+        taken[date, time].add(lawyer)
+
+    slots = []
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        for time in day_slots(day):
+            if datetime.datetime.combine(day, time) <= now:
+                continue
+            busy = taken.get((day, time), ())
+            if resources:
+                free = tuple(pk for pk in resources if pk not in busy)
+                if not free:
+                    continue
+            elif None in busy:
+                continue
+            else:
+                free = ()
+            slots.append(Slot(day, time, free))
+            if limit and len(slots) >= limit:
+                return slots
+    return slots
+
+
+def check_bookable(date, time):
+    """Raise ``SlotUnavailable`` unless ``date``/``time`` starts a future slot within the booking window."""
+    if time not in day_slots(date):
+        raise SlotUnavailable('Please pick one of the slots offered during office hours.')
+    if datetime.datetime.combine(date, time) <= _local_now():
+        raise SlotUnavailable('That time has already passed.')
+    horizon = getattr(settings, 'APPOINTMENT_BOOKING_DAYS', 60)
+    if date > _local_now().date() + datetime.timedelta(days=horizon):
+        raise SlotUnavailable(f'Appointments can be booked up to {horizon} days ahead.')
+
+
+def book(client_id, date, time, lawyer_id=None, message=''):
+    """
+    Book ``date``/``time`` for a client and return the new ``Appointment``.
+
+    Without ``lawyer_id`` the booking goes to the first free lawyer. Raises
+    ``SlotUnavailable`` when the time is not bookable or nobody is free.
+    """
+    check_bookable(date, time)
+    if lawyer_id is not None:
+        candidates = [lawyer_id]
+    else:
+        candidates = list(lawyers().values_list('pk', flat=True)) or [None]
+        # Only narrows the order of attempts; the constraints decide.
+        busy = set(AppointmentSlot.objects.filter(date=date, time=time).values_list('lawyer_id', flat=True))
+        candidates = [pk for pk in candidates if pk not in busy] or candidates[:1]
+
+    for candidate in candidates:
+        try:
+            with transaction.atomic():
+                appointment = Appointment.objects.create(client_id=client_id, date=date, time=time, message=message)
+                AppointmentSlot.objects.create(appointment=appointment, lawyer_id=candidate, date=date, time=time)
+        except IntegrityError:
+            continue
+        return appointment
+    raise SlotUnavailable('Sorry, that slot has just been taken. Please pick another.')
+
+
+def week_bookings(start):
+    """Booked slots of the seven days from ``start`` as ``{(date, time): [AppointmentSlot, ...]}``."""
+    bookings = defaultdict(list)
+    slots = (
+        AppointmentSlot.objects
+        .filter(date__range=(start, start + datetime.timedelta(days=6)))
+        .select_related('appointment__client', 'lawyer')
+    )
+    for slot in slots:
+        bookings[slot.date, slot.time].append(slot)
+    return bookings
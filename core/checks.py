@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# Backends whose entries are private to one process.
+PROCESS_LOCAL = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Backends whose add and incr are atomic across processes.
+ATOMIC = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Cached principals, version stamps and throttle buckets are invalidated by
+    whichever process changes the data, so every process must share the cache.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL:
+        return []
+    return [Error(
+        f"The default cache ({backend}) is not shared between processes.",
+        hint=(
+            "Invalidations made by one worker or management command would not "
+            "reach the others. Set REDIS_URL, use Memcached or the database "
+            "cache, or silence core.E001 when only a single process ever runs."
+        ),
+        id='core.E001',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def check_production_cache(app_configs, **kwargs):
+    """Throttle counters rely on atomic ``incr``, and every request reads the cache."""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in ATOMIC or backend in PROCESS_LOCAL:
+        return []
+    return [Warning(
+        f"The default cache ({backend}) is not suited to production.",
+        hint=(
+            "Its incr is not atomic across processes, so throttle counts race, "
+            "and each lookup costs a query or a file read. Set REDIS_URL."
+        ),
+        id='core.W002',
+    )]
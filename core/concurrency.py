@@ -0,0 +1,78 @@
+"""
+Concurrency helpers for the async views in ``core.async_views``.
+
+``gather`` runs independent ORM calls at the same time. Each call runs on a
+thread of a bounded pool (``ASYNC_DB_THREADS``), and each pool thread has its
+own database connection. Calls run in a copy of the request's context, so
+their queries still count towards its query budget. ``run_io`` moves blocking storage calls to a separate bounded
+pool (``ASYNC_IO_THREADS``), so slow disks cannot take every database thread.
+
+With ``ASYNC_DB_THREADS = 0`` the calls instead run one after another on
+Django's thread-sensitive executor. That is required inside test
+transactions, which other connections cannot see.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def _pool(setting, default):
+    with _lock:
+        if setting not in _pools:
+            _pools[setting] = ThreadPoolExecutor(
+                max_workers=getattr(settings, setting, default),
+                thread_name_prefix=setting.lower(),
+            )
+        return _pools[setting]
+
+
+def _in_db_thread(func):
+    # Pool threads serve many requests and keep their connections between
+    # calls; reopening one per call costs more than the query. Drop any that
+    # saw an error or was left inside a transaction.
+    for connection in connections.all(initialized_only=True):
+        if connection.connection is not None and (connection.errors_occurred or not connection.get_autocommit()):
+            connection.close()
+    return func()
+
+
+async def gather(*funcs):
+    """Run the zero-argument callables ``funcs`` concurrently; returns their results in order."""
+    if not getattr(settings, 'ASYNC_DB_THREADS', 4):
+        return [await sync_to_async(func)() for func in funcs]
+    loop = asyncio.get_running_loop()
+    pool = _pool('ASYNC_DB_THREADS', 4)
+    # A context can only be entered by one thread at a time, so each call gets its own copy.
+    return list(await asyncio.gather(*(
+        loop.run_in_executor(pool, contextvars.copy_context().run, _in_db_thread, func) for func in funcs
+    )))
+
+
+async def run_db(func, *args, **kwargs):
+    """Run one blocking call (a query, a template render) the way ``gather`` does."""
+    [result] = await gather(functools.partial(func, *args, **kwargs))
+    return result
+
+
+async def run_io(func, *args, **kwargs):
+    """Run blocking storage I/O on the I/O pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool('ASYNC_IO_THREADS', 8), functools.partial(func, *args, **kwargs))
+
+
+async def stream_file(handle, block_size):
+    """Async iterator over ``handle`` with every read on the I/O pool."""
+    while True:
+        chunk = await run_io(handle.read, block_size)
+        if not chunk:
+            break
+        yield chunk
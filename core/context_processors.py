@@ -0,0 +1,10 @@
+from django.utils.functional import SimpleLazyObject
+
+from .principal import get_principal
+
+
+def principal(request):
+    """Expose the request principal to templates as ``principal``."""
+    if hasattr(request, 'principal'):
+        return {'principal': request.principal}
+    return {'principal': SimpleLazyObject(lambda: get_principal(request.user))}
@@ -0,0 +1,130 @@
+"""
+Per-client totals stored on ``Client``: ``case_count``, ``open_case_count``
+(cases that are not closed), ``document_count`` and ``document_bytes``.
+
+Case and Document signals adjust them with ``F()`` updates, so concurrent
+writers never overwrite each other's changes and pages read them without a
+``COUNT`` or ``SUM``. Bulk writes and raw SQL skip the signals; ``reconcile``
+(and the ``reconcile_client_counters`` command) recomputes drifted rows from
+the cases and documents themselves.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from . import fragments, objectcache, snapshots
+from .models import Case, Client, Document
+
+FIELDS = Client.COUNTERS
+CLOSED = 'closed'
+
+
+def _case_state(client_id, status):
+    return client_id, {'case_count': 1, 'open_case_count': int(status != CLOSED)}
+
+
+def _document_state(client_id, size_bytes):
+    return client_id, {'document_count': 1, 'document_bytes': size_bytes or 0}
+
+
+def _client_of_case(case_id):
+    return Case._base_manager.filter(pk=case_id).values_list('client_id', flat=True).first()
+
+
+def _apply(before, after):
+    """Move one row's contribution from the ``before`` state to ``after``."""
+    deltas = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+    for sign, state in ((-1, before), (1, after)):
+        if state is not None and state[0] is not None:
+            client_id, counts = state
+            for field, value in counts.items():
+                deltas[client_id][field] += sign * value
+    for client_id, delta in deltas.items():
+        updates = {field: F(field) + value for field, value in delta.items() if value}
+        if not updates:
+            continue
+        Client.objects.filter(pk=client_id).update(**updates)
+        # update() sends no post_save, so retire what cached the old totals.
+        fragments.bump(fragments.Ref('core.Client', client_id))
+        objectcache.forget(Client, client_id)
+
+
+def case_saved(instance):
+    snapshot = snapshots.before(instance)
+    before = snapshot and _case_state(snapshot['client_id'], snapshot['status'])
+    after = _case_state(instance.client_id, instance.status)
+    if before is not None and before[0] != instance.client_id:
+        # The case's documents move to the new client with it.
+        documents = Document.objects.filter(case=instance).aggregate(
+            document_count=Count('pk'), document_bytes=Coalesce(Sum('size_bytes'), 0),
+        )
+        before[1].update(documents)
+        after[1].update(documents)
+    _apply(before, after)
+
+
+def case_deleted(instance):
+    _apply(_case_state(instance.client_id, instance.status), None)
+
+
+def document_saved(instance):
+    snapshot = snapshots.before(instance)
+    before = snapshot and (
+        snapshot['case_id'], _document_state(snapshot['case__client_id'], snapshot['size_bytes']),
+    )
+    if Document.case.is_cached(instance):
+        client_id = instance.case.client_id
+    elif before is not None and before[0] == instance.case_id:
+        client_id = before[1][0]
+    else:
+        client_id = _client_of_case(instance.case_id)
+    _apply(before and before[1], _document_state(client_id, instance.size_bytes))
+
+
+def document_deleted(instance):
+    # Cascades delete documents before their case, so the case is still there.
+    _apply(_document_state(_client_of_case(instance.case_id), instance.size_bytes), None)
+
+
+def _totals():
+    """Correlated subqueries computing each counter for the outer client."""
+    cases = Case.objects.filter(client=OuterRef('pk')).order_by().values('client')
+    documents = Document.objects.filter(case__client=OuterRef('pk')).order_by().values('case__client')
+
+    def total(queryset, aggregate):
+        return Coalesce(Subquery(queryset.annotate(total=aggregate).values('total')), Value(0))
+
+    return {
+        'case_count': total(cases, Count('pk')),
+        'open_case_count': total(cases.exclude(status=CLOSED), Count('pk')),
+        'document_count': total(documents, Count('pk')),
+        'document_bytes': total(documents, Sum('size_bytes')),
+    }
+
+
+def drifted(client_ids=None):
+    """Clients whose stored counters differ from their cases and documents."""
+    clients = Client.objects.all() if client_ids is None else Client.objects.filter(pk__in=client_ids)
+    expected = {f'expected_{field}': total for field, total in _totals().items()}
+    clients = clients.annotate(**expected).exclude(**{field: F(f'expected_{field}') for field in FIELDS})
+    return clients.order_by('pk').values('pk', 'name', *FIELDS, *expected)
+
+
+def reconcile(client_ids=None, dry_run=False, batch_size=500):
+    """
+    Recompute drifted counters and return the rows that were wrong.
+
+    Each batch is rewritten in a single UPDATE that recounts from the tables,
+    so writes that land meanwhile are not lost.
+    """
+    rows = list(drifted(client_ids))
+    if dry_run:
+        return rows
+    for start in range(0, len(rows), batch_size):
+        pks = [row['pk'] for row in rows[start:start + batch_size]]
+        Client.objects.filter(pk__in=pks).update(**_totals())
+        fragments.bump(*(fragments.Ref('core.Client', pk) for pk in pks))
+        for pk in pks:
+            objectcache.forget(Client, pk)
+    return rows
@@ -1,10 +1,13 @@
 from django.contrib.auth.decorators import user_passes_test
 
+from .principal import get_principal
+
 def group_required(*group_names):
     """Requires user to be in at least one of the specified groups."""
     def in_groups(u):
         if u.is_authenticated:
-            if bool(u.groups.filter(name__in=group_names)) or u.is_superuser:
+            principal = get_principal(u)
+            if principal.is_superuser or principal.has_group(*group_names):
                 return True
         return False
     return user_passes_test(in_groups)
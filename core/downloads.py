@@ -0,0 +1,140 @@
+"""
+Serving stored documents after the permission check.
+
+``serve_document`` answers conditional requests (ETag from the content digest,
+Last-Modified from the upload time) with 304 before touching the file. It then
+hands the transfer to the front server through X-Accel-Redirect or X-Sendfile
+when ``DOCUMENT_SENDFILE`` is set, or falls back to a ``FileResponse``. Full
+downloads keep the real file object, so WSGI servers can use sendfile(). A
+single byte range gets a 206 Partial Content, so PDF viewers can page through
+large files without fetching them whole.
+"""
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Read at most ``length`` bytes of ``handle`` starting at ``start``."""
+
+    def __init__(self, handle, start, length):
+        handle.seek(start)
+        self._handle = handle
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._handle.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._handle.close()
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single-range ``Range`` header.
+
+    Returns None when the header should be ignored (absent, malformed or
+    multi-range; the full body is then sent) and raises ``ValueError`` when the
+    range cannot be satisfied.
+    """
+    match = _RANGE_RE.match((header or '').replace(' ', ''))
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError(header)
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _sendfile_response(document):
+    backend = getattr(settings, 'DOCUMENT_SENDFILE', None)
+    response = HttpResponse(content_type=document.mime_type or 'application/octet-stream')
+    if backend == 'x-accel-redirect':
+        prefix = getattr(settings, 'DOCUMENT_SENDFILE_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(document.file.name)
+    elif backend == 'x-sendfile':
+        response['X-Sendfile'] = document.file.path
+    else:
+        return None
+    return response
+
+
+def serve_document(request, document, as_attachment=False):
+    etag = f'"{document.sha256}"' if document.sha256 else None
+    last_modified = int(document.uploaded_at.timestamp()) if document.uploaded_at else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _sendfile_response(document)
+        if response is not None:
+            response['Content-Disposition'] = content_disposition_header(as_attachment, document.display_name)
+        else:
+            response = _file_response(request, document, etag, last_modified, as_attachment)
+
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _file_response(request, document, etag, last_modified, as_attachment):
+    try:
+        handle = document.file.storage.open(document.file.name, 'rb')
+    except FileNotFoundError:
+        raise Http404('Document file is missing.')
+    size = document.size_bytes if document.size_bytes is not None else document.file.size
+    content_type = document.mime_type or 'application/octet-stream'
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size) if request.method == 'GET' else None
+    except ValueError:
+        handle.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range and _if_range_matches(request, etag, last_modified):
+        start, end = byte_range
+        response = FileResponse(
+            RangeFile(handle, start, end - start + 1), status=206, content_type=content_type,
+            as_attachment=as_attachment, filename=document.display_name,
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        response = FileResponse(
+            handle, content_type=content_type, as_attachment=as_attachment, filename=document.display_name,
+        )
+    response['Accept-Ranges'] = 'bytes'
+    return response
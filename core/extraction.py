@@ -0,0 +1,147 @@
+"""
+Text extraction for document search.
+
+Text is extracted once per stored content: ``DocumentText`` rows are keyed by
+the file's SHA-256, so re-uploads, copies in other cases and re-indexing never
+read an unchanged file twice. Extraction is a background job (``core.jobs``)
+queued with the upload; ``extract_document_text`` catches up on older documents.
+
+Plain text and DOCX need only the standard library; PDF text layers need
+``pypdf`` (optional, PDFs are recorded as unsupported without it). Scanned
+PDFs without a text layer are recorded as empty; there is no OCR.
+"""
+import logging
+import zipfile
+from xml.etree import ElementTree
+
+from django.conf import settings
+
+from . import jobs, search
+
+logger = logging.getLogger(__name__)
+
+_WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+PLAIN_EXTENSIONS = {'txt', 'text', 'md', 'csv', 'rtf', 'eml', 'html', 'htm', 'xml', 'json'}
+
+
+def _max_chars():
+    return getattr(settings, 'DOCUMENT_TEXT_MAX_CHARS', 1_000_000)
+
+
+def extract_plain(handle):
+    data = handle.read(_max_chars() * 4)
+    for encoding in ('utf-8-sig', 'cp1252'):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode('utf-8', errors='replace')
+
+
+def extract_pdf(handle):
+    from pypdf import PdfReader
+
+    parts, length = [], 0
+    for page in PdfReader(handle).pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        length += len(text)
+        if length >= _max_chars():
+            break
+    return '\n'.join(parts)
+
+
+def extract_docx(handle):
+    parts, length = [], 0
+    with zipfile.ZipFile(handle) as archive, archive.open('word/document.xml') as xml:
+        for _, element in ElementTree.iterparse(xml):
+            if element.tag == f'{_WORD_NS}t' and element.text:
+                parts.append(element.text)
+                length += len(element.text)
+            elif element.tag == f'{_WORD_NS}tab':
+                parts.append('\t')
+            elif element.tag == f'{_WORD_NS}p':
+                parts.append('\n')
+                element.clear()
+            if length >= _max_chars():
+                break
+    return ''.join(parts)
+
+
+def extractor_for(extension, mime_type):
+    if extension == 'pdf':
+        try:
+            import pypdf  # noqa: F401
+        except ImportError:
+            return None
+        return extract_pdf
+    if extension == 'docx':
+        return extract_docx
+    if extension in PLAIN_EXTENSIONS or (mime_type or '').startswith('text/'):
+        return extract_plain
+    return None
+
+
+def extract(storage, name, extension, mime_type):
+    """Return ``(status, text)`` for the stored file ``name``."""
+    extractor = extractor_for(extension, mime_type)
+    if extractor is None:
+        return 'unsupported', ''
+    try:
+        with storage.open(name, 'rb') as handle:
+            text = extractor(handle)
+    except Exception:
+        logger.warning('Text extraction failed for %s', name, exc_info=True)
+        return 'failed', ''
+    text = text.replace('\x00', '')[:_max_chars()].strip()
+    return ('ok' if text else 'empty'), text
+
+
+def document_text(document, force=False):
+    """Return the ``DocumentText`` for ``document``'s content, extracting it if needed."""
+    from .models import DocumentText
+
+    if not document.sha256 or not document.file:
+        return None
+    if not force:
+        existing = DocumentText.objects.filter(pk=document.sha256).first()
+        if existing is not None:
+            return existing
+    status, text = extract(document.file.storage, document.file.name, document.extension, document.mime_type)
+    entry, _ = DocumentText.objects.update_or_create(
+        sha256=document.sha256, defaults={'status': status, 'text': text},
+    )
+    return entry
+
+
+def index_document(document_id):
+    """Extract (or reuse) the text of one document and update its search row."""
+    from .models import Document
+
+    document = Document.objects.filter(pk=document_id).first()
+    if document is None:
+        return
+    entry = document_text(document)
+    if not Document.objects.filter(pk=document_id, sha256=document.sha256).exists():
+        # Replaced while extracting; the job queued for the new file indexes it.
+        return
+    search.index_document(document, entry.text if entry else '')
+
+
+def schedule(document):
+    """Queue extraction and indexing of ``document`` off the request path."""
+    jobs.enqueue(index_document, document_id=document.pk, unique=True)
+
+
+def document_saved(document):
+    """
+    Index a saved document right away with whatever text is already known for
+    its content, and defer extraction when none is.
+    """
+    from .models import DocumentText
+
+    entry = DocumentText.objects.filter(pk=document.sha256).first() if document.sha256 else None
+    search.index_document(document, entry.text if entry else '')
+    if entry is None and document.sha256:
+        schedule(document)
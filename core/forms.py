@@ -1,12 +1,14 @@
 import re
 from django import forms
+from django.conf import settings
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from django.contrib.auth import get_user_model, password_validation
 from django.contrib.auth.password_validation import password_validators_help_text_html
-from .models import Visitor, Client, Case, Document, Appointment
+from . import access, availability
+from .models import Visitor, Client, Case, Document, Appointment, UploadSession
 
 User = get_user_model()
 
@@ -196,7 +198,7 @@ class ClientProfileForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Set initial values from the user model
-        if self.instance and hasattr(self.instance, 'user'):
+        if self.instance and self.instance.user_id:
             self.fields['email'].initial = self.instance.user.email
             self.fields['name'].initial = self.instance.name
 
@@ -212,7 +214,7 @@ class ClientProfileForm(forms.ModelForm):
             raise forms.ValidationError('Please enter a valid email address.')
         
         # Check if email is already in use by another user
-        if User.objects.filter(email__iexact=email).exclude(pk=self.instance.user.pk).exists():
+        if User.objects.filter(email__iexact=email).exclude(pk=self.instance.user_id).exists():
             raise forms.ValidationError('This email is already in use by another account.')
             
         return email
@@ -244,6 +246,12 @@ class ClientProfileForm(forms.ModelForm):
         """
         client = super().save(commit=False)
         
+        # New clients get their user account from Client.save
+        if not client.user_id:
+            if commit:
+                client.save()
+            return client
+        
         # Update the associated user's email if it changed
         if client.user.email != self.cleaned_data['email']:
             client.user.email = self.cleaned_data['email']
@@ -281,12 +289,62 @@ class DocumentForm(forms.ModelForm):
         model = Document
         fields = ['title', 'file']
 
+class UploadSessionForm(forms.ModelForm):
+    """Opens a chunked upload; the chunked counterpart of DocumentForm."""
+    class Meta:
+        model = UploadSession
+        fields = ['case', 'title', 'filename', 'size']
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if user is not None and not user.is_superuser:
+            self.fields['case'].queryset = access.visible_cases(user, self.fields['case'].queryset)
+
+    def clean_size(self):
+        size = self.cleaned_data['size']
+        max_size = settings.CHUNKED_UPLOAD_MAX_SIZE
+        if size < 1:
+            raise forms.ValidationError('The file is empty.')
+        if size > max_size:
+            raise forms.ValidationError(f'Files larger than {max_size} bytes are not accepted.')
+        return size
+
+    def save(self, commit=True):
+        session = super().save(commit=False)
+        session.chunk_size = settings.CHUNKED_UPLOAD_CHUNK_SIZE
+        if commit:
+            session.save()
+        return session
+
 class AppointmentForm(forms.ModelForm):
+    lawyer = forms.ModelChoiceField(
+        queryset=User.objects.none(),
+        required=False,
+        empty_label='Any available lawyer',
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['lawyer'].queryset = availability.lawyers()
+        if not self.fields['lawyer'].queryset.exists():
+            del self.fields['lawyer']
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date, time = cleaned_data.get('date'), cleaned_data.get('time')
+        if date and time:
+            try:
+                availability.check_bookable(date, time)
+            except availability.SlotUnavailable as exc:
+                self.add_error('time', str(exc))
+        return cleaned_data
+
     class Meta:
         model = Appointment
         fields = ['date', 'time', 'message']
         widgets = {
             'date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
-            'time': forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}),
+            'time': forms.TimeInput(attrs={'type': 'time', 'class': 'form-control', 'step': 60}),
             'message': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Reason for appointment (optional)'}),
         }
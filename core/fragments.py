@@ -0,0 +1,118 @@
+"""
+Version stamps for cached template fragments.
+
+Every Client, Case, Document and Appointment has a stamp in the cache, and so
+does each of those models as a whole. Users have one too, as lawyers' names
+appear in calendar feeds (``core.ical``). A stamp is a random token that is
+replaced whenever the row (or, for a model, any of its rows) is saved or
+deleted. A change also replaces the stamp of the row whose page lists it: a
+document's case, and a case's or an appointment's client.
+
+The ``{% fragment %}`` tag (``core.templatetags.fragments``) puts the stamps of
+the objects it varies on into its cache key. Once anything a fragment shows
+changes, it is looked up under a new key, so cached HTML is never served
+stale; superseded entries expire after ``FRAGMENT_CACHE_TIMEOUT``.
+
+Stamps are replaced right away and again when the surrounding transaction
+commits. Otherwise a request that read the old rows while the transaction was
+open could cache them under the new stamp. Bulk writes skip model signals, so
+code that uses them calls ``bump`` itself.
+
+A bump must reach every process that renders fragments, including bumps made
+by management commands and job workers, so the stamps need the shared default
+cache (see ``CACHES``; ``core.checks`` rejects a per-process backend).
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import connection, models, transaction
+
+from . import snapshots
+
+ALL = '*'
+
+# Model label -> (label of the row whose page lists it, foreign key to that row)
+OWNERS = {
+    'core.case': ('core.client', 'client_id'),
+    'core.document': ('core.case', 'case_id'),
+    'core.appointment': ('core.client', 'client_id'),
+}
+
+
+class Ref:
+    """A versioned thing: the row ``pk`` of the model ``label``, or the whole model."""
+
+    def __init__(self, label, pk=ALL):
+        self.label = label.lower()
+        self.pk = pk
+
+    @classmethod
+    def of(cls, instance):
+        return cls(instance._meta.label, instance.pk)
+
+    @property
+    def key(self):
+        return f'fragment:stamp:{self.label}:{self.pk}'
+
+    def __repr__(self):
+        return f'<Ref {self.label}:{self.pk}>'
+
+
+def stamps(refs):
+    """The current stamps of ``refs``, in order."""
+    keys = [ref.key for ref in refs]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # A fresh random stamp can never match HTML cached under an evicted one.
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump(*refs):
+    """Replace the stamps of ``refs``, now and again when the transaction commits."""
+    keys = {ref.key for ref in refs}
+
+    def replace():
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+    replace()
+    if connection.in_atomic_block:
+        transaction.on_commit(replace)
+
+
+def changed(instance):
+    """Bump everything a save or delete of ``instance`` invalidates."""
+    refs = [Ref.of(instance), Ref(instance._meta.label)]
+    owner = OWNERS.get(instance._meta.label_lower)
+    if owner is not None:
+        label, field = owner
+        refs.append(Ref(label, getattr(instance, field)))
+        snapshot = snapshots.before(instance)
+        previous = snapshot and snapshot[field]
+        if previous is not None:
+            refs.append(Ref(label, previous))
+    bump(*refs)
+
+
+def fragment_key(name, vary_on):
+    """
+    Cache key of the fragment ``name`` for the values ``vary_on``.
+
+    Model instances and ``Ref``s contribute their current stamps; anything
+    else contributes its ``repr``.
+    """
+    refs = {
+        index: value if isinstance(value, Ref) else Ref.of(value)
+        for index, value in enumerate(vary_on)
+        if isinstance(value, (Ref, models.Model))
+    }
+    current = dict(zip(refs, stamps(list(refs.values()))))
+    parts = [
+        f'{refs[index].key}={current[index]}' if index in refs else repr(value)
+        for index, value in enumerate(vary_on)
+    ]
+    digest = hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+    return f'fragment:{name}:{digest}'
@@ -0,0 +1,172 @@
+"""
+iCalendar (RFC 5545) feeds of appointments and case due dates.
+
+Every user can have a secret ``CalendarToken``. Feed URLs carry it in place of
+a session so calendar apps can subscribe without logging in:
+
+* ``appointments``: a client's own appointments, or a lawyer's bookings.
+* ``cases``: due dates of a client's cases, or of the cases a lawyer handles.
+* ``firm``: every appointment and due date, for staff only.
+
+Calendar apps poll feeds every few minutes. ``feed_state`` sums a feed up
+without serializing it: one narrow query per model reads each event's id,
+``updated_at`` and the ids of the client and lawyer it names, and one cache
+read adds the ``core.fragments`` stamps of those clients and lawyers, which
+change when they are renamed (or, for a client, when bulk writes bump it).
+The view derives ETag and Last-Modified from that, so most polls end in a 304.
+Deleting a row or renaming a related one leaves Last-Modified alone, so the
+ETag (which every common client sends back) is the authoritative validator.
+Bodies are streamed one event at a time from ``iterator()``.
+"""
+import datetime
+import hashlib
+import secrets
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import fragments
+from .models import Appointment, CalendarToken, Case
+
+FEEDS = ('appointments', 'cases', 'firm')
+
+
+def token_for(user):
+    """The user's feed token, created on first use."""
+    token, _ = CalendarToken.objects.get_or_create(user=user, defaults={'token': secrets.token_urlsafe(32)})
+    return token.token
+
+
+def reset_token(user):
+    """Replace the user's token; previously shared feed URLs stop working."""
+    CalendarToken.objects.update_or_create(user=user, defaults={'token': secrets.token_urlsafe(32)})
+
+
+def feed_querysets(feed, user, principal):
+    """``(appointments, cases)`` in ``feed`` for ``user``, or None if the feed is not theirs to read."""
+    appointments = Appointment.objects.none()
+    cases = Case.objects.none()
+    if feed == 'firm':
+        if not principal.is_staff_role:
+            return None
+        appointments = Appointment.objects.all()
+        cases = Case.objects.all()
+    elif feed == 'appointments':
+        if principal.is_client:
+            appointments = Appointment.objects.filter(client_id=principal.client_id)
+        elif principal.is_staff_role:
+            appointments = Appointment.objects.filter(slot__lawyer=user)
+        else:
+            return None
+    elif feed == 'cases':
+        if principal.is_client:
+            cases = Case.objects.filter(client_id=principal.client_id)
+        elif principal.is_staff_role:
+            cases = Case.objects.filter(lawyer=user)
+        else:
+            return None
+    else:
+        return None
+
+    since = timezone.localdate() - datetime.timedelta(days=getattr(settings, 'CALENDAR_FEED_PAST_DAYS', 90))
+    appointments = appointments.filter(date__gte=since)
+    cases = cases.filter(due_date__gte=since).exclude(status='closed')
+    return appointments, cases
+
+
+def feed_state(appointments, cases):
+    """``(etag, last_modified)`` of a feed, without serializing its events."""
+    rows = [
+        list(appointments.order_by('pk').values_list('pk', 'updated_at', 'client_id', 'slot__lawyer_id')),
+        list(cases.order_by('pk').values_list('pk', 'updated_at', 'client_id')),
+    ]
+    client_ids = sorted({row[2] for row in rows[0] + rows[1]})
+    lawyer_ids = sorted({row[3] for row in rows[0] if row[3] is not None})
+    refs = [fragments.Ref('core.Client', pk) for pk in client_ids]
+    refs += [fragments.Ref('core.User', pk) for pk in lawyer_ids]
+    latest = max((row[1] for row in rows[0] + rows[1]), default=None)
+    fingerprint = repr((rows, fragments.stamps(refs) if refs else []))
+    return f'"{hashlib.sha256(fingerprint.encode()).hexdigest()[:32]}"', latest
+
+
+def escape(text):
+    return (
+        text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Split a content line into 75-octet pieces, as RFC 5545 requires."""
+    data = line.encode()
+    if len(data) <= 75:
+        return line + '\r\n'
+    pieces = []
+    limit = 75
+    while data:
+        cut = min(limit, len(data))
+        # Never split a multi-byte character.
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        pieces.append(data[:cut].decode())
+        data = data[cut:]
+        limit = 74
+    return '\r\n '.join(pieces) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _appointment_event(appointment, domain, length):
+    start = timezone.make_aware(datetime.datetime.combine(appointment.date, appointment.time))
+    slot = getattr(appointment, 'slot', None)
+    summary = f'Appointment: {appointment.client.name}'
+    if slot is not None and slot.lawyer is not None:
+        summary += f' with {slot.lawyer.get_full_name() or slot.lawyer.username}'
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:appointment-{appointment.pk}@{domain}',
+        f'DTSTAMP:{_utc(appointment.updated_at)}',
+        f'DTSTART:{_utc(start)}',
+        f'DTEND:{_utc(start + length)}',
+        f'SUMMARY:{escape(summary)}',
+    ]
+    if appointment.message:
+        lines.append(f'DESCRIPTION:{escape(appointment.message)}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def _case_event(case, domain):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:case-{case.pk}-due@{domain}',
+        f'DTSTAMP:{_utc(case.updated_at)}',
+        f'DTSTART;VALUE=DATE:{case.due_date:%Y%m%d}',
+        f'DTEND;VALUE=DATE:{case.due_date + datetime.timedelta(days=1):%Y%m%d}',
+        f'SUMMARY:{escape(f"Due: {case.title}")}',
+        f'DESCRIPTION:{escape(f"{case.client.name} ({case.get_status_display()})")}',
+        'END:VEVENT',
+    ]
+    return lines
+
+
+def serialize(name, appointments, cases, domain):
+    """Yield the feed as folded content lines."""
+    length = datetime.timedelta(minutes=getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 30))
+    for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Law Firm//Calendar Feed//EN',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{escape(name)}',
+    ]:
+        yield fold(line)
+    for appointment in appointments.select_related('client', 'slot__lawyer').order_by('date', 'time').iterator(chunk_size=500):
+        for line in _appointment_event(appointment, domain, length):
+            yield fold(line)
+    for case in cases.select_related('client').order_by('due_date', 'pk').iterator(chunk_size=500):
+        for line in _case_event(case, domain):
+            yield fold(line)
+    yield fold('END:VCALENDAR')
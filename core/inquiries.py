@@ -0,0 +1,160 @@
+"""
+Write-behind ingestion of landing-page inquiries.
+
+On SQLite every INSERT takes the database-wide write lock, so a burst of
+``Visitor`` submissions stalls staff requests. With ``VISITOR_SPOOL_DIR`` set
+(it is off by default),
+``submit`` instead appends the validated form data as a JSON line to
+``active.ndjson`` in that directory and fsyncs it before the request returns.
+``flush`` (run by ``manage.py flush_visitor_spool --loop``) moves the spool
+aside and inserts its records with ``bulk_create`` in batches of
+``VISITOR_SPOOL_BATCH_SIZE``.
+
+Nothing is lost across restarts: a spool file is only deleted after its rows
+have committed. Every record carries a UUID stored in ``Visitor.spool_id``,
+so a file that is inserted again after a crash adds no duplicates.
+
+Writers and the flusher coordinate with ``flock`` on the active file. A
+writer that gets the lock after the file was moved aside notices the
+different inode and appends to the new one instead. The spool is local to
+the host, so every host that serves the landing page runs its own flusher.
+The flusher is a required process whenever spooling is on: without it
+inquiries never reach ``Visitor``.
+"""
+import fcntl
+import itertools
+import json
+import logging
+import os
+import time
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Visitor
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = 'active.ndjson'
+FIELDS = ('name', 'email', 'message')
+
+
+def spool_dir():
+    directory = getattr(settings, 'VISITOR_SPOOL_DIR', None)
+    return os.fspath(directory) if directory else None
+
+
+def _is_current(fd, path):
+    try:
+        return os.stat(path).st_ino == os.fstat(fd).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def submit(data):
+    """
+    Record a validated ``VisitorForm`` payload.
+
+    Returns the new ``Visitor`` when it was saved directly, or None once it
+    is durably spooled.
+    """
+    directory = spool_dir()
+    if not directory:
+        return Visitor.objects.create(**{field: data[field] for field in FIELDS})
+    record = {
+        'id': uuid.uuid4().hex,
+        'submitted_at': timezone.now().isoformat(),
+        **{field: data[field] for field in FIELDS},
+    }
+    line = (json.dumps(record) + '\n').encode()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, ACTIVE)
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if _is_current(fd, path):
+                view = memoryview(line)
+                while view:
+                    view = view[os.write(fd, view):]
+                os.fsync(fd)
+                return None
+        finally:
+            # Closing the descriptor releases the lock.
+            os.close(fd)
+
+
+def pending_bytes():
+    """Size of the active spool file; 0 when there is none."""
+    directory = spool_dir()
+    try:
+        return os.stat(os.path.join(directory, ACTIVE)).st_size if directory else 0
+    except FileNotFoundError:
+        return 0
+
+
+def _rotate(directory):
+    """Move the active file aside for ``flush``, unless it is empty."""
+    path = os.path.join(directory, ACTIVE)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        if _is_current(fd, path) and os.fstat(fd).st_size:
+            os.rename(path, os.path.join(directory, f'ready-{time.time_ns():020d}-{os.getpid()}.ndjson'))
+    finally:
+        os.close(fd)
+
+
+def _records(path):
+    with open(path, 'rb') as handle:
+        for number, line in enumerate(handle, 1):
+            try:
+                record = json.loads(line)
+                yield Visitor(
+                    spool_id=uuid.UUID(record['id']),
+                    submitted_at=parse_datetime(record['submitted_at']),
+                    **{field: record[field] for field in FIELDS},
+                )
+            except (ValueError, KeyError, TypeError):
+                # Only a crash in the middle of a write leaves a torn line.
+                logger.error("Skipping unreadable line %d in %s", number, path)
+
+
+def flush(batch_size=None):
+    """Insert every spooled inquiry; returns how many rows were inserted."""
+    directory = spool_dir()
+    if not directory or not os.path.isdir(directory):
+        return 0
+    batch_size = batch_size or getattr(settings, 'VISITOR_SPOOL_BATCH_SIZE', 500)
+    lock = os.open(os.path.join(directory, 'flush.lock'), os.O_WRONLY | os.O_CREAT, 0o600)
+    try:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return 0  # Another flusher is at it.
+        _rotate(directory)
+        flushed = 0
+        # Files left behind by an interrupted flush come first, in spool order.
+        for name in sorted(os.listdir(directory)):
+            if not name.startswith('ready-'):
+                continue
+            path = os.path.join(directory, name)
+            records = _records(path)
+            while batch := list(itertools.islice(records, batch_size)):
+                # Records inserted before a crash are skipped. The flush lock
+                # rules out a concurrent insert, so what is left goes in.
+                done = set(Visitor.objects.filter(
+                    spool_id__in=[visitor.spool_id for visitor in batch],
+                ).values_list('spool_id', flat=True))
+                batch = [visitor for visitor in batch if visitor.spool_id not in done]
+                Visitor.objects.bulk_create(batch, ignore_conflicts=True)
+                flushed += len(batch)
+            os.remove(path)
+        return flushed
+    finally:
+        os.close(lock)
@@ -0,0 +1,92 @@
+"""
+Per-view SQL accounting.
+
+Every database connection gets an execute wrapper when it is opened. The
+wrapper records how many statements ran and how long they took into the
+``QueryStats`` of the request being tracked, which ``track_queries`` stores in
+a context variable. Context variables follow a request into
+``sync_to_async`` threads and the pools of ``core.concurrency``, so queries
+that async views make on other threads are counted too. The middleware in
+``core.middleware`` reports the figures per resolved URL name and compares
+them with ``settings.QUERY_BUDGETS``.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+
+_current_stats = ContextVar('query_stats', default=None)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self._lock:
+                self.duration += time.perf_counter() - started
+                self.count += 1
+
+    @property
+    def duration_ms(self):
+        return self.duration * 1000
+
+
+def _cache_tables():
+    return [
+        config['LOCATION'] for config in settings.CACHES.values()
+        if config.get('BACKEND') == 'django.core.cache.backends.db.DatabaseCache'
+    ]
+
+
+def _record(execute, sql, params, many, context):
+    stats = _current_stats.get()
+    # Lookups in a database cache are not the view's queries.
+    if stats is None or any(table in sql for table in _cache_tables()):
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install(connection, **kwargs):
+    """Add the accounting wrapper to ``connection``; also a ``connection_created`` receiver."""
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+
+@contextmanager
+def track_queries():
+    """Count queries on every configured database while the block runs."""
+    for connection in connections.all():
+        install(connection)
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def current_stats():
+    """The ``QueryStats`` of the request being tracked, if any."""
+    return _current_stats.get()
+
+
+# Budgets describe rendering a page; writes (uploads, form posts) are not held to them.
+BUDGETED_METHODS = ('GET', 'HEAD')
+
+
+def query_budget(view_name, method='GET'):
+    """Return the configured query budget for a ``method`` request to ``view_name``, or None."""
+    if method.upper() not in BUDGETED_METHODS:
+        return None
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
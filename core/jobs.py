@@ -0,0 +1,218 @@
+"""
+Durable background jobs stored in the database.
+
+``enqueue`` records a ``Job`` naming a module-level function by dotted path
+and its JSON keyword arguments. Because the row is written in the caller's
+transaction, the job only becomes visible if that transaction commits. Worker
+processes started by ``manage.py run_workers`` claim ready jobs, highest
+``priority`` first, and run them:
+
+* On backends that support it, claiming uses ``SELECT ... FOR UPDATE SKIP
+  LOCKED``, so workers never wait on each other.
+* On SQLite, claiming is a conditional ``UPDATE ... WHERE status = 'queued'``;
+  SQLite serializes writers, which makes that a compare-and-set.
+
+A failing job is retried with exponential backoff and jitter until
+``max_attempts`` is used up, then left as failed with its traceback. A job
+whose worker died is requeued once its lock is older than
+``JOBS_LOCK_TIMEOUT``; while a job runs, a heartbeat thread refreshes its lock
+every ``JOBS_HEARTBEAT_INTERVAL`` seconds, so a long task is not mistaken for a
+lost one. Tasks must be idempotent, since a crash between running a job and
+recording it can run it again.
+
+With ``JOBS_EAGER`` the job runs in-process right after the transaction commits
+instead, for development without a worker.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def task_path(func):
+    return func if isinstance(func, str) else f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, priority=0, delay=None, max_attempts=None, unique=False, **kwargs):
+    """
+    Queue ``func(**kwargs)``; ``func`` is a module-level function or its dotted path.
+
+    With ``unique`` nothing is added while an identical job is still queued.
+    One that is already running may have read its inputs before the change
+    that asked for this one, so it does not count. Returns the ``Job``, or
+    None when it was run eagerly or deduplicated.
+    """
+    path = task_path(func)
+    if getattr(settings, 'JOBS_EAGER', False):
+        transaction.on_commit(lambda: _call(path, kwargs))
+        return None
+    if unique and Job.objects.filter(task=path, kwargs=kwargs, status=Job.QUEUED).exists():
+        return None
+    return Job.objects.create(
+        task=path,
+        kwargs=kwargs,
+        priority=priority,
+        max_attempts=max_attempts or getattr(settings, 'JOBS_MAX_ATTEMPTS', 5),
+        run_at=timezone.now() + (delay or timedelta()),
+    )
+
+
+def enqueue_many(func, kwargs_list, priority=0, batch_size=None):
+    """
+    Queue ``func(**kwargs)`` for every ``kwargs`` in ``kwargs_list`` with bulk
+    INSERTs instead of one per job. Returns the number of jobs queued.
+    """
+    path = task_path(func)
+    kwargs_list = list(kwargs_list)
+    if getattr(settings, 'JOBS_EAGER', False):
+        for kwargs in kwargs_list:
+            transaction.on_commit(lambda kwargs=kwargs: _call(path, kwargs))
+        return len(kwargs_list)
+    now = timezone.now()
+    max_attempts = getattr(settings, 'JOBS_MAX_ATTEMPTS', 5)
+    Job.objects.bulk_create(
+        [Job(task=path, kwargs=kwargs, priority=priority, max_attempts=max_attempts, run_at=now) for kwargs in kwargs_list],
+        batch_size=batch_size,
+    )
+    return len(kwargs_list)
+
+
+def _call(path, kwargs):
+    try:
+        import_string(path)(**kwargs)
+    except Exception:
+        logger.exception('Eager job %s failed', path)
+
+
+def claim(worker_id):
+    """Lock the next ready job for ``worker_id`` and return it, or None."""
+    now = timezone.now()
+    ready = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by('-priority', 'run_at', 'pk')
+    lock = {'status': Job.RUNNING, 'locked_by': worker_id, 'locked_at': now, 'attempts': F('attempts') + 1}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = ready.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            Job.objects.filter(pk=job.pk).update(**lock)
+    else:
+        for job in ready[:10]:
+            if Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(**lock):
+                break
+        else:
+            return None
+    job.refresh_from_db()
+    return job
+
+
+def backoff(attempts):
+    base = getattr(settings, 'JOBS_RETRY_BACKOFF', 30)
+    ceiling = getattr(settings, 'JOBS_RETRY_BACKOFF_MAX', 3600)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), ceiling) * random.uniform(1, 1.5))
+
+
+def heartbeat(job):
+    """Refresh the lock on a running ``job``; returns False once it is no longer ours."""
+    return bool(Job.objects.filter(pk=job.pk, locked_by=job.locked_by, status=Job.RUNNING).update(
+        locked_at=timezone.now(),
+    ))
+
+
+def _beat(job, stop, interval):
+    try:
+        while not stop.wait(interval) and heartbeat(job):
+            pass
+    except Exception:
+        logger.exception('Heartbeat for job %s failed', job.pk)
+    finally:
+        # The thread opened its own connection.
+        connection.close()
+
+
+def run(job):
+    """Run a claimed job and record the outcome; returns True on success."""
+    mine = Job.objects.filter(pk=job.pk, locked_by=job.locked_by, status=Job.RUNNING)
+    started = time.monotonic()
+    interval = getattr(settings, 'JOBS_HEARTBEAT_INTERVAL', 60)
+    stop_beating = threading.Event()
+    threading.Thread(target=_beat, args=(job, stop_beating, interval), daemon=True).start()
+    try:
+        import_string(job.task)(**job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.error('Job %s (%s) failed permanently after %s attempts', job.pk, job.task, job.attempts)
+            mine.update(status=Job.FAILED, last_error=error, finished_at=timezone.now(), locked_by='')
+        else:
+            delay = backoff(job.attempts)
+            logger.warning('Job %s (%s) failed, retrying in %.0fs', job.pk, job.task, delay.total_seconds())
+            mine.update(status=Job.QUEUED, last_error=error, run_at=timezone.now() + delay, locked_by='')
+        return False
+    finally:
+        stop_beating.set()
+    mine.update(status=Job.DONE, finished_at=timezone.now(), locked_by='')
+    logger.debug('Job %s (%s) done in %.2fs', job.pk, job.task, time.monotonic() - started)
+    return True
+
+
+def requeue_stale():
+    """Release jobs whose worker stopped before finishing them."""
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'JOBS_LOCK_TIMEOUT', 600))
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, last_error='Worker lost', finished_at=timezone.now(), locked_by='',
+    )
+    requeued = stale.update(status=Job.QUEUED, locked_by='')
+    return requeued, failed
+
+
+def purge_finished():
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'JOBS_KEEP_DONE', 60 * 60 * 24))
+    return Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()[0]
+
+
+def worker_name(index=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+
+def work(worker_id, stop=None, burst=False):
+    """
+    Claim and run jobs until ``stop`` (a ``threading.Event``) is set.
+
+    With ``burst`` the loop also ends once no job is ready. Returns the number
+    of jobs run.
+    """
+    stop = stop or threading.Event()
+    poll_interval = getattr(settings, 'JOBS_POLL_INTERVAL', 1.0)
+    processed = 0
+    next_housekeeping = 0
+    while not stop.is_set():
+        close_old_connections()
+        if time.monotonic() >= next_housekeeping:
+            requeue_stale()
+            purge_finished()
+            next_housekeeping = time.monotonic() + 60
+        job = claim(worker_id)
+        if job is None:
+            if burst:
+                break
+            stop.wait(poll_interval)
+            continue
+        run(job)
+        processed += 1
+    return processed
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import counters, fragments
+from core.models import Case, Document
+from core.storage import blob_digest, describe_file
+
+READ_SIZE = 64 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Populate size, MIME type, extension and SHA-256 for documents uploaded '
+        'before they were recorded. Safe to interrupt: rerunning picks up the rows '
+        'that are still missing metadata.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        pending = Document.objects.filter(size_bytes__isnull=True).order_by('pk')
+        last_pk = 0
+        updated = missing = 0
+        started = time.monotonic()
+        while True:
+            # Seek past rows already handled (including ones whose file is gone)
+            # so every run makes progress and each batch commits on its own.
+            batch = list(pending.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            changed = []
+            for document in batch:
+                if self._describe(document):
+                    changed.append(document)
+                else:
+                    missing += 1
+            Document.objects.bulk_update(changed, ['size_bytes', 'mime_type', 'extension', 'sha256', 'original_name'])
+            case_ids = {document.case_id for document in changed}
+            fragments.bump(*(fragments.Ref('core.Case', case_id) for case_id in case_ids))
+            # bulk_update skips the signals that keep the clients' byte totals.
+            counters.reconcile(Case.objects.filter(pk__in=case_ids).values('client_id'))
+            updated += len(changed)
+            self.stdout.write(f'{updated} documents updated, {missing} files missing (last id {last_pk})')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {updated} documents in {elapsed:.1f}s; {missing} files missing.'))
+
+    def _describe(self, document):
+        if not document.file:
+            return False
+        storage = document.file.storage
+        try:
+            digest = blob_digest(document.file.name)
+            if digest:
+                # Content-addressed blobs carry their digest in the name.
+                size = storage.size(document.file.name)
+            else:
+                hasher = hashlib.sha256()
+                size = 0
+                with storage.open(document.file.name, 'rb') as handle:
+                    for chunk in iter(lambda: handle.read(READ_SIZE), b''):
+                        hasher.update(chunk)
+                        size += len(chunk)
+                digest = hasher.hexdigest()
+        except FileNotFoundError:
+            return False
+        if not document.original_name:
+            document.original_name = os.path.basename(document.file.name)
+        document.size_bytes = size
+        document.sha256 = digest
+        document.extension, document.mime_type = describe_file(document.original_name)
+        return True
@@ -0,0 +1,181 @@
+import asyncio
+import importlib
+import io
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client as TestClient, override_settings
+from django.urls import clear_url_caches
+
+from core.models import User
+
+HOST = 'localhost'
+
+
+@contextmanager
+def routing(async_views):
+    """Serve the read-heavy pages from core.async_views (or core.views) while the block runs."""
+    def reload():
+        for name in ('core.urls', settings.ROOT_URLCONF):
+            importlib.reload(importlib.import_module(name))
+        clear_url_caches()
+
+    try:
+        with override_settings(ASYNC_VIEWS=async_views):
+            reload()
+            yield
+    finally:
+        reload()
+
+
+def summarize(label, latencies, statuses, elapsed):
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    errors = sum(1 for status in statuses if status >= 400)
+    return {
+        'mode': label,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed if elapsed else 0,
+        'p50': cuts[49] * 1000,
+        'p90': cuts[89] * 1000,
+        'p99': cuts[98] * 1000,
+        'max': max(latencies) * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure p50/p90/p99 latency of a page under concurrent load, in process, '
+        'through the WSGI handler with the sync views (one thread per concurrent '
+        'request, like a threaded WSGI server) and through the ASGI handler with '
+        'the async views (one event loop). No network or server is involved, so '
+        'the figures compare the two Django stacks only.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='/dashboard/', help='Path and query string to request')
+        parser.add_argument('--user', help='Username to log in as (default: anonymous)')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--mode', choices=['both', 'wsgi', 'asgi'], default='both')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        total = max(1, options['requests'])
+        concurrency = max(1, options['concurrency'])
+        cookie = self._session_cookie(options['user'])
+
+        results = []
+        if options['mode'] in ('both', 'wsgi'):
+            with routing(async_views=False):
+                self._run_wsgi(path, cookie, options['warmup'], 1)
+                started = time.perf_counter()
+                latencies, statuses = self._run_wsgi(path, cookie, total, concurrency)
+                results.append(summarize('WSGI (sync views)', latencies, statuses, time.perf_counter() - started))
+        if options['mode'] in ('both', 'asgi'):
+            with routing(async_views=True):
+                asyncio.run(self._run_asgi(path, cookie, options['warmup'], 1))
+                started = time.perf_counter()
+                latencies, statuses = asyncio.run(self._run_asgi(path, cookie, total, concurrency))
+                results.append(summarize('ASGI (async views)', latencies, statuses, time.perf_counter() - started))
+
+        self.stdout.write(f'{path}: {total} requests, concurrency {concurrency}')
+        self.stdout.write(f'{"mode":<20} {"req/s":>8} {"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8} {"max ms":>8} {"errors":>7}')
+        for row in results:
+            self.stdout.write(
+                f'{row["mode"]:<20} {row["rps"]:>8.1f} {row["p50"]:>8.1f} {row["p90"]:>8.1f} '
+                f'{row["p99"]:>8.1f} {row["max"]:>8.1f} {row["errors"]:>7}'
+            )
+
+    def _session_cookie(self, username):
+        if not username:
+            return ''
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            raise CommandError(f'No user named {username}.')
+        client = TestClient()
+        client.force_login(user)
+        return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+    def _run_wsgi(self, path, cookie, total, concurrency):
+        handler = WSGIHandler()
+        url = urlsplit(path)
+
+        def one(_):
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': url.path,
+                'QUERY_STRING': url.query,
+                'SERVER_NAME': HOST,
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': HOST,
+                'HTTP_COOKIE': cookie,
+                'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.version': (1, 0),
+                'wsgi.url_scheme': 'http',
+                'wsgi.input': io.BytesIO(),
+                'wsgi.errors': sys.stderr,
+                'wsgi.multithread': True,
+                'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            status = []
+            started = time.perf_counter()
+            body = handler(environ, lambda line, headers, exc_info=None: status.append(int(line[:3])))
+            for _ in body:
+                pass
+            if hasattr(body, 'close'):
+                body.close()
+            return time.perf_counter() - started, status[0]
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(total)))
+        return [r[0] for r in results], [r[1] for r in results]
+
+    async def _run_asgi(self, path, cookie, total, concurrency):
+        handler = ASGIHandler()
+        url = urlsplit(path)
+        headers = [(b'host', HOST.encode())]
+        if cookie:
+            headers.append((b'cookie', cookie.encode()))
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one():
+            sent_body = False
+            never = asyncio.Event()
+            status = []
+
+            async def receive():
+                nonlocal sent_body
+                if not sent_body:
+                    sent_body = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await never.wait()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': url.path, 'raw_path': url.path.encode(),
+                'query_string': url.query.encode(), 'root_path': '', 'headers': headers,
+                'client': ('127.0.0.1', 50000), 'server': (HOST, 80),
+            }
+            async with gate:
+                started = time.perf_counter()
+                await handler(scope, receive, send)
+                return time.perf_counter() - started, status[0]
+
+        results = await asyncio.gather(*(one() for _ in range(total)))
+        return [r[0] for r in results], [r[1] for r in results]
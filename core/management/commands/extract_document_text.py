@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import extraction, search
+from core.models import Document, DocumentText
+
+
+class Command(BaseCommand):
+    help = (
+        'Extract searchable text from documents whose content has not been '
+        'extracted yet and update their search rows. Files are keyed by SHA-256, '
+        'so unchanged content is never read twice.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-extract content that already has text')
+
+    def handle(self, *args, **options):
+        documents = Document.objects.exclude(sha256='').exclude(file='').order_by('sha256', 'pk')
+        if not options['force']:
+            documents = documents.exclude(sha256__in=DocumentText.objects.values('sha256'))
+
+        extracted = indexed = 0
+        statuses = {}
+        started = time.monotonic()
+        current = entry = None
+        for document in documents.iterator():
+            if document.sha256 != current:
+                current = document.sha256
+                entry = extraction.document_text(document, force=options['force'])
+                statuses[entry.status] = statuses.get(entry.status, 0) + 1
+                extracted += 1
+                if extracted % 100 == 0:
+                    self.stdout.write(f'{extracted} files extracted, {indexed} documents indexed')
+            search.index_document(document, entry.text)
+            indexed += 1
+
+        summary = ', '.join(f'{count} {status}' for status, count in sorted(statuses.items())) or 'nothing to do'
+        self.stdout.write(self.style.SUCCESS(
+            f'Extracted {extracted} files ({summary}) for {indexed} documents '
+            f'in {time.monotonic() - started:.1f}s.'
+        ))
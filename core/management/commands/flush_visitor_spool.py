@@ -0,0 +1,50 @@
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import inquiries
+
+TICK = 0.1
+
+
+class Command(BaseCommand):
+    help = (
+        'Insert landing-page inquiries spooled under VISITOR_SPOOL_DIR into the '
+        'database in batches. With --loop, keep flushing every '
+        'VISITOR_SPOOL_INTERVAL seconds, or sooner once VISITOR_SPOOL_MAX_BYTES '
+        'are waiting; SIGTERM/SIGINT flush once more and exit.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running instead of flushing once')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Rows per INSERT (default: settings.VISITOR_SPOOL_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        if not inquiries.spool_dir():
+            raise CommandError('VISITOR_SPOOL_DIR is not set; inquiries are saved directly.')
+        batch_size = options['batch_size']
+        if not options['loop']:
+            started = time.monotonic()
+            flushed = inquiries.flush(batch_size)
+            self.stdout.write(self.style.SUCCESS(
+                f'Flushed {flushed} inquiries in {time.monotonic() - started:.2f}s.'
+            ))
+            return
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+        interval = getattr(settings, 'VISITOR_SPOOL_INTERVAL', 2)
+        max_bytes = getattr(settings, 'VISITOR_SPOOL_MAX_BYTES', 256 * 1024)
+        total = 0
+        last = time.monotonic()
+        while not stop.wait(TICK):
+            if time.monotonic() - last >= interval or inquiries.pending_bytes() >= max_bytes:
+                total += inquiries.flush(batch_size)
+                last = time.monotonic()
+        total += inquiries.flush(batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Flusher stopped after {total} inquiries.'))
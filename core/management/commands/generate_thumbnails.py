@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import thumbnails
+from core.models import Document
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate thumbnails for image documents that do not have one yet. '
+        'Documents sharing a stored file are processed once.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate existing thumbnails too')
+
+    def handle(self, *args, **options):
+        names = (
+            Document.objects.filter(mime_type__startswith='image/')
+            .exclude(file='')
+            .order_by('file')
+            .values_list('file', flat=True)
+            .distinct()
+        )
+        storage = Document._meta.get_field('file').storage
+        generated = failed = 0
+        started = time.monotonic()
+        for name in names.iterator():
+            if thumbnails.generate(storage, name, force=options['force']):
+                generated += 1
+            else:
+                failed += 1
+                self.stderr.write(f'No thumbnail for {name}')
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{generated} thumbnails up to date, {failed} failed, in {elapsed:.1f}s.'
+        ))
@@ -0,0 +1,234 @@
+import csv
+import json
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from core import access, accounts, fragments, search
+from core.models import User, Client
+
+FIELDS = ('name', 'email', 'phone', 'address', 'date_of_birth')
+
+
+class RowError(Exception):
+    pass
+
+
+def read_csv(handle):
+    yield from csv.DictReader(handle)
+
+
+def read_ndjson(handle):
+    for line_number, line in enumerate(handle, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = {'_raw': line, '_error': f'Invalid JSON on line {line_number}'}
+        if not isinstance(row, dict):
+            row = {'_raw': line, '_error': f'Expected an object on line {line_number}'}
+        yield row
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _field(row, name, max_length=None):
+    value = row.get(name)
+    value = str(value).strip() if value is not None else ''
+    if max_length and len(value) > max_length:
+        raise RowError(f'{name} is longer than {max_length} characters')
+    return value
+
+
+def normalize(row):
+    """
+    Validate and normalize one input row in memory.
+
+    Applies the same rules as ``Client.clean`` without touching the database.
+    """
+    if row.get('_error'):
+        raise RowError(row['_error'])
+
+    email = _field(row, 'email').lower()
+    if not email:
+        raise RowError('Email is required.')
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise RowError('Enter a valid email address.')
+
+    name = _field(row, 'name', Client._meta.get_field('name').max_length)
+    if not name:
+        raise RowError('Name is required.')
+    name = ' '.join(part.capitalize() for part in name.split())
+
+    date_of_birth = _field(row, 'date_of_birth') or None
+    if date_of_birth:
+        try:
+            date_of_birth = parse_date(date_of_birth)
+        except ValueError:
+            date_of_birth = None
+        if date_of_birth is None:
+            raise RowError('Date of birth must be YYYY-MM-DD.')
+
+    return {
+        'name': name,
+        'email': email,
+        'phone': _field(row, 'phone', Client._meta.get_field('phone').max_length) or None,
+        'address': _field(row, 'address') or None,
+        'date_of_birth': date_of_birth,
+    }
+
+
+def allocate_username(email, taken):
+    """Pick a free username the way ``Client.save`` does, against an in-memory set."""
+    max_length = User._meta.get_field('username').max_length
+    base_username = email.split('@')[0][:max_length - 10]
+    username = base_username
+    counter = 1
+    while username in taken:
+        username = f"{base_username}_{counter}"
+        counter += 1
+    taken.add(username)
+    return username
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import clients (and their user accounts) from a CSV or NDJSON file. '
+        'Rows are validated in memory and inserted with bulk_create in batches; '
+        'rejected rows are written to a side file. Every imported client is '
+        'queued an activation email, with links on --base-url.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row, or NDJSON (one object per line)')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--rejects', help='Where to write rejected rows (default: <path>.rejected.<ext>)')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing to the database')
+        parser.add_argument('--base-url', help='Site URL for activation links (default: settings.SITE_URL)')
+        parser.add_argument('--no-activation', action='store_true',
+                            help='Do not queue activation emails; clients cannot log in until sent one')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist.')
+        fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        reject_path = options['rejects'] or f'{path}.rejected.{fmt}'
+        batch_size = max(1, options['batch_size'])
+        dry_run = options['dry_run']
+        base_url = None if options['no_activation'] else (options['base_url'] or settings.SITE_URL)
+
+        # One pass over existing identities; every collision check after this
+        # is a set lookup.
+        taken_usernames = set(User.objects.values_list('username', flat=True))
+        taken_emails = {email.lower() for email in Client.objects.values_list('email', flat=True)}
+        taken_emails.update(email.lower() for email in User.objects.exclude(email='').values_list('email', flat=True))
+        unusable_password = make_password(None)
+
+        imported = rejected = activations = 0
+        started = time.monotonic()
+        with open(path, newline='', encoding='utf-8') as handle, \
+                open(reject_path, 'w', newline='', encoding='utf-8') as reject_handle:
+            rows = read_ndjson(handle) if fmt == 'ndjson' else read_csv(handle)
+            write_reject = self._reject_writer(fmt, reject_handle)
+
+            for chunk in chunked(rows, batch_size):
+                accepted = []
+                for row in chunk:
+                    try:
+                        data = normalize(row)
+                        if data['email'] in taken_emails:
+                            raise RowError('A client with this email already exists.')
+                    except RowError as e:
+                        write_reject(row, str(e))
+                        rejected += 1
+                        continue
+                    taken_emails.add(data['email'])
+                    accepted.append(data)
+
+                if accepted and not dry_run:
+                    activations += self._insert(accepted, taken_usernames, unusable_password, batch_size, base_url)
+                imported += len(accepted)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{imported} imported, {rejected} rejected '
+                    f'({(imported + rejected) / elapsed if elapsed else 0:.0f} rows/s)'
+                )
+
+        elapsed = time.monotonic() - started
+        if not rejected:
+            os.remove(reject_path)
+        summary = (
+            f'{"Validated" if dry_run else "Imported"} {imported} clients in {elapsed:.1f}s '
+            f'({(imported + rejected) / elapsed if elapsed else 0:.0f} rows/s).'
+        )
+        self.stdout.write(self.style.SUCCESS(summary))
+        if not dry_run:
+            self.stdout.write(f'{activations} activation emails queued.')
+        if rejected:
+            self.stdout.write(self.style.WARNING(f'{rejected} rows rejected, see {reject_path}'))
+
+    def _insert(self, accepted, taken_usernames, password, batch_size, base_url):
+        """Insert one chunk; returns the number of activation emails queued."""
+        users = []
+        for data in accepted:
+            first_name, _, last_name = data['name'].partition(' ')
+            users.append(User(
+                username=allocate_username(data['email'], taken_usernames),
+                email=data['email'],
+                first_name=first_name,
+                last_name=last_name,
+                password=password,
+                is_active=True,
+            ))
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=batch_size)
+            clients = Client.objects.bulk_create(
+                [Client(user=user, **data) for user, data in zip(users, accepted)],
+                batch_size=batch_size,
+            )
+            search.index_new_clients(clients)
+            access.sync([client.pk for client in clients])
+            # bulk_create sends no post_save, so retire client listings here.
+            fragments.bump(fragments.Ref('core.Client'))
+            if base_url is None:
+                return 0
+            # Imported passwords are unusable, so the activation link is the only way in.
+            return accounts.queue_activation_emails(users, base_url, batch_size=batch_size)
+
+    def _reject_writer(self, fmt, handle):
+        if fmt == 'ndjson':
+            def write(row, error):
+                if '_raw' in row:
+                    row = {'raw': row['_raw']}
+                handle.write(json.dumps({**row, 'error': error}, default=str) + '\n')
+            return write
+
+        writer = csv.DictWriter(handle, fieldnames=[*FIELDS, 'error'], extrasaction='ignore')
+        writer.writeheader()
+
+        def write(row, error):
+            writer.writerow({**row, 'error': error})
+        return write
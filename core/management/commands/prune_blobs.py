@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Blob, DocumentText
+from core.storage import blob_name, document_storage
+
+
+class Command(BaseCommand):
+    help = 'Delete stored document blobs that no Document references any more.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=60,
+                            help='Only prune blobs created at least this many minutes ago (default: 60)')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['min_age'])
+        orphans = Blob.objects.filter(ref_count=0, documents__isnull=True, created_at__lt=cutoff)
+        pruned = freed = 0
+        for blob in orphans.iterator():
+            if options['dry_run']:
+                pruned += 1
+                freed += blob.size
+                continue
+            # Re-check in the DELETE itself in case the blob was re-referenced.
+            deleted, _ = Blob.objects.filter(pk=blob.pk, ref_count=0, documents__isnull=True).delete()
+            if not deleted:
+                continue
+            DocumentText.objects.filter(pk=blob.sha256).delete()
+            prefix = blob_name(blob.sha256)
+            directory = prefix.rsplit('/', 1)[0]
+            try:
+                filenames = document_storage.listdir(directory)[1]
+            except FileNotFoundError:
+                filenames = []
+            for filename in filenames:
+                if filename.startswith(blob.sha256):
+                    document_storage.delete(f'{directory}/{filename}')
+            pruned += 1
+            freed += blob.size
+        verb = 'Would prune' if options['dry_run'] else 'Pruned'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {pruned} blobs ({freed} bytes).'))
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import UploadSession
+from core.uploads import discard_chunks
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked upload sessions that were abandoned or have completed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=48,
+                            help='Purge unfinished sessions older than this many hours (default: 48)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than'])
+        purged = 0
+        for session in UploadSession.objects.filter(created_at__lt=cutoff).iterator():
+            discard_chunks(session)
+            session.delete()
+            purged += 1
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} upload sessions.'))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search tables used by the dashboard and document search.'
+
+    def handle(self, *args, **options):
+        if not search.fts_enabled():
+            raise CommandError('Full-text search tables are only used on SQLite.')
+        started = time.monotonic()
+        cases, clients, documents = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {cases} cases, {clients} clients and {documents} documents '
+            f'in {time.monotonic() - started:.2f}s.'
+        ))
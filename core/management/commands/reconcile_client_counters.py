@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the case and document totals stored on each client with the '
+        'cases and documents themselves, and repair the ones that drifted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without repairing it')
+
+    def handle(self, *args, **options):
+        rows = counters.reconcile(dry_run=options['dry_run'])
+        for row in rows:
+            changes = ', '.join(
+                f"{field} {row[field]} -> {row[f'expected_{field}']}"
+                for field in counters.FIELDS
+                if row[field] != row[f'expected_{field}']
+            )
+            self.stdout.write(f"{row['name']} (id {row['pk']}): {changes}")
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(rows)} clients with drifted counters.'))
@@ -0,0 +1,80 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _worker_process(index, burst):
+    """Entry point of one worker process."""
+    import django
+    django.setup()
+
+    from core import jobs
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    jobs.work(jobs.worker_name(index), stop=stop, burst=burst)
+
+
+class Command(BaseCommand):
+    help = (
+        'Run background job workers. Each process claims jobs from the database '
+        'queue one at a time; SIGTERM/SIGINT finish the current job and exit.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Number of worker processes (default: settings.JOBS_WORKERS)')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is ready instead of polling')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'] or getattr(settings, 'JOBS_WORKERS', 2))
+        burst = options['burst']
+
+        if processes == 1:
+            from core import jobs
+
+            stop = threading.Event()
+            signal.signal(signal.SIGTERM, lambda *_: stop.set())
+            signal.signal(signal.SIGINT, lambda *_: stop.set())
+            processed = jobs.work(jobs.worker_name(), stop=stop, burst=burst)
+            self.stdout.write(self.style.SUCCESS(f'Worker stopped after {processed} jobs.'))
+            return
+
+        # Children must not share the parent's database connections.
+        connections.close_all()
+        stopping = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+        signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+        workers = {}
+
+        def start(index):
+            process = multiprocessing.Process(target=_worker_process, args=(index, burst), daemon=False)
+            process.start()
+            workers[index] = process
+
+        for index in range(processes):
+            start(index)
+        self.stdout.write(f'Started {processes} workers.')
+
+        while workers and not stopping.is_set():
+            for index, process in list(workers.items()):
+                if process.is_alive():
+                    continue
+                del workers[index]
+                if not burst and process.exitcode != 0:
+                    self.stderr.write(f'Worker {index} exited with {process.exitcode}, restarting.')
+                    start(index)
+            stopping.wait(1)
+
+        for process in workers.values():
+            process.terminate()
+        for process in workers.values():
+            process.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.notifications import send_pending
+
+
+class Command(BaseCommand):
+    help = 'Send queued notification emails in batches over one connection per batch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        sent = send_pending(batch_size=max(1, options['batch_size']))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {sent} emails in {elapsed:.2f}s ({sent / elapsed if elapsed else 0:.0f} msg/s).'
+        ))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import notifications, reminders
+
+
+class Command(BaseCommand):
+    help = (
+        'Queue reminders for upcoming case due dates and appointments, skipping '
+        'those already sent, and email the outbox in batches over one connection '
+        'per batch. Run it every few minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        queued, skipped = reminders.queue_due()
+        queued_at = time.monotonic()
+        sent = notifications.send_pending(batch_size=max(1, options['batch_size']))
+        elapsed = time.monotonic() - queued_at
+        self.stdout.write(
+            f'Queued {queued} reminders ({skipped} already queued) in {queued_at - started:.2f}s.'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {sent} emails in {elapsed:.2f}s ({sent / elapsed if elapsed else 0:.0f} msg/s).'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core import throttle
+
+
+class Command(BaseCommand):
+    help = 'Show how many POSTs each throttled endpoint has rejected (see settings.THROTTLES).'
+
+    def handle(self, *args, **options):
+        for endpoint, rejected in sorted(throttle.rejections().items()):
+            self.stdout.write(f'{endpoint}: {rejected} rejected')
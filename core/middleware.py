@@ -0,0 +1,132 @@
+import logging
+import math
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.functional import SimpleLazyObject
+
+from . import objectcache, throttle
+from .instrumentation import query_budget, track_queries
+from .principal import get_principal
+
+logger = logging.getLogger(__name__)
+
+
+class PrincipalMiddleware:
+    """
+    Attach ``request.principal``, resolved lazily from ``request.user``.
+
+    Must come after ``AuthenticationMiddleware``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.principal = SimpleLazyObject(lambda: get_principal(request.user))
+        return self.get_response(request)
+
+
+class QueryBudgetMiddleware:
+    """
+    Count SQL queries and database time per request.
+
+    Figures are logged against the resolved URL name; GET and HEAD requests
+    that exceed the view's entry in ``settings.QUERY_BUDGETS`` are logged as
+    warnings. With
+    ``DEBUG`` on, the count and time are also sent as ``X-DB-Queries`` and
+    ``X-DB-Time`` response headers. Place it first so queries issued by other
+    middleware (sessions, auth) are included.
+
+    Both middleware here are async-capable so that, under ASGI, requests do
+    not pass through Django's single thread-sensitive executor on the way to
+    an async view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with track_queries() as stats:
+            response = self.get_response(request)
+        return self.report(request, response, stats)
+
+    async def __acall__(self, request):
+        with track_queries() as stats:
+            response = await self.get_response(request)
+        return self.report(request, response, stats)
+
+    def report(self, request, response, stats):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        budget = query_budget(view_name, request.method)
+        if budget is not None and stats.count > budget:
+            logger.warning(
+                "%s ran %d queries (budget %d) in %.1f ms",
+                view_name, stats.count, budget, stats.duration_ms,
+            )
+        else:
+            logger.debug("%s ran %d queries in %.1f ms", view_name, stats.count, stats.duration_ms)
+
+        if settings.DEBUG:
+            response['X-DB-Queries'] = str(stats.count)
+            response['X-DB-Time'] = f'{stats.duration_ms:.1f}ms'
+            cached = objectcache.stats()
+            response['X-Object-Cache'] = f"hits={cached['hits']} misses={cached['misses']} size={cached['size']}"
+        return response
+
+
+class ThrottleMiddleware:
+    """
+    Answer POSTs over their ``settings.THROTTLES`` limits with 429 (see
+    ``core.throttle``).
+
+    Only POSTs are resolved and checked, before sessions, CSRF or the view
+    touch the database or hash a password. Place it ahead of
+    ``SessionMiddleware``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.check(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        rejected = None
+        if request.method == 'POST':
+            rejected = await sync_to_async(self.check, thread_sensitive=False)(request)
+        return rejected or await self.get_response(request)
+
+    def check(self, request):
+        if request.method != 'POST' or not getattr(settings, 'THROTTLES', None):
+            return None
+        try:
+            endpoint = resolve(request.path_info).view_name
+        except Resolver404:
+            return None
+        wait = throttle.take(endpoint, request)
+        if not wait:
+            return None
+        logger.info("Throttled POST to %s from %s", endpoint, request.META.get('REMOTE_ADDR'))
+        response = HttpResponse('Too many requests. Please try again later.', status=429, content_type='text/plain')
+        response['Retry-After'] = str(math.ceil(wait))
+        return response
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_case_fts USING fts5("
+    "title, description, client_name, client_id UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_client_fts USING fts5("
+    "name, email, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    "INSERT INTO core_case_fts (rowid, title, description, client_name, client_id) "
+    "SELECT c.id, c.title, c.description, cl.name, c.client_id "
+    "FROM core_case c JOIN core_client cl ON cl.id = c.client_id",
+    "INSERT INTO core_client_fts (rowid, name, email) SELECT id, name, email FROM core_client",
+]
+
+DROP_SQL = [
+    "DROP TABLE IF EXISTS core_case_fts",
+    "DROP TABLE IF EXISTS core_client_fts",
+]
+
+
+def _run(statements):
+    def operation(apps, schema_editor):
+        # FTS5 is SQLite specific; other backends use the icontains fallback.
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_appointment'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
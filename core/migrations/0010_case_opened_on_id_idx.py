@@ -0,0 +1,17 @@
+# Generated by Django 5.0 on 2026-10-17 04:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['opened_on', 'id'], name='case_opened_on_id_idx'),
+        ),
+    ]
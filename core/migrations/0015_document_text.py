@@ -0,0 +1,46 @@
+# Generated by Django 5.0 on 2026-10-17 04:45
+
+from django.db import migrations, models
+
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_document_fts USING fts5("
+    "title, content, case_id UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    "INSERT INTO core_document_fts (rowid, title, content, case_id) "
+    "SELECT id, title, '', case_id FROM core_document",
+]
+
+DROP_SQL = [
+    "DROP TABLE IF EXISTS core_document_fts",
+]
+
+
+def _run(statements):
+    def operation(apps, schema_editor):
+        # FTS5 is SQLite specific; other backends use the icontains fallback.
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_document_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentText',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('text', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('ok', 'Extracted'), ('empty', 'No text layer'), ('unsupported', 'Unsupported type'), ('failed', 'Extraction failed')], max_length=12)),
+                ('extracted_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
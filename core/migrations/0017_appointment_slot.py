@@ -0,0 +1,61 @@
+# Generated by Django 5.0 on 2026-10-17 04:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_slots(apps, schema_editor):
+    """
+    Give existing appointments a firm-wide slot, oldest booking first.
+
+    Times are rounded down to the slot grid. Later bookings of a slot that is
+    already taken (the double-bookings this table prevents from now on) are
+    left without one for staff to resolve.
+    """
+    Appointment = apps.get_model('core', 'Appointment')
+    AppointmentSlot = apps.get_model('core', 'AppointmentSlot')
+    minutes = getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 30)
+    taken = set()
+    slots = []
+    for pk, date, time in Appointment.objects.order_by('created_at', 'pk').values_list('pk', 'date', 'time'):
+        start = (time.hour * 60 + time.minute) // minutes * minutes
+        key = (date, time.replace(hour=start // 60, minute=start % 60, second=0, microsecond=0))
+        if key in taken:
+            continue
+        taken.add(key)
+        slots.append(AppointmentSlot(appointment_id=pk, date=key[0], time=key[1]))
+    AppointmentSlot.objects.bulk_create(slots, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('appointment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='slot', to='core.appointment')),
+                ('lawyer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='appointment_slots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date', 'time'],
+                'indexes': [models.Index(fields=['date', 'time'], name='slot_range_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='appointmentslot',
+            constraint=models.UniqueConstraint(condition=models.Q(('lawyer__isnull', False)), fields=('lawyer', 'date', 'time'), name='slot_lawyer_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointmentslot',
+            constraint=models.UniqueConstraint(condition=models.Q(('lawyer__isnull', True)), fields=('date', 'time'), name='slot_firm_unique'),
+        ),
+        migrations.RunPython(backfill_slots, migrations.RunPython.noop),
+    ]
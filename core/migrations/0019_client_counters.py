@@ -0,0 +1,54 @@
+# Generated by Django 5.0 on 2026-10-17 05:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def count_existing(apps, schema_editor):
+    Client = apps.get_model('core', 'Client')
+    Case = apps.get_model('core', 'Case')
+    Document = apps.get_model('core', 'Document')
+    cases = Case.objects.filter(client=OuterRef('pk')).order_by().values('client')
+    documents = Document.objects.filter(case__client=OuterRef('pk')).order_by().values('case__client')
+
+    def total(queryset, aggregate):
+        return Coalesce(Subquery(queryset.annotate(total=aggregate).values('total')), Value(0))
+
+    Client.objects.update(
+        case_count=total(cases, Count('pk')),
+        open_case_count=total(cases.exclude(status='closed'), Count('pk')),
+        document_count=total(documents, Count('pk')),
+        document_bytes=total(documents, Sum('size_bytes')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_calendar_feeds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='case_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='document_bytes',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='document_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='open_case_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0 on 2026-10-17 05:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def grant_existing(apps, schema_editor):
+    Client = apps.get_model('core', 'Client')
+    Case = apps.get_model('core', 'Case')
+    ObjectAccess = apps.get_model('core', 'ObjectAccess')
+    rows = {
+        (user_id, client_id, None)
+        for client_id, user_id in Client.objects.exclude(user=None).values_list('pk', 'user_id')
+    }
+    for case_id, client_id, owner_id, lawyer_id in Case.objects.values_list('pk', 'client_id', 'client__user_id', 'lawyer_id'):
+        for user_id in {owner_id, lawyer_id} - {None}:
+            rows.add((user_id, client_id, case_id))
+    ObjectAccess.objects.bulk_create(
+        [ObjectAccess(user_id=user_id, client_id=client_id, case_id=case_id) for user_id, client_id, case_id in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_client_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ObjectAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('case', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.case')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.client')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='object_access', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'client'], name='access_user_client_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='objectaccess',
+            constraint=models.UniqueConstraint(condition=models.Q(('case__isnull', False)), fields=('user', 'case'), name='access_case_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='objectaccess',
+            constraint=models.UniqueConstraint(condition=models.Q(('case__isnull', True)), fields=('user', 'client'), name='access_client_unique'),
+        ),
+        migrations.RunPython(grant_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0 on 2026-10-17 05:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_object_access'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='appointment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.appointment'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='case',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.case'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='due_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(choices=[('welcome', 'Welcome'), ('case_due', 'Case due'), ('appointment', 'Appointment reminder')], max_length=30),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['date', 'time'], name='appointment_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['due_date'], name='case_due_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('case__isnull', False)), fields=('case', 'due_at', 'user'), name='notification_case_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('appointment__isnull', False)), fields=('appointment', 'due_at', 'user'), name='notification_appointment_unique'),
+        ),
+    ]
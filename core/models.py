@@ -1,7 +1,13 @@
+import os
+import uuid
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 
+from .storage import blob_digest, describe_file, document_storage, release_blob, retain_blob
+
 class User(AbstractUser):
     """Custom user for future role tweaks (leave empty for now)."""
 
@@ -11,6 +17,22 @@ class User(AbstractUser):
         return getattr(self, 'client_profile', None)
 
 
+class PendingRegistrationManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_active=False, client_profile__isnull=False)
+
+
+class PendingRegistration(User):
+    """Self-registered client accounts awaiting admin approval."""
+
+    objects = PendingRegistrationManager()
+
+    class Meta:
+        proxy = True
+        verbose_name = 'Pending Registration'
+        verbose_name_plural = 'Pending Registrations'
+
+
 class Client(models.Model):
     user = models.OneToOneField(
         User, 
@@ -57,6 +79,12 @@ class Client(models.Model):
         null=True,  # Make nullable for existing data
         blank=True  # Allow blank in forms
     )
+    # Maintained by core.counters from Case and Document signals
+    COUNTERS = ('case_count', 'open_case_count', 'document_count', 'document_bytes')
+    case_count = models.PositiveIntegerField(default=0, editable=False)
+    open_case_count = models.PositiveIntegerField(default=0, editable=False)
+    document_count = models.PositiveIntegerField(default=0, editable=False)
+    document_bytes = models.PositiveBigIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['name']
@@ -128,11 +156,18 @@ class Client(models.Model):
         self.full_clean()
         
         is_new = self._state.adding
+        if not is_new and not args and kwargs.get('update_fields') is None:
+            # The totals only change through F() updates (core.counters); writing
+            # this instance's copy back would undo the ones made since it loaded.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTERS
+            ]
         
         try:
             with transaction.atomic():
                 # If this is a new client, create the User first
-                if is_new and not hasattr(self, 'user'):
+                if is_new and self.user_id is None:
                     base_username = self.email.split('@')[0]
                     username = base_username
                     counter = 1
@@ -142,19 +177,18 @@ class Client(models.Model):
                         username = f"{base_username}_{counter}"
                         counter += 1
                     
-                    # Create the user with the cleaned data
-                    user = User.objects.create_user(
+                    # Set names from the client's name
+                    name_parts = self.name.split(' ', 1)
+                    user = User(
                         username=username,
                         email=self.email,
-                        password=User.objects.make_random_password(),  # Temporary password, will be set by the form
+                        first_name=name_parts[0],
+                        last_name=name_parts[1] if len(name_parts) > 1 else '',
                         is_active=True
                     )
-                    
-                    # Set names from the client's name
-                    name_parts = self.name.split(' ', 1)
-                    user.first_name = name_parts[0]
-                    if len(name_parts) > 1:
-                        user.last_name = name_parts[1]
+                    # No password is hashed here: the client picks one by
+                    # redeeming an activation token (see core.accounts).
+                    user.set_unusable_password()
                     user.save()
                     
                     self.user = user
@@ -218,26 +252,169 @@ class Case(models.Model):
     status    = models.CharField(max_length=20, choices=STATUS, default='open')
     opened_on = models.DateField(auto_now_add=True)
     due_date  = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Seek key for the dashboard's keyset pagination
+            models.Index(fields=['opened_on', 'id'], name='case_opened_on_id_idx'),
+            # Range scans for calendar feeds and due-date reminders
+            models.Index(fields=['due_date'], name='case_due_date_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class ObjectAccess(models.Model):
+    """
+    A user's access to a client and, when ``case`` is set, one of its cases.
+
+    Clients' own accounts get a row for their profile and each of their
+    cases, assigned lawyers one per case. ``core.access`` keeps the rows in
+    step with ``Client.user`` and ``Case.client``/``Case.lawyer`` so that
+    row-level filters are a semi-join on an index instead of an OR across
+    joins.
+    """
+    user   = models.ForeignKey(User, on_delete=models.CASCADE, related_name='object_access')
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='+')
+    case   = models.ForeignKey(Case, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'client'], name='access_user_client_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'case'], condition=models.Q(case__isnull=False),
+                name='access_case_unique',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'client'], condition=models.Q(case__isnull=True),
+                name='access_client_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> client {self.client_id}, case {self.case_id or '*'}"
+
+
+class Blob(models.Model):
+    """A unique piece of uploaded content, shared by every Document that has it."""
+    sha256     = models.CharField(max_length=64, primary_key=True)
+    size       = models.BigIntegerField()
+    ref_count  = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+
 class Document(models.Model):
-    title       = models.CharField(max_length=255, default='Untitled Document')
-    case        = models.ForeignKey(Case, on_delete=models.CASCADE)
-    file        = models.FileField(upload_to='docs/')
-    uploaded_at = models.DateTimeField(auto_now_add=True)
+    title         = models.CharField(max_length=255, default='Untitled Document')
+    case          = models.ForeignKey(Case, on_delete=models.CASCADE)
+    file          = models.FileField(upload_to='docs/', storage=document_storage)
+    original_name = models.CharField(max_length=255, blank=True, editable=False)
+    blob          = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, editable=False, related_name='documents')
+    # File metadata captured at upload time so listings never touch storage
+    size_bytes    = models.BigIntegerField(null=True, blank=True, editable=False)
+    mime_type     = models.CharField(max_length=100, blank=True, editable=False)
+    extension     = models.CharField(max_length=16, blank=True, editable=False)
+    sha256        = models.CharField(max_length=64, blank=True, editable=False, db_index=True)
+    uploaded_at   = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.title
 
+    @property
+    def display_name(self):
+        return self.original_name or os.path.basename(self.file.name)
+
+    def save(self, *args, **kwargs):
+        """
+        Store the upload in the content-addressed storage and keep the blob
+        reference count in step with the file this row points at.
+        """
+        from django.db import transaction
+
+        size = None
+        if self.file and not self.file._committed:
+            upload = self.file.file
+            self.original_name = os.path.basename(self.file.name)
+            self.file.save(self.file.name, upload, save=False)
+            size = upload.size
+            self.size_bytes = size
+            self.sha256 = getattr(upload, 'sha256', '')
+            self.extension, self.mime_type = describe_file(self.original_name)
+
+        digest = blob_digest(self.file.name) if self.file else None
+        previous = self.blob_id
+        with transaction.atomic():
+            if digest != previous:
+                if digest:
+                    retain_blob(digest, self.file.size if size is None else size)
+                self.blob_id = digest
+            super().save(*args, **kwargs)
+            if previous and previous != digest:
+                release_blob(previous)
+
+
+class DocumentText(models.Model):
+    """Text extracted from a stored file, shared by every document with that content."""
+    STATUS_CHOICES = [
+        ('ok', 'Extracted'),
+        ('empty', 'No text layer'),
+        ('unsupported', 'Unsupported type'),
+        ('failed', 'Extraction failed'),
+    ]
+    sha256       = models.CharField(max_length=64, primary_key=True)
+    text         = models.TextField(blank=True)
+    status       = models.CharField(max_length=12, choices=STATUS_CHOICES)
+    extracted_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.get_status_display()})"
+
+
+class UploadSession(models.Model):
+    """A resumable, chunked upload of one document (see core.uploads)."""
+    id          = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    case        = models.ForeignKey(Case, on_delete=models.CASCADE)
+    title       = models.CharField(max_length=255)
+    filename    = models.CharField(max_length=255)
+    size        = models.BigIntegerField()
+    chunk_size  = models.PositiveIntegerField()
+    created_by  = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at  = models.DateTimeField(auto_now_add=True)
+    document    = models.OneToOneField(Document, on_delete=models.SET_NULL, null=True, blank=True)
+
+    def __str__(self):
+        return f"Upload of {self.filename} ({self.size} bytes)"
+
+    @property
+    def chunk_count(self):
+        return -(-self.size // self.chunk_size)
+
+
+class UploadChunk(models.Model):
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name='chunks')
+    index   = models.PositiveIntegerField()
+    size    = models.PositiveIntegerField()
+    sha256  = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'index'], name='upload_chunk_unique_index'),
+        ]
+
 
 class Visitor(models.Model):
     name = models.CharField(max_length=255)
     email = models.EmailField()
     message = models.TextField()
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    # Set from the spool record for inquiries inserted by core.inquiries
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False)
+    spool_id = models.UUIDField(null=True, blank=True, unique=True, editable=False)
 
     def __str__(self):
         return f"Inquiry from {self.name} on {self.submitted_at.strftime('%Y-%m-%d')}"
@@ -249,9 +426,127 @@ class Appointment(models.Model):
     time = models.TimeField()
     message = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            models.Index(fields=['date', 'time'], name='appointment_date_time_idx'),
+        ]
 
     def __str__(self):
         return f"Appointment for {self.client.name} on {self.date} at {self.time}"
+
+
+class AppointmentSlot(models.Model):
+    """
+    The slot an appointment occupies, with the lawyer it is booked with.
+
+    ``date``/``time`` is the start of a slot on the ``core.availability``
+    grid. The unique constraints are what makes booking race-free: of two
+    requests for the same lawyer (or, without a lawyer, the same firm-wide
+    slot), only one insert can succeed.
+    """
+    appointment = models.OneToOneField(Appointment, on_delete=models.CASCADE, related_name='slot')
+    lawyer = models.ForeignKey(
+        User, null=True, blank=True, on_delete=models.CASCADE, related_name='appointment_slots',
+    )
+    date = models.DateField()
+    time = models.TimeField()
+
+    class Meta:
+        ordering = ['date', 'time']
+        indexes = [
+            models.Index(fields=['date', 'time'], name='slot_range_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['lawyer', 'date', 'time'], condition=models.Q(lawyer__isnull=False),
+                name='slot_lawyer_unique',
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'time'], condition=models.Q(lawyer__isnull=True),
+                name='slot_firm_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.time:%H:%M} ({self.lawyer or 'firm'})"
+
+
+class CalendarToken(models.Model):
+    """Secret that stands in for a login in the user's iCalendar feed URLs."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='calendar_token')
+    token = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Calendar token for {self.user}"
+
+
+class Notification(models.Model):
+    """Outgoing email queued for ``send_notifications`` instead of being sent in the request."""
+    KIND = [
+        ('welcome', 'Welcome'),
+        ('case_due', 'Case due'),
+        ('appointment', 'Appointment reminder'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=30, choices=KIND)
+    # What a reminder is about, and the deadline or start time it was sent
+    # for (see core.reminders); moving that sends a new one.
+    case = models.ForeignKey('Case', null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    appointment = models.ForeignKey('Appointment', null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    due_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['sent_at', 'created_at'], name='notification_pending_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['case', 'due_at', 'user'], condition=models.Q(case__isnull=False),
+                name='notification_case_unique',
+            ),
+            models.UniqueConstraint(
+                fields=['appointment', 'due_at', 'user'], condition=models.Q(appointment__isnull=False),
+                name='notification_appointment_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} for {self.user}"
+
+
+class Job(models.Model):
+    """Background work run by ``manage.py run_workers`` (see core.jobs)."""
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    task         = models.CharField(max_length=200)
+    kwargs       = models.JSONField(default=dict, blank=True)
+    priority     = models.SmallIntegerField(default=0, help_text='Higher runs first')
+    status       = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts     = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at       = models.DateTimeField(default=timezone.now)
+    locked_by    = models.CharField(max_length=100, blank=True)
+    locked_at    = models.DateTimeField(null=True, blank=True)
+    last_error   = models.TextField(blank=True)
+    created_at   = models.DateTimeField(auto_now_add=True)
+    finished_at  = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} ({self.get_status_display()})"
@@ -0,0 +1,69 @@
+"""
+Queued outgoing email.
+
+Views and admin actions record a ``Notification`` row instead of talking to
+the mail server inside the request. ``send_pending`` (queued as a background
+job by ``queue``, or run by the ``send_notifications`` command) renders queued
+rows in batches and sends each batch over a single email-backend connection.
+"""
+import logging
+
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+SUBJECTS = {
+    'welcome': 'Your LawFirm account is active',
+    'case_due': 'Reminder: {case.title} is due {due_at:%b %d}',
+    'appointment': 'Reminder: appointment on {due_at:%b %d} at {due_at:%H:%M}',
+}
+
+
+def queue(kind, user_ids):
+    """Queue one ``kind`` notification per user id with a single INSERT, and a job to send them."""
+    from . import jobs
+
+    notifications = Notification.objects.bulk_create([Notification(user_id=user_id, kind=kind) for user_id in user_ids])
+    if notifications:
+        jobs.enqueue(send_pending, unique=True)
+    return notifications
+
+
+def render(notification):
+    context = {
+        'user': notification.user,
+        'case': notification.case,
+        'appointment': notification.appointment,
+        # A reminder describes the deadline it was queued for, even if it has moved since.
+        'due_at': notification.due_at and timezone.localtime(notification.due_at),
+    }
+    return EmailMessage(
+        SUBJECTS[notification.kind].format(**context),
+        render_to_string(f'notifications/{notification.kind}.txt', context),
+        to=[notification.user.email],
+    )
+
+
+def send_pending(batch_size=100, connection=None):
+    """Send every queued notification; returns the number of emails sent."""
+    connection = connection or get_connection()
+    sent = 0
+    while True:
+        batch = list(
+            Notification.objects.filter(sent_at__isnull=True)
+            .select_related('user', 'case__client', 'appointment__client')
+            .order_by('created_at', 'pk')[:batch_size]
+        )
+        if not batch:
+            return sent
+        messages = [render(notification) for notification in batch if notification.user.email]
+        if messages:
+            # One connection per batch instead of one per message.
+            with connection:
+                sent += connection.send_messages(messages) or 0
+        # Rows without an address are marked done too, so they cannot block the queue.
+        Notification.objects.filter(pk__in=[n.pk for n in batch]).update(sent_at=timezone.now())
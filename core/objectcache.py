@@ -0,0 +1,157 @@
+"""
+Read-through cache of Client and Case rows looked up by primary key.
+
+Detail, update and download views fetch the same few rows on every request,
+and their permission checks need only ``client_id``, ``lawyer_id`` and the
+client's ``user_id``. ``get_client`` and ``get_case`` keep recently used rows
+in a bounded in-process LRU (``OBJECT_CACHE_SIZE`` entries) and hand out
+fresh model instances built from them.
+
+Each entry remembers the version stamp (``core.fragments``) the row had when
+it was loaded. Saves and deletes replace the stamp through the model signals.
+Because stamps are kept in the default cache, which every process shares, a
+row changed by another process is reloaded rather than served stale. The
+stamp is read before the row, which leaves an entry racing a write outdated
+rather than current. Rows written in the current transaction bypass the
+cache until it ends, so data that is then rolled back is never kept.
+
+Permission checks rely on these rows, so when the default cache is private
+to the process (``core.checks.PROCESS_LOCAL``), stamps cannot reveal other
+processes' writes and every lookup goes to the database instead.
+
+``stats()`` reports this process's hits, misses and evictions. With
+``DEBUG`` on, ``QueryBudgetMiddleware`` sends them as ``X-Object-Cache``.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import Http404
+
+from .checks import PROCESS_LOCAL
+from .fragments import Ref, stamps
+from .models import Case, Client
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+_local = threading.local()
+
+
+def _key(model, pk):
+    return model._meta.label_lower, int(pk)
+
+
+def _written():
+    """Rows written by the open transaction on this thread."""
+    written = getattr(_local, 'written', None)
+    if written is None or not connection.in_atomic_block:
+        written = _local.written = set()
+    return written
+
+
+def _load(model, pk):
+    instance = model._base_manager.filter(pk=pk).first()
+    if instance is None:
+        return None
+    return tuple(getattr(instance, field.attname) for field in model._meta.concrete_fields)
+
+
+def _build(model, values):
+    if values is None:
+        return None
+    names = [field.attname for field in model._meta.concrete_fields]
+    return model.from_db(connection.alias, names, values)
+
+
+def _shared():
+    """Whether stamps are seen by every process (see ``core.checks``)."""
+    return settings.CACHES.get('default', {}).get('BACKEND') not in PROCESS_LOCAL
+
+
+def _get(model, pk):
+    key = _key(model, pk)
+    if key in _written() or not _shared():
+        return _build(model, _load(model, pk))
+
+    [stamp] = stamps([Ref(*key)])
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            _entries.move_to_end(key)
+            _counters['hits'] += 1
+            return _build(model, entry[1])
+        _counters['misses'] += 1
+
+    # Missing rows are cached too; creating one replaces its stamp.
+    values = _load(model, pk)
+    limit = getattr(settings, 'OBJECT_CACHE_SIZE', 2000)
+    with _lock:
+        _entries[key] = (stamp, values)
+        _entries.move_to_end(key)
+        while len(_entries) > limit:
+            _entries.popitem(last=False)
+            _counters['evictions'] += 1
+    return _build(model, values)
+
+
+def get_client(pk):
+    """The ``Client`` with primary key ``pk``, or None."""
+    return _get(Client, pk)
+
+
+def get_case(pk):
+    """The ``Case`` with primary key ``pk`` and its client, or None."""
+    case = _get(Case, pk)
+    if case is not None:
+        client = get_client(case.client_id)
+        if client is not None:
+            case.client = client
+    return case
+
+
+def get_client_or_404(pk):
+    client = get_client(pk)
+    if client is None:
+        raise Http404('No Client matches the given query.')
+    return client
+
+
+def get_case_or_404(pk):
+    case = get_case(pk)
+    if case is None:
+        raise Http404('No Case matches the given query.')
+    return case
+
+
+def changed(instance):
+    """Drop ``instance``'s entry; called from the model signals."""
+    forget(type(instance), instance.pk)
+
+
+def forget(model, pk):
+    """Drop the entry for a row written without model signals (``update()``)."""
+    key = _key(model, pk)
+    with _lock:
+        _entries.pop(key, None)
+    if connection.in_atomic_block:
+        written = _written()
+        written.add(key)
+        transaction.on_commit(lambda: written.discard(key))
+
+
+def stats():
+    with _lock:
+        lookups = _counters['hits'] + _counters['misses']
+        return {
+            **_counters,
+            'size': len(_entries),
+            'hit_rate': _counters['hits'] / lookups if lookups else 0.0,
+        }
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _counters.update(hits=0, misses=0, evictions=0)
@@ -0,0 +1,96 @@
+"""
+Keyset (seek) pagination.
+
+Instead of OFFSET, each page starts strictly after the sort key of the last
+row of the previous page, so fetching any page costs one bounded index range
+scan no matter how deep the reader has scrolled. The ordering must end in a
+unique column (normally ``id``) to make the key total.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    """Return the key values stored in ``cursor``, or None if it is unusable."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != length:
+        return None
+    return values
+
+
+def _seek_filter(ordering, values):
+    """Rows strictly after ``values`` in ``ordering`` (a row-value comparison)."""
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def keyset_paginate(queryset, ordering, cursor=None, per_page=10):
+    """
+    Return one KeysetPage of ``queryset`` sorted by ``ordering``.
+
+    ``cursor`` is the opaque token from a previous page's ``next_cursor``;
+    an invalid or missing cursor yields the first page.
+    """
+    queryset = queryset.order_by(*ordering)
+    values = decode_cursor(cursor, len(ordering))
+    if values is not None:
+        try:
+            queryset = queryset.filter(_seek_filter(ordering, values))
+        except (ValidationError, TypeError, ValueError):
+            # Well-formed but tampered with: a value the field cannot hold.
+            pass
+
+    rows = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field.lstrip('-')) for field in ordering)
+    return KeysetPage(rows, next_cursor)
@@ -0,0 +1,117 @@
+"""
+Request-scoped principal for role checks.
+
+A ``Principal`` bundles the facts views and templates need to authorize a
+request: the user's group names, whether they hold a staff role (Admin or
+Lawyer, or superuser) and the id of their client profile. It is resolved
+once per request and memoized on the user object; across requests it lives
+in the configured cache under a key that embeds a roles version.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+STAFF_GROUPS = frozenset({'Admin', 'Lawyer'})
+
+VERSION_KEY = 'principal:version'
+
+
+class Principal:
+    def __init__(self, user_id=None, is_superuser=False, groups=(), client_id=None):
+        self.user_id = user_id
+        self.is_superuser = is_superuser
+        self.groups = frozenset(groups)
+        self.client_id = client_id
+
+    @property
+    def is_authenticated(self):
+        return self.user_id is not None
+
+    @property
+    def is_staff_role(self):
+        return self.is_superuser or bool(self.groups & STAFF_GROUPS)
+
+    @property
+    def is_client(self):
+        return self.client_id is not None
+
+    def has_group(self, *group_names):
+        return bool(self.groups.intersection(group_names))
+
+    def __repr__(self):
+        return f"<Principal user={self.user_id} staff={self.is_staff_role} client={self.client_id}>"
+
+
+ANONYMOUS = Principal()
+
+
+def _roles_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # A fresh random version guarantees entries written under an
+        # evicted version can never be read back.
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _cache_key(user_id, version=None):
+    return f"principal:{version or _roles_version()}:{user_id}"
+
+
+def bump_roles_version():
+    """Invalidate every cached principal (group renamed or deleted)."""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_principal(*user_ids):
+    """Drop the cached principal for the given users."""
+    version = _roles_version()
+    cache.delete_many([_cache_key(user_id, version) for user_id in user_ids])
+
+
+def _load(user_id):
+    """Fetch group names and client id for a user in a single query."""
+    from .models import User
+
+    rows = User.objects.filter(pk=user_id).values_list('groups__name', 'client_profile__id')
+    groups = set()
+    client_id = None
+    for group_name, profile_id in rows:
+        if group_name:
+            groups.add(group_name)
+        client_id = profile_id
+    return sorted(groups), client_id
+
+
+def get_principal(user):
+    """
+    Return the Principal for ``user``.
+
+    The result is memoized on the user instance, so every check made while
+    handling a request shares one resolution. At most one query is issued,
+    and none when the cross-request cache is warm.
+    """
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS
+
+    principal = getattr(user, '_principal', None)
+    if principal is not None:
+        return principal
+
+    key = _cache_key(user.pk)
+    cached = cache.get(key)
+    if cached is None:
+        cached = _load(user.pk)
+        cache.set(key, cached, getattr(settings, 'PRINCIPAL_CACHE_TIMEOUT', 300))
+    groups, client_id = cached
+
+    principal = Principal(
+        user_id=user.pk,
+        is_superuser=user.is_superuser,
+        groups=groups,
+        client_id=client_id,
+    )
+    user._principal = principal
+    return principal
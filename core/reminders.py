@@ -0,0 +1,92 @@
+"""
+Reminders of case due dates and upcoming appointments.
+
+``queue_due`` finds open cases due within ``REMINDER_CASE_DAYS`` and
+appointments starting within ``REMINDER_APPOINTMENT_HOURS`` with range scans
+on ``case_due_date_idx`` and ``appointment_date_time_idx``, and queues one
+``Notification`` per recipient: the case's lawyer, or the appointment's client
+and lawyer. A reminder records the deadline it was for (``due_at``); the
+partial unique constraints on it mean one is never queued twice, while a
+moved deadline or appointment gets a new one.
+
+``dispatch`` queues what is due and sends the outbox through
+``notifications.send_pending``: rendered in batches, one connection per batch.
+It is meant to run every few minutes from cron (``send_reminders``) or as a
+job.
+"""
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import notifications
+from .models import Appointment, Case, Notification
+
+
+def _aware(day, time=datetime.time.min):
+    return timezone.make_aware(datetime.datetime.combine(day, time))
+
+
+def candidates(now=None):
+    """Unsaved reminders for everything inside the windows at ``now``."""
+    now = timezone.localtime(now)
+    today = now.date()
+    last_day = today + datetime.timedelta(days=getattr(settings, 'REMINDER_CASE_DAYS', 3))
+    cases = (
+        Case.objects.filter(due_date__gte=today, due_date__lte=last_day, lawyer__isnull=False)
+        .exclude(status='closed')
+        .values_list('pk', 'lawyer_id', 'due_date')
+    )
+    for case_id, lawyer_id, due_date in cases:
+        yield Notification(user_id=lawyer_id, kind='case_due', case_id=case_id, due_at=_aware(due_date))
+
+    end = now + datetime.timedelta(hours=getattr(settings, 'REMINDER_APPOINTMENT_HOURS', 24))
+    # The index narrows to whole days; the exact window is applied here.
+    appointments = Appointment.objects.filter(date__gte=today, date__lte=end.date()).values_list(
+        'pk', 'date', 'time', 'client__user_id', 'slot__lawyer_id',
+    )
+    for appointment_id, date, time, client_user_id, lawyer_id in appointments:
+        starts = _aware(date, time)
+        if not now <= starts <= end:
+            continue
+        for user_id in {client_user_id, lawyer_id} - {None}:
+            yield Notification(user_id=user_id, kind='appointment', appointment_id=appointment_id, due_at=starts)
+
+
+def _key(notification):
+    return notification.user_id, notification.case_id, notification.appointment_id, notification.due_at
+
+
+def _existing(notifications, *extra):
+    """Keys (plus ``extra`` fields) of the stored reminders for the cases and appointments of ``notifications``."""
+    case_ids = {n.case_id for n in notifications if n.case_id}
+    appointment_ids = {n.appointment_id for n in notifications if n.appointment_id}
+    fields = ('user_id', 'case_id', 'appointment_id', 'due_at', *extra)
+    existing = set(Notification.objects.filter(case_id__in=case_ids).values_list(*fields))
+    existing.update(Notification.objects.filter(appointment_id__in=appointment_ids).values_list(*fields))
+    return existing
+
+
+def queue_due(now=None):
+    """Queue reminders that are due and not queued yet; returns ``(queued, skipped)``."""
+    due = list(candidates(now))
+    if not due:
+        return 0, 0
+    existing = _existing(due)
+    new = [notification for notification in due if _key(notification) not in existing]
+    queued = 0
+    if new:
+        # A run racing this one loses on the unique constraints instead of
+        # duplicating. ignore_conflicts does not report which rows it dropped,
+        # so count the stored rows carrying the created_at this insert set.
+        Notification.objects.bulk_create(new, ignore_conflicts=True)
+        inserted = {(*_key(notification), notification.created_at) for notification in new}
+        queued = len(inserted & _existing(new, 'created_at'))
+    return queued, len(due) - queued
+
+
+def dispatch(batch_size=100, connection=None, now=None):
+    """Queue due reminders and send the outbox; returns ``(queued, skipped, sent)``."""
+    queued, skipped = queue_due(now)
+    sent = notifications.send_pending(batch_size=batch_size, connection=connection)
+    return queued, skipped, sent
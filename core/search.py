@@ -0,0 +1,284 @@
+"""
+Full-text search for the dashboard and case documents.
+
+On SQLite the ``core_case_fts`` and ``core_client_fts`` FTS5 tables shadow
+the searchable columns of ``Case`` and ``Client`` (rowid == primary key).
+They are created by migration 0009, kept in sync by the signal handlers in
+``core.signals`` and can be rebuilt with ``manage.py rebuild_search_index``.
+``core_document_fts`` (migration 0015) holds each document's title and the
+text ``core.extraction`` pulled out of its file.
+Other backends, or a database without FTS5, fall back to ``icontains``.
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Case as SqlCase, IntegerField, Q, When
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+logger = logging.getLogger(__name__)
+
+CASE_TABLE = 'core_case_fts'
+CLIENT_TABLE = 'core_client_fts'
+DOCUMENT_TABLE = 'core_document_fts'
+
+# Highlight markers FTS5 puts around matches; swapped for <mark> after escaping.
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite' and getattr(settings, 'SEARCH_USE_FTS', True)
+
+
+def build_match(query, columns=None):
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term, so user input can never be
+    parsed as FTS5 syntax and partially typed words still match.
+    """
+    terms = [f'"{token}"*' for token in _TOKEN_RE.findall(query or '')]
+    if not terms:
+        return None
+    expression = ' '.join(terms)
+    if columns:
+        expression = '{%s} : (%s)' % (' '.join(columns), expression)
+    return expression
+
+
+def _ranked_ids(table, match, extra_where='', params=(), limit=None):
+    limit = limit or getattr(settings, 'SEARCH_RESULT_LIMIT', 200)
+    sql = (
+        f'SELECT rowid FROM {table} WHERE {table} MATCH %s{extra_where} '
+        f'ORDER BY rank LIMIT %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, *params, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _in_rank_order(queryset, ids):
+    if not ids:
+        return queryset.none()
+    ordering = SqlCase(
+        *[When(pk=pk, then=position) for position, pk in enumerate(ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(pk__in=ids).order_by(ordering)
+
+
+def search_cases(queryset, query, client_id=None):
+    """
+    Filter ``queryset`` to cases matching ``query``, best match first.
+
+    When ``client_id`` is given only that client's cases are searched and the
+    client name column is ignored, mirroring what a client is allowed to see.
+    """
+    if fts_enabled():
+        columns = ('title', 'description') if client_id else None
+        match = build_match(query, columns)
+        if match is None:
+            return queryset
+        extra_where, params = ('', ())
+        if client_id is not None:
+            extra_where, params = (' AND client_id = %s', (client_id,))
+        try:
+            return _in_rank_order(queryset, _ranked_ids(CASE_TABLE, match, extra_where, params))
+        except DatabaseError:
+            logger.warning("Case search index unavailable, falling back to icontains", exc_info=True)
+
+    condition = Q(title__icontains=query) | Q(description__icontains=query)
+    if client_id is None:
+        condition |= Q(client__name__icontains=query)
+    return queryset.filter(condition).distinct()
+
+
+def search_clients(queryset, query):
+    """Filter ``queryset`` to clients matching ``query``, best match first."""
+    if fts_enabled():
+        match = build_match(query)
+        if match is None:
+            return queryset
+        try:
+            return _in_rank_order(queryset, _ranked_ids(CLIENT_TABLE, match))
+        except DatabaseError:
+            logger.warning("Client search index unavailable, falling back to icontains", exc_info=True)
+
+    return queryset.filter(Q(name__icontains=query) | Q(email__icontains=query)).distinct()
+
+
+def _highlight(raw):
+    return mark_safe(escape(raw).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def _excerpt(text, query, width=80):
+    """Plain-Python snippet for the non-FTS fallback."""
+    tokens = _TOKEN_RE.findall(query or '')
+    lowered = text.lower()
+    position = min((lowered.find(t.lower()) for t in tokens if t.lower() in lowered), default=-1)
+    if position < 0:
+        return escape(text[:width * 2])
+    start = max(0, position - width)
+    raw = text[start:position + width]
+    for token in tokens:
+        raw = re.sub(re.escape(token), lambda m: f'{_MARK_START}{m.group(0)}{_MARK_END}', raw, flags=re.IGNORECASE)
+    return _highlight(('…' if start else '') + raw + '…')
+
+
+def search_documents(queryset, query, case_id=None, client_id=None, limit=None):
+    """
+    Return the documents in ``queryset`` matching ``query``, best match first.
+
+    Each result carries a ``snippet`` of highlighted, HTML-safe context.
+    ``case_id`` limits the search to one case and ``client_id`` to a client's
+    cases. At most ``limit`` (default ``SEARCH_RESULT_LIMIT``) are returned.
+    """
+    limit = limit or getattr(settings, 'SEARCH_RESULT_LIMIT', 200)
+    if fts_enabled():
+        match = build_match(query)
+        if match is None:
+            return []
+        extra_where, params = '', []
+        if case_id is not None:
+            extra_where += ' AND case_id = %s'
+            params.append(case_id)
+        if client_id is not None:
+            extra_where += ' AND case_id IN (SELECT id FROM core_case WHERE client_id = %s)'
+            params.append(client_id)
+        sql = (
+            f"SELECT rowid, snippet({DOCUMENT_TABLE}, -1, %s, %s, '…', 16) FROM {DOCUMENT_TABLE} "
+            f"WHERE {DOCUMENT_TABLE} MATCH %s{extra_where} ORDER BY rank LIMIT %s"
+        )
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [_MARK_START, _MARK_END, match, *params, limit])
+                snippets = dict(cursor.fetchall())
+        except DatabaseError:
+            logger.warning("Document search index unavailable, falling back to icontains", exc_info=True)
+        else:
+            documents = queryset.filter(pk__in=snippets).in_bulk()
+            results = []
+            for pk, snippet in snippets.items():
+                if pk in documents:
+                    documents[pk].snippet = _highlight(snippet)
+                    results.append(documents[pk])
+            return results
+
+    from .models import DocumentText
+
+    if case_id is not None:
+        queryset = queryset.filter(case_id=case_id)
+    if client_id is not None:
+        queryset = queryset.filter(case__client_id=client_id)
+    texts = DocumentText.objects.filter(text__icontains=query)
+    results = list(queryset.filter(Q(title__icontains=query) | Q(sha256__in=texts.values('sha256')))[:limit])
+    contents = dict(texts.filter(pk__in=[d.sha256 for d in results]).values_list('sha256', 'text'))
+    for document in results:
+        document.snippet = _excerpt(contents.get(document.sha256) or document.title, query)
+    return results
+
+
+# Index maintenance
+
+def _execute(sql, params):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+    except DatabaseError:
+        logger.warning("Search index update failed; run rebuild_search_index", exc_info=True)
+
+
+def index_case(case):
+    if not fts_enabled():
+        return
+    _execute(f'DELETE FROM {CASE_TABLE} WHERE rowid = %s', [case.pk])
+    _execute(
+        f'INSERT INTO {CASE_TABLE} (rowid, title, description, client_name, client_id) '
+        f'VALUES (%s, %s, %s, %s, %s)',
+        [case.pk, case.title, case.description or '', case.client.name, case.client_id],
+    )
+
+
+def unindex_case(case_id):
+    if fts_enabled():
+        _execute(f'DELETE FROM {CASE_TABLE} WHERE rowid = %s', [case_id])
+
+
+def index_client(client):
+    if not fts_enabled():
+        return
+    _execute(f'DELETE FROM {CLIENT_TABLE} WHERE rowid = %s', [client.pk])
+    _execute(
+        f'INSERT INTO {CLIENT_TABLE} (rowid, name, email) VALUES (%s, %s, %s)',
+        [client.pk, client.name, client.email],
+    )
+    # Cases carry a copy of their client's name.
+    _execute(
+        f'UPDATE {CASE_TABLE} SET client_name = %s '
+        f'WHERE rowid IN (SELECT id FROM core_case WHERE client_id = %s)',
+        [client.name, client.pk],
+    )
+
+
+def index_new_clients(clients):
+    """Index freshly bulk-created clients, which bypass post_save."""
+    if not fts_enabled() or not clients:
+        return
+    try:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {CLIENT_TABLE} (rowid, name, email) VALUES (%s, %s, %s)',
+                [(client.pk, client.name, client.email) for client in clients],
+            )
+    except DatabaseError:
+        logger.warning("Search index update failed; run rebuild_search_index", exc_info=True)
+
+
+def unindex_client(client_id):
+    if fts_enabled():
+        _execute(f'DELETE FROM {CLIENT_TABLE} WHERE rowid = %s', [client_id])
+
+
+def index_document(document, text):
+    if not fts_enabled():
+        return
+    _execute(f'DELETE FROM {DOCUMENT_TABLE} WHERE rowid = %s', [document.pk])
+    _execute(
+        f'INSERT INTO {DOCUMENT_TABLE} (rowid, title, content, case_id) VALUES (%s, %s, %s, %s)',
+        [document.pk, document.title, text, document.case_id],
+    )
+
+
+def unindex_document(document_id):
+    if fts_enabled():
+        _execute(f'DELETE FROM {DOCUMENT_TABLE} WHERE rowid = %s', [document_id])
+
+
+def rebuild_index():
+    """Repopulate the search tables from the model tables and extracted text."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {CASE_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {CASE_TABLE} (rowid, title, description, client_name, client_id) '
+            'SELECT c.id, c.title, c.description, cl.name, c.client_id '
+            'FROM core_case c JOIN core_client cl ON cl.id = c.client_id'
+        )
+        cursor.execute(f'DELETE FROM {CLIENT_TABLE}')
+        cursor.execute(f'INSERT INTO {CLIENT_TABLE} (rowid, name, email) SELECT id, name, email FROM core_client')
+        cursor.execute(f'DELETE FROM {DOCUMENT_TABLE}')
+        # Reuses text already extracted for each checksum; no file is read.
+        cursor.execute(
+            f'INSERT INTO {DOCUMENT_TABLE} (rowid, title, content, case_id) '
+            "SELECT d.id, d.title, COALESCE(t.text, ''), d.case_id "
+            'FROM core_document d LEFT JOIN core_documenttext t ON t.sha256 = d.sha256'
+        )
+        counts = []
+        for table in (CASE_TABLE, CLIENT_TABLE, DOCUMENT_TABLE):
+            cursor.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+            cursor.execute(f'SELECT COUNT(*) FROM {table}')
+            counts.append(cursor.fetchone()[0])
+    return tuple(counts)
@@ -0,0 +1,150 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import access, counters, extraction, fragments, objectcache, search, snapshots, thumbnails
+from .models import User, Client, Case, Document, Appointment
+from .principal import bump_roles_version, invalidate_principal
+from .storage import release_blob
+
+
+@receiver(pre_save, sender=Client)
+@receiver(pre_save, sender=Case)
+@receiver(pre_save, sender=Document)
+@receiver(pre_save, sender=Appointment)
+def snapshot_before_save(sender, instance, raw=False, **kwargs):
+    """One read of the stored row for every handler below (see core.snapshots)."""
+    if not raw:
+        snapshots.remember(instance)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop cached principals whose group membership changed."""
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_principal(instance.pk)
+    elif action in ('pre_clear', 'post_clear'):
+        # group.user_set.clear() does not report which users were affected.
+        bump_roles_version()
+    elif pk_set:
+        invalidate_principal(*pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    bump_roles_version()
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def client_profile_changed(sender, instance, **kwargs):
+    """Keep the cached ``client_id`` in sync with the user's profile link."""
+    # The previous user loses the profile when it is reassigned.
+    before = snapshots.before(instance)
+    user_ids = {instance.user_id, before and before['user_id']} - {None}
+    if user_ids:
+        invalidate_principal(*user_ids)
+
+
+@receiver(post_save, sender=Case)
+def case_saved_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_case(instance)
+
+
+@receiver(post_delete, sender=Case)
+def case_deleted_index(sender, instance, **kwargs):
+    search.unindex_case(instance.pk)
+
+
+@receiver(post_save, sender=Client)
+def client_saved_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_client(instance)
+
+
+@receiver(post_delete, sender=Client)
+def client_deleted_index(sender, instance, **kwargs):
+    search.unindex_client(instance.pk)
+
+
+@receiver(post_delete, sender=Document)
+def document_deleted_release_blob(sender, instance, **kwargs):
+    release_blob(instance.blob_id)
+
+
+@receiver(post_save, sender=Document)
+def document_saved_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        extraction.document_saved(instance)
+
+
+@receiver(post_delete, sender=Document)
+def document_deleted_index(sender, instance, **kwargs):
+    search.unindex_document(instance.pk)
+
+
+@receiver(post_save, sender=Document)
+def document_saved_thumbnail(sender, instance, raw=False, **kwargs):
+    if not raw:
+        thumbnails.schedule(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Client)
+@receiver(post_save, sender=Case)
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=Case)
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=Appointment)
+def fragment_stamps_changed(sender, instance, **kwargs):
+    """Retire cached fragments that show ``instance`` (see core.fragments)."""
+    fragments.changed(instance)
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_save, sender=Case)
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=Case)
+def object_cache_changed(sender, instance, **kwargs):
+    objectcache.changed(instance)
+
+
+@receiver(post_save, sender=Case)
+def case_saved_counters(sender, instance, raw=False, **kwargs):
+    if not raw:
+        counters.case_saved(instance)
+
+
+@receiver(post_delete, sender=Case)
+def case_deleted_counters(sender, instance, **kwargs):
+    counters.case_deleted(instance)
+
+
+@receiver(post_save, sender=Document)
+def document_saved_counters(sender, instance, raw=False, **kwargs):
+    if not raw:
+        counters.document_saved(instance)
+
+
+@receiver(post_delete, sender=Document)
+def document_deleted_counters(sender, instance, **kwargs):
+    counters.document_deleted(instance)
+
+
+@receiver(post_save, sender=Client)
+def client_saved_access(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        access.client_saved(instance, created)
+
+
+@receiver(post_save, sender=Case)
+def case_saved_access(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        access.case_saved(instance, created)
@@ -0,0 +1,34 @@
+"""
+The stored state of a row, read once before it is saved.
+
+Several ``post_save`` handlers need to know what a save changed: the client
+totals (``core.counters``), row-level access (``core.access``), fragment
+stamps (``core.fragments``) and cached principals. ``remember`` runs in
+``pre_save`` and loads every field any of them compares with a single
+``SELECT``; ``before`` hands it out afterwards as a dict, or None for a new
+row.
+"""
+
+# Model label -> fields read before a save (lookups are allowed).
+FIELDS = {
+    'core.client': ('user_id',),
+    'core.case': ('client_id', 'lawyer_id', 'status'),
+    'core.document': ('case_id', 'case__client_id', 'size_bytes'),
+    'core.appointment': ('client_id',),
+}
+
+
+def remember(instance):
+    """Snapshot the stored row of ``instance`` (``pre_save``)."""
+    fields = FIELDS.get(instance._meta.label_lower)
+    if fields is None:
+        return
+    if instance._state.adding or instance.pk is None:
+        instance._snapshot = None
+    else:
+        instance._snapshot = type(instance)._base_manager.filter(pk=instance.pk).values(*fields).first()
+
+
+def before(instance):
+    """The row ``instance`` had before this save, or None if it is new (or unknown)."""
+    return getattr(instance, '_snapshot', None)
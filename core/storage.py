@@ -0,0 +1,158 @@
+"""
+Content-addressed storage for document uploads.
+
+Every upload is stored once under its SHA-256 (``blobs/ab/cd/<sha256>``)
+and ``Document`` rows point at a ``Blob`` row that counts its references.
+The name carries no extension, so the same bytes uploaded as ``.pdf`` and
+``.txt`` share a file; the type lives on the ``Document``. Blobs stored
+before that keep their ``<sha256><ext>`` names and are still reused.
+
+The digest is computed in the same pass that puts the bytes on disk:
+``HashingUploadHandler`` hashes large uploads while Django spools them to a
+temporary file, which is then moved (or simply dropped when the blob
+exists), and everything else is hashed while it is written to a ``.part``
+file that is renamed into place.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = 'blobs'
+
+_BLOB_NAME_RE = re.compile(r'^%s/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})' % BLOB_PREFIX)
+
+
+def blob_name(digest, extension=''):
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def blob_digest(name):
+    """Return the SHA-256 encoded in a blob file name, or None for legacy files."""
+    match = _BLOB_NAME_RE.match(name or '')
+    return match.group(1) if match else None
+
+
+def describe_file(filename):
+    """Return ``(extension, mime_type)`` for a filename, e.g. ``('pdf', 'application/pdf')``."""
+    extension = os.path.splitext(filename or '')[1].lstrip('.').lower()[:16]
+    mime_type, _ = mimetypes.guess_type(filename or '', strict=False)
+    return extension, mime_type or 'application/octet-stream'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    chunk_size = 64 * 1024
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()[:10]
+        if hasattr(content, 'temporary_file_path'):
+            # HashingUploadHandler already hashed it on the way in.
+            digest = getattr(content, 'sha256', None) or self._hash_file(content.temporary_file_path())
+            target = self._existing(digest, extension)
+            if target is None:
+                target = blob_name(digest)
+                self._ensure_dir(target)
+                file_move_safe(content.temporary_file_path(), self.path(target), allow_overwrite=True)
+                self._chmod(target)
+        else:
+            digest, part_path = self._write_part(content)
+            target = self._existing(digest, extension)
+            if target is not None:
+                os.remove(part_path)
+            else:
+                target = blob_name(digest)
+                self._ensure_dir(target)
+                # Racing writers of the same blob write identical bytes, so
+                # whichever rename lands last is still correct.
+                os.replace(part_path, self.path(target))
+                self._chmod(target)
+        content.sha256 = digest
+        return target
+
+    def _existing(self, digest, extension):
+        """The stored name of blob ``digest``, including a legacy ``<sha256><ext>`` one."""
+        for target in (blob_name(digest), blob_name(digest, extension)):
+            if self.exists(target):
+                return target
+        return None
+
+    def _write_part(self, content):
+        directory = self.path(BLOB_PREFIX)
+        os.makedirs(directory, exist_ok=True)
+        hasher = hashlib.sha256()
+        fd, part_path = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in content.chunks(self.chunk_size):
+                    hasher.update(chunk)
+                    out.write(chunk)
+        except BaseException:
+            os.remove(part_path)
+            raise
+        return hasher.hexdigest(), part_path
+
+    def _hash_file(self, path):
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as handle:
+            for chunk in iter(lambda: handle.read(self.chunk_size), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def _ensure_dir(self, name):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+
+    def _chmod(self, name):
+        if self.file_permissions_mode is not None:
+            os.chmod(self.path(name), self.file_permissions_mode)
+
+
+document_storage = ContentAddressedStorage()
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """
+    Spool large uploads to a temporary file like Django's own handler, and
+    hash each chunk as it arrives so storing the file never reads it again.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.hasher.hexdigest()
+        return file
+
+
+def retain_blob(digest, size):
+    """Record one more reference to the blob ``digest``."""
+    from .models import Blob
+
+    Blob.objects.get_or_create(sha256=digest, defaults={'size': size})
+    Blob.objects.filter(pk=digest).update(ref_count=F('ref_count') + 1)
+
+
+def release_blob(digest):
+    """
+    Drop one reference to ``digest``.
+
+    Unreferenced blobs are left for ``prune_blobs`` so an upload racing the
+    last delete never loses its file.
+    """
+    from .models import Blob
+
+    if digest:
+        Blob.objects.filter(pk=digest, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
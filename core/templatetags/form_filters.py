@@ -1,5 +1,7 @@
 from django import template
 
+from ..principal import get_principal
+
 register = template.Library()
 
 @register.filter(name='add_class')
@@ -11,4 +13,4 @@ def add_class(field, css_class):
 
 @register.filter(name='has_group')
 def has_group(user, group_name):
-    return user.groups.filter(name=group_name).exists()
+    return get_principal(user).has_group(group_name)
@@ -0,0 +1,56 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+
+from ..fragments import Ref, fragment_key
+
+register = template.Library()
+
+
+@register.filter
+def versioned(value, label=None):
+    """
+    Mark a value for ``{% fragment %}`` to vary on its version stamp.
+
+    ``'core.Case'|versioned`` stands for every case, and
+    ``principal.client_id|versioned:'core.Client'`` for one client.
+    """
+    if label is not None:
+        return Ref(label, value)
+    if isinstance(value, models.Model):
+        return Ref.of(value)
+    return Ref(value)
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        key = fragment_key(self.name.resolve(context), [value.resolve(context) for value in self.vary_on])
+        content = cache.get(key)
+        if content is None:
+            content = self.nodelist.render(context)
+            cache.set(key, content, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24))
+        return content
+
+
+@register.tag
+def fragment(parser, token):
+    """
+    Cache the enclosed HTML until something it varies on changes::
+
+        {% fragment 'client_cases' client %}...{% endfragment %}
+
+    Model instances and ``|versioned`` values vary on their version stamps
+    (see ``core.fragments``), other values on themselves.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name.")
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    return FragmentNode(nodelist, parser.compile_filter(bits[1]), [parser.compile_filter(bit) for bit in bits[2:]])
@@ -0,0 +1,51 @@
+from django.contrib import admin
+from django.test import RequestFactory, TestCase
+
+from .. import access
+from ..models import User, Client, Case, ObjectAccess
+
+
+class ObjectAccessTest(TestCase):
+    def setUp(self):
+        self.acme = Client.objects.create(name='Acme', email='acme@example.com')
+        self.globex = Client.objects.create(name='Globex', email='globex@example.com')
+        self.lawyer = User.objects.create_user('lawyer', 'lawyer@example.com', 'pw', is_staff=True)
+        self.merger = Case.objects.create(title='Merger', client=self.acme, lawyer=self.lawyer)
+        self.lease = Case.objects.create(title='Lease', client=self.globex)
+
+    def visible(self, user, model):
+        request = RequestFactory().get('/')
+        request.user = user
+        return set(admin.site._registry[model].get_queryset(request))
+
+    def test_rows_follow_assignments(self):
+        self.assertEqual(self.visible(self.lawyer, Case), {self.merger})
+        self.assertEqual(self.visible(self.lawyer, Client), {self.acme})
+        self.assertEqual(self.visible(self.acme.user, Case), {self.merger})
+        self.assertEqual(self.visible(self.acme.user, Client), {self.acme})
+
+        self.merger.lawyer = None
+        self.merger.save()
+        self.lease.lawyer = self.lawyer
+        self.lease.save()
+        self.assertEqual(self.visible(self.lawyer, Case), {self.lease})
+        self.assertEqual(self.visible(self.lawyer, Client), {self.globex})
+
+        # Moving a case moves the owner's access with it.
+        self.merger.client = self.globex
+        self.merger.save()
+        self.assertEqual(self.visible(self.acme.user, Case), set())
+        self.assertEqual(self.visible(self.globex.user, Case), {self.merger, self.lease})
+
+    def test_rows_match_the_rules(self):
+        User.objects.filter(pk=self.acme.user_id).update(email='former@example.com')
+        self.acme.user = User.objects.create_user('acme-owner', 'acme@example.com', 'pw')
+        self.acme.save()
+        self.merger.delete()
+        actual = set(ObjectAccess.objects.values_list('user_id', 'client_id', 'case_id'))
+        self.assertEqual(actual, access.expected_rows(Client.objects.values('pk')))
+
+    def test_filters_are_a_single_semi_join(self):
+        sql = str(access.visible_cases(self.lawyer, Case.objects.all()).query)
+        self.assertNotIn('DISTINCT', sql)
+        self.assertNotIn(' OR ', sql)
@@ -0,0 +1,50 @@
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core import mail
+from django.test import TestCase
+from django.urls import reverse
+
+from ..accounts import activation_path
+from ..jobs import work, worker_name
+from ..models import User, Client
+
+
+class ClientActivationTest(TestCase):
+    def setUp(self):
+        self.lawyer = User.objects.create_user('lawyer', 'lawyer@example.com', 'testpass123')
+        self.lawyer.groups.add(Group.objects.create(name='Lawyer'))
+
+    def test_provisioning_does_not_hash(self):
+        with mock.patch('django.contrib.auth.hashers.PBKDF2PasswordHasher.encode') as encode:
+            client = Client.objects.create(name='ann lee', email='ann@example.com')
+        encode.assert_not_called()
+        self.assertEqual(client.user.username, 'ann')
+        self.assertEqual(client.user.get_full_name(), 'Ann Lee')
+        self.assertFalse(client.user.has_usable_password())
+
+    def test_client_create_emails_activation_link(self):
+        self.client.force_login(self.lawyer)
+        response = self.client.post(reverse('client_create'), {'name': 'Ann Lee', 'email': 'ann@example.com'})
+        self.assertRedirects(response, reverse('dashboard'))
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(work(worker_name(), burst=True), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['ann@example.com'])
+        self.assertRegex(mail.outbox[0].body, r'/activate/[\w-]+/[\w-]+/')
+
+    def test_redeem_token_sets_password_once(self):
+        user = Client.objects.create(name='Ann Lee', email='ann@example.com').user
+        url = activation_path(user)
+        response = self.client.get(url)
+        set_password_url = response.url
+        response = self.client.post(set_password_url, {
+            'new_password1': 'Sturdy-Passphrase-42',
+            'new_password2': 'Sturdy-Passphrase-42',
+        })
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        user.refresh_from_db()
+        self.assertTrue(user.check_password('Sturdy-Passphrase-42'))
+
+        response = self.client.get(url, follow=True)
+        self.assertFalse(response.context['validlink'])
@@ -0,0 +1,90 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import availability
+from ..models import User, Client, Appointment, AppointmentSlot
+
+MONDAY = datetime.date(2030, 1, 7)
+NOW = datetime.datetime(2030, 1, 7, 8, 0)
+
+
+@override_settings(OFFICE_HOURS={0: ('09:00', '11:00'), 1: ('09:15', '10:00')}, APPOINTMENT_SLOT_MINUTES=30)
+@mock.patch.object(availability, '_local_now', return_value=NOW)
+class AvailabilityTest(TestCase):
+    def setUp(self):
+        self.client_profile = Client.objects.create(name='Acme', email='acme@example.com')
+
+    def add_lawyers(self, count):
+        group = Group.objects.get_or_create(name='Lawyer')[0]
+        lawyers = [User.objects.create_user(f'lawyer{i}', f'lawyer{i}@example.com', 'pw') for i in range(count)]
+        group.user_set.add(*lawyers)
+        return lawyers
+
+    def test_grid_follows_office_hours(self, now):
+        self.assertEqual(
+            availability.day_slots(MONDAY),
+            [datetime.time(9), datetime.time(9, 30), datetime.time(10), datetime.time(10, 30)],
+        )
+        # Opening off the grid starts at the next slot; closed days have none.
+        self.assertEqual(availability.day_slots(MONDAY + datetime.timedelta(days=1)), [datetime.time(9, 30)])
+        self.assertEqual(availability.day_slots(MONDAY + datetime.timedelta(days=2)), [])
+        slots = availability.free_slots(MONDAY, days=7)
+        self.assertEqual(len(slots), 5)
+
+    def test_firm_slot_books_once(self, now):
+        availability.book(self.client_profile.pk, MONDAY, datetime.time(9))
+        self.assertNotIn(datetime.time(9), [slot.time for slot in availability.free_slots(MONDAY, days=1)])
+        with self.assertRaises(availability.SlotUnavailable):
+            availability.book(self.client_profile.pk, MONDAY, datetime.time(9))
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_slot_stays_free_until_every_lawyer_is_booked(self, now):
+        first, second = self.add_lawyers(2)
+        one = availability.book(self.client_profile.pk, MONDAY, datetime.time(10))
+        self.assertEqual(availability.free_slots(MONDAY, days=1)[2].lawyer_ids, (second.pk,))
+        two = availability.book(self.client_profile.pk, MONDAY, datetime.time(10))
+        self.assertEqual({one.slot.lawyer_id, two.slot.lawyer_id}, {first.pk, second.pk})
+        self.assertNotIn(datetime.time(10), [slot.time for slot in availability.free_slots(MONDAY, days=1)])
+        with self.assertRaises(availability.SlotUnavailable):
+            availability.book(self.client_profile.pk, MONDAY, datetime.time(10))
+
+    def test_constraint_rejects_a_slot_taken_after_the_read(self, now):
+        [lawyer] = self.add_lawyers(1)
+        taken = Appointment.objects.create(client=self.client_profile, date=MONDAY, time=datetime.time(9))
+        with mock.patch.object(AppointmentSlot.objects, 'filter', return_value=AppointmentSlot.objects.none()):
+            # The pre-read sees nothing booked; the insert still loses.
+            AppointmentSlot.objects.create(appointment=taken, lawyer=lawyer, date=MONDAY, time=datetime.time(9))
+            with self.assertRaises(availability.SlotUnavailable):
+                availability.book(self.client_profile.pk, MONDAY, datetime.time(9))
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_rejects_off_grid_past_and_far_times(self, now):
+        for date, time in [
+            (MONDAY, datetime.time(9, 10)),
+            (MONDAY, datetime.time(11)),
+            (MONDAY - datetime.timedelta(days=7), datetime.time(9)),
+            (MONDAY + datetime.timedelta(days=7 * 52), datetime.time(9)),
+        ]:
+            with self.subTest(date=date, time=time), self.assertRaises(availability.SlotUnavailable):
+                availability.check_bookable(date, time)
+
+    def test_booking_page(self, now):
+        [lawyer] = self.add_lawyers(1)
+        self.client.force_login(self.client_profile.user)
+        response = self.client.get(reverse('book_appointment'))
+        self.assertContains(response, 'Mon 7 Jan 09:00')
+
+        response = self.client.post(reverse('book_appointment'), {'date': '2030-01-07', 'time': '09:45'})
+        self.assertFormError(response.context['form'], 'time', 'Please pick one of the slots offered during office hours.')
+
+        response = self.client.post(reverse('book_appointment'), {'date': '2030-01-07', 'time': '09:30', 'lawyer': lawyer.pk})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(AppointmentSlot.objects.get().lawyer, lawyer)
+
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'pw'))
+        response = self.client.get(reverse('admin:appointment_availability'), {'start': '2030-01-07'})
+        self.assertContains(response, 'Acme')
@@ -0,0 +1,95 @@
+import tempfile
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import include, path, reverse
+
+from .. import async_views
+from ..concurrency import gather
+from ..instrumentation import track_queries
+from ..models import Client, Case, Document
+
+MEDIA_ROOT = tempfile.mkdtemp()
+DATA = bytes(range(256)) * 40
+
+# The project's URLs with the read-heavy pages served by the async views, as
+# with ASYNC_VIEWS on; earlier patterns win both resolving and reversing.
+urlpatterns = [
+    path('dashboard/', async_views.dashboard, name='dashboard'),
+    path('case/<int:pk>/', async_views.case_detail, name='case_detail'),
+    path('documents/<int:pk>/', async_views.document_download, name='document_download'),
+    path('', include('lawfirm.urls')),
+]
+
+
+# Pool threads use their own connections, which cannot see the test
+# transaction, so the calls run on the thread-sensitive executor here.
+@override_settings(ROOT_URLCONF=__name__, ASYNC_DB_THREADS=0, MEDIA_ROOT=MEDIA_ROOT, DOCUMENT_SENDFILE=None)
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        self.owner = Client.objects.create(name='Owner', email='owner@example.com')
+        self.other = Client.objects.create(name='Other', email='other@example.com')
+        self.case = Case.objects.create(title='Merger', client=self.owner)
+        self.document = Document.objects.create(
+            title='Brief', case=self.case, file=SimpleUploadedFile('brief.pdf', DATA),
+        )
+
+    async def test_dashboard_lists_own_cases(self):
+        await sync_to_async(Case.objects.create)(title='Lease', client=self.other)
+        await self.async_client.aforce_login(self.owner.user)
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertContains(response, 'Merger')
+        self.assertNotContains(response, 'Lease')
+
+    async def test_case_detail_permissions(self):
+        url = reverse('case_detail', args=[self.case.pk])
+        response = await self.async_client.get(url)
+        self.assertRedirects(response, f"{reverse('login')}?next={url}", fetch_redirect_response=False)
+
+        await self.async_client.aforce_login(self.other.user)
+        response = await self.async_client.get(url)
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+        await self.async_client.aforce_login(self.owner.user)
+        response = await self.async_client.get(url)
+        self.assertContains(response, 'Brief')
+        response = await self.async_client.get(reverse('case_detail', args=[self.case.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_case_detail_searches_only_after_permission_check(self):
+        url = reverse('case_detail', args=[self.case.pk]) + '?q=brief'
+        with mock.patch.object(async_views.views, 'case_documents', wraps=async_views.views.case_documents) as search:
+            await self.async_client.get(url)
+            await self.async_client.aforce_login(self.other.user)
+            response = await self.async_client.get(url)
+            self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+            search.assert_not_called()
+
+            await self.async_client.aforce_login(self.owner.user)
+            response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        search.assert_called_once_with(self.case.pk, 'brief')
+
+    async def test_document_download_streams_ranges(self):
+        url = reverse('document_download', args=[self.document.pk])
+        await self.async_client.aforce_login(self.other.user)
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+
+        await self.async_client.aforce_login(self.owner.user)
+        response = await self.async_client.get(url)
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), DATA)
+        response = await self.async_client.get(url, headers={'Range': 'bytes=10-19'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), DATA[10:20])
+
+
+@override_settings(ASYNC_DB_THREADS=2)
+class GatherTest(TransactionTestCase):
+    async def test_pool_queries_count_towards_request(self):
+        await sync_to_async(Client.objects.create)(name='Acme', email='acme@example.com')
+        with track_queries() as stats:
+            counts = await gather(Client.objects.count, Case.objects.count, lambda: 'no query')
+        self.assertEqual(counts, [1, 0, 'no query'])
+        self.assertEqual(stats.count, 2)
@@ -0,0 +1,100 @@
+import datetime
+
+from django.contrib.auth.models import Group
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import ical
+from ..models import User, Client, Case, Appointment, AppointmentSlot
+
+
+class CalendarFeedTest(TestCase):
+    def setUp(self):
+        self.acme = Client.objects.create(name='Acme', email='acme@example.com')
+        other = Client.objects.create(name='Globex', email='globex@example.com')
+        self.lawyer = User.objects.create_user('lawyer', 'lawyer@example.com', 'pw', first_name='Ann', last_name='Law')
+        self.lawyer.groups.add(Group.objects.get_or_create(name='Lawyer')[0])
+        tomorrow = timezone.localdate() + datetime.timedelta(days=1)
+        self.appointment = Appointment.objects.create(
+            client=self.acme, date=tomorrow, time=datetime.time(10), message='Contract, review; part 2',
+        )
+        AppointmentSlot.objects.create(appointment=self.appointment, lawyer=self.lawyer, date=tomorrow, time=datetime.time(10))
+        Appointment.objects.create(client=other, date=tomorrow, time=datetime.time(11))
+        Case.objects.create(title='Merger', client=self.acme, lawyer=self.lawyer, due_date=tomorrow)
+        Case.objects.create(title='Old', client=self.acme, lawyer=self.lawyer, due_date=tomorrow, status='closed')
+
+    def feed(self, user, feed, **headers):
+        return self.client.get(reverse('calendar_feed', args=[ical.token_for(user), feed]), headers=headers)
+
+    def body(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_client_appointments_feed(self):
+        response = self.feed(self.acme.user, 'appointments')
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = self.body(response)
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertIn('SUMMARY:Appointment: Acme with Ann Law\r\n', body)
+        self.assertIn('DESCRIPTION:Contract\\, review\\; part 2\r\n', body)
+        self.assertEqual(self.feed(self.acme.user, 'firm').status_code, 404)
+
+    def test_lawyer_feeds(self):
+        body = self.body(self.feed(self.lawyer, 'cases'))
+        self.assertIn('SUMMARY:Due: Merger', body)
+        self.assertNotIn('Old', body)
+        self.assertIn('DTSTART;VALUE=DATE:', body)
+        self.assertEqual(self.body(self.feed(self.lawyer, 'appointments')).count('BEGIN:VEVENT'), 1)
+        self.assertEqual(self.body(self.feed(self.lawyer, 'firm')).count('BEGIN:VEVENT'), 3)
+
+    def test_conditional_get(self):
+        first = self.feed(self.acme.user, 'appointments')
+        self.assertTrue(first['Last-Modified'])
+        url = reverse('calendar_feed', args=[ical.token_for(self.acme.user), 'appointments'])
+        # Token and user, then the feed summary; the principal comes from the cache.
+        with self.assertNumQueries(2):
+            response = self.client.get(url, headers={'if_none_match': first['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.feed(self.acme.user, 'appointments', if_modified_since=first['Last-Modified']).status_code, 304)
+
+        self.appointment.message = 'Moved'
+        self.appointment.save()
+        response = self.feed(self.acme.user, 'appointments', if_none_match=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_related_rows_change_the_etag(self):
+        def etag():
+            return self.feed(self.lawyer, 'firm')['ETag']
+
+        seen = [etag()]
+        # Names the events show, and a slot reassigned behind the model's back.
+        self.acme.name = 'Acme Corp'
+        self.acme.save()
+        seen.append(etag())
+        self.lawyer.first_name = 'Anne'
+        self.lawyer.save()
+        seen.append(etag())
+        other = User.objects.create_user('other', 'other@example.com', 'pw')
+        AppointmentSlot.objects.filter(appointment=self.appointment).update(lawyer=other)
+        seen.append(etag())
+        self.assertEqual(len(set(seen)), 4)
+        self.assertEqual(self.feed(self.lawyer, 'firm', if_none_match=seen[-1]).status_code, 304)
+
+    def test_token_reset_and_unknown_tokens(self):
+        old_url = reverse('calendar_feed', args=[ical.token_for(self.acme.user), 'appointments'])
+        self.client.force_login(self.acme.user)
+        response = self.client.get(reverse('calendar_feeds'))
+        self.assertContains(response, old_url)
+        self.client.post(reverse('calendar_feeds'))
+        self.client.logout()
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+        self.assertEqual(self.feed(self.acme.user, 'appointments').status_code, 200)
+        self.assertEqual(self.client.get(reverse('calendar_feed', args=['nope', 'firm'])).status_code, 404)
+
+    def test_long_lines_are_folded(self):
+        line = 'DESCRIPTION:' + 'é' * 100
+        folded = ical.fold(line)
+        self.assertTrue(all(len(part.encode()) <= 75 for part in folded.split('\r\n')))
+        self.assertEqual(folded.replace('\r\n ', '').rstrip('\r\n'), line)
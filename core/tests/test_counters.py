@@ -0,0 +1,91 @@
+import tempfile
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counters
+from ..models import User, Client, Case, Document
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ClientCountersTest(TestCase):
+    def setUp(self):
+        self.acme = Client.objects.create(name='Acme', email='acme@example.com')
+        self.globex = Client.objects.create(name='Globex', email='globex@example.com')
+
+    def totals(self, client):
+        client.refresh_from_db()
+        return [getattr(client, field) for field in counters.FIELDS]
+
+    def upload(self, case, content=b'brief'):
+        return Document.objects.create(title='Brief', case=case, file=SimpleUploadedFile('brief.txt', content))
+
+    def test_cases_and_documents_are_counted(self):
+        case = Case.objects.create(title='Merger', client=self.acme)
+        Case.objects.create(title='Lease', client=self.acme, status='closed')
+        document = self.upload(case, b'12345')
+        self.upload(case, b'123')
+        self.assertEqual(self.totals(self.acme), [2, 1, 2, 8])
+
+        case.status = 'closed'
+        case.save()
+        self.assertEqual(self.totals(self.acme)[:2], [2, 0])
+
+        document.delete()
+        self.assertEqual(self.totals(self.acme)[2:], [1, 3])
+
+        # Moving a case takes its documents along.
+        case.client = self.globex
+        case.save()
+        self.assertEqual(self.totals(self.acme), [1, 0, 0, 0])
+        self.assertEqual(self.totals(self.globex), [1, 0, 1, 3])
+
+        case.delete()
+        self.assertEqual(self.totals(self.globex), [0, 0, 0, 0])
+
+    def test_document_moved_between_clients(self):
+        document = self.upload(Case.objects.create(title='Merger', client=self.acme))
+        document.case = Case.objects.create(title='Lease', client=self.globex)
+        document.save()
+        self.assertEqual(self.totals(self.acme)[2:], [0, 0])
+        self.assertEqual(self.totals(self.globex)[2:], [1, 5])
+
+    def test_reconcile_repairs_drift(self):
+        case = Case.objects.create(title='Merger', client=self.acme)
+        self.upload(case)
+        Client.objects.filter(pk=self.acme.pk).update(case_count=7, document_bytes=0)
+        out = StringIO()
+        call_command('reconcile_client_counters', '--dry-run', stdout=out)
+        self.assertIn('case_count 7 -> 1', out.getvalue())
+        self.assertEqual(self.totals(self.acme)[0], 7)
+
+        call_command('reconcile_client_counters', stdout=StringIO())
+        self.assertEqual(self.totals(self.acme), [1, 1, 1, 5])
+        self.assertEqual(counters.reconcile(), [])
+
+    def test_changelist_reads_stored_counters(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        Case.objects.create(title='Merger', client=self.acme)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:core_client_changelist'))
+        self.assertContains(response, 'Open case count')
+        self.assertFalse(any('core_case' in query['sql'] for query in queries))
+
+    def test_save_reads_the_stored_row_once(self):
+        case = Case.objects.create(title='Merger', client=self.acme)
+        document = self.upload(case)
+        for instance, table in ((case, 'core_case'), (document, 'core_document')):
+            with CaptureQueriesContext(connection) as queries:
+                instance.save()
+            reads = [
+                query['sql'] for query in queries
+                if query['sql'].startswith('SELECT') and f'"{table}"."id" = {instance.pk}' in query['sql']
+            ]
+            self.assertEqual(len(reads), 1, reads)
@@ -0,0 +1,132 @@
+import io
+import tempfile
+import zipfile
+from io import StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import extraction
+from ..models import User, Client, Case, Document, DocumentText
+from ..search import search_documents
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def docx_bytes(*paragraphs):
+    ns = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+    body = ''.join(f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>' for text in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('word/document.xml', f'<w:document xmlns:w="{ns}"><w:body>{body}</w:body></w:document>')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DocumentSearchTest(TestCase):
+    def setUp(self):
+        self.acme = Client.objects.create(name='Acme', email='acme@example.com')
+        other = Client.objects.create(name='Globex', email='globex@example.com')
+        self.case = Case.objects.create(title='Merger', client=self.acme)
+        self.other_case = Case.objects.create(title='Lease', client=other)
+
+    def upload(self, case, name, data, title=None):
+        document = Document.objects.create(
+            title=title or name, case=case, file=SimpleUploadedFile(name, data),
+        )
+        # What the queued background job does.
+        extraction.index_document(document.pk)
+        return document
+
+    def test_extracts_text_and_docx(self):
+        memo = self.upload(self.case, 'memo.txt', b'The indemnification clause survives termination.')
+        contract = self.upload(self.case, 'contract.docx', docx_bytes('Governing law', 'Arbitration in Geneva'))
+        self.assertEqual(DocumentText.objects.get(pk=memo.sha256).status, 'ok')
+        self.assertIn('Arbitration in Geneva', DocumentText.objects.get(pk=contract.sha256).text)
+
+        results = search_documents(Document.objects.all(), 'indemnif')
+        self.assertEqual(results, [memo])
+        self.assertIn('<mark>indemnification</mark>', results[0].snippet)
+        self.assertEqual(search_documents(Document.objects.all(), 'geneva'), [contract])
+
+    def test_scoped_to_case_and_client(self):
+        mine = self.upload(self.case, 'a.txt', b'force majeure notice')
+        self.upload(self.other_case, 'b.txt', b'force majeure waiver')
+        self.assertEqual(search_documents(Document.objects.all(), 'majeure', case_id=self.case.pk), [mine])
+        self.assertEqual(search_documents(Document.objects.all(), 'majeure', client_id=self.acme.pk), [mine])
+        self.assertEqual(len(search_documents(Document.objects.all(), 'majeure')), 2)
+
+    def test_snippets_are_escaped(self):
+        self.upload(self.case, 'x.txt', b'<script>alert(1)</script> escrow terms')
+        snippet = search_documents(Document.objects.all(), 'escrow')[0].snippet
+        self.assertNotIn('<script>', snippet)
+        self.assertIn('&lt;script&gt;', snippet)
+
+    def test_unchanged_content_is_extracted_once(self):
+        data = b'confidentiality obligations'
+        with mock.patch.object(extraction, 'extract', wraps=extraction.extract) as extract:
+            first = self.upload(self.case, 'nda.txt', data)
+            self.upload(self.other_case, 'nda-copy.txt', data)
+            first.title = 'NDA (signed)'
+            first.save()
+            extraction.index_document(first.pk)
+            call_command('extract_document_text', stdout=StringIO())
+        self.assertEqual(extract.call_count, 1)
+        self.assertEqual(len(search_documents(Document.objects.all(), 'confidentiality')), 2)
+        self.assertEqual(search_documents(Document.objects.all(), 'signed'), [first])
+
+    def test_command_backfills_and_rebuild_keeps_text(self):
+        document = self.upload(self.case, 'old.txt', b'limitation of liability')
+        DocumentText.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search_documents(Document.objects.all(), 'liability'), [])
+
+        call_command('extract_document_text', stdout=StringIO())
+        self.assertEqual(search_documents(Document.objects.all(), 'liability'), [document])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search_documents(Document.objects.all(), 'liability'), [document])
+
+        document.delete()
+        self.assertEqual(search_documents(Document.objects.all(), 'liability'), [])
+
+    def test_case_page_and_admin_search(self):
+        document = self.upload(self.case, 'memo.txt', b'subrogation rights reserved')
+        self.client.force_login(self.acme.user)
+        response = self.client.get(reverse('case_detail', args=[self.case.pk]), {'q': 'subrogation'})
+        self.assertContains(response, '<mark>subrogation</mark>')
+
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'pw'))
+        response = self.client.get(reverse('admin:core_document_changelist'), {'q': 'subrogation'})
+        self.assertEqual(list(response.context['cl'].result_list), [document])
+
+    def test_admin_search_keeps_filters(self):
+        mine = self.upload(self.case, 'a.txt', b'indemnity cap')
+        self.upload(self.other_case, 'b.txt', b'indemnity waiver')
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'pw'))
+        response = self.client.get(
+            reverse('admin:core_document_changelist'), {'case__id__exact': self.case.pk, 'q': 'indemnity'},
+        )
+        self.assertEqual(list(response.context['cl'].result_list), [mine])
+
+    def test_file_replaced_during_extraction_is_not_indexed_stale(self):
+        document = Document.objects.create(title='memo', case=self.case, file=SimpleUploadedFile('memo.txt', b'estoppel'))
+        real = extraction.document_text
+
+        def replaced_meanwhile(document, force=False):
+            entry = real(document, force)
+            Document.objects.filter(pk=document.pk).update(sha256='0' * 64)
+            return entry
+
+        with mock.patch.object(extraction, 'document_text', replaced_meanwhile):
+            extraction.index_document(document.pk)
+        self.assertEqual(search_documents(Document.objects.all(), 'estoppel'), [])
+
+    @override_settings(SEARCH_USE_FTS=False)
+    def test_fallback_without_fts(self):
+        document = self.upload(self.case, 'memo.txt', b'a clause on severability and more')
+        results = search_documents(Document.objects.all(), 'severability', client_id=self.acme.pk)
+        self.assertEqual(results, [document])
+        self.assertIn('<mark>severability</mark>', results[0].snippet)
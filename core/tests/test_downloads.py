@@ -0,0 +1,94 @@
+import tempfile
+
+from django.contrib.auth.models import Group
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..downloads import parse_range
+from ..models import User, Client, Case, Document
+
+MEDIA_ROOT = tempfile.mkdtemp()
+DATA = bytes(range(256)) * 40
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, DOCUMENT_SENDFILE=None)
+class DocumentDownloadTest(TestCase):
+    def setUp(self):
+        self.owner = Client.objects.create(name='Owner', email='owner@example.com')
+        other = Client.objects.create(name='Other', email='other@example.com')
+        case = Case.objects.create(title='Case', client=self.owner)
+        self.document = Document.objects.create(
+            title='Brief', case=case, file=SimpleUploadedFile('brief.pdf', DATA),
+        )
+        self.url = reverse('document_download', args=[self.document.pk])
+        self.other_user = other.user
+        lawyer = User.objects.create_user('lawyer', 'lawyer@example.com', 'pw')
+        lawyer.groups.add(Group.objects.get_or_create(name='Lawyer')[0])
+        self.lawyer = lawyer
+
+    def get(self, user, **headers):
+        self.client.force_login(user)
+        return self.client.get(self.url, headers=headers)
+
+    def test_access_follows_case_rule(self):
+        response = self.get(self.owner.user)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), DATA)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.get(self.lawyer).status_code, 200)
+        self.assertEqual(self.get(self.other_user).status_code, 404)
+
+    def test_range_request(self):
+        response = self.get(self.lawyer, Range='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(DATA)}')
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(b''.join(response.streaming_content), DATA[100:200])
+
+        response = self.get(self.lawyer, Range='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), DATA[-10:])
+
+        response = self.get(self.lawyer, Range=f'bytes={len(DATA)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(DATA)}')
+
+    def test_stale_if_range_sends_full_body(self):
+        response = self.get(self.lawyer, Range='bytes=0-9', If_Range='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], str(len(DATA)))
+
+    def test_conditional_get(self):
+        response = self.get(self.lawyer)
+        etag = response['ETag']
+        self.assertEqual(etag, f'"{self.document.sha256}"')
+        self.assertEqual(self.get(self.lawyer, If_None_Match=etag).status_code, 304)
+        self.assertEqual(
+            self.get(self.lawyer, If_Modified_Since=response['Last-Modified']).status_code, 304,
+        )
+
+    @override_settings(DOCUMENT_SENDFILE='x-accel-redirect', DOCUMENT_SENDFILE_PREFIX='/protected/')
+    def test_x_accel_redirect(self):
+        response = self.get(self.lawyer)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{self.document.file.name}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="brief.pdf"')
+
+    @override_settings(DOCUMENT_SENDFILE='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.get(self.lawyer)
+        self.assertEqual(response['X-Sendfile'], self.document.file.path)
+
+
+class ParseRangeTest(TestCase):
+    def test_forms(self):
+        self.assertEqual(parse_range('bytes=0-0', 10), (0, 0))
+        self.assertEqual(parse_range('bytes=5-', 10), (5, 9))
+        self.assertEqual(parse_range('bytes=5-100', 10), (5, 9))
+        self.assertEqual(parse_range('bytes=-20', 10), (0, 9))
+        self.assertIsNone(parse_range(None, 10))
+        self.assertIsNone(parse_range('bytes=0-1,4-5', 10))
+        self.assertIsNone(parse_range('items=0-1', 10))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=10-', 10)
@@ -0,0 +1,39 @@
+import io
+import tempfile
+import zipfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import StreamingHttpResponse
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import User, Client, Case, Document
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class StreamingZipExportTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('root', 'root@example.com', 'testpass123')
+        client = Client.objects.create(name='Acme', email='acme@example.com')
+        case = Case.objects.create(title='Merger', client=client)
+        self.documents = [
+            Document.objects.create(title='Letter', case=case, file=SimpleUploadedFile('letter.pdf', b'%PDF' * 1000)),
+            Document.objects.create(title='Notes', case=case, file=SimpleUploadedFile('notes.txt', b'notes ' * 1000)),
+            Document.objects.create(title='Copy', case=case, file=SimpleUploadedFile('notes.txt', b'other notes')),
+        ]
+
+    def test_download_selected_streams_zip(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('admin:core_document_changelist'), {
+            'action': 'download_selected_documents',
+            '_selected_action': [document.pk for document in self.documents],
+        })
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertFalse(response.has_header('Content-Length'))
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        members = {info.filename: info for info in archive.infolist()}
+        self.assertEqual(set(members), {'Merger/letter.pdf', 'Merger/notes.txt', 'Merger/notes (2).txt'})
+        self.assertEqual(members['Merger/letter.pdf'].compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(members['Merger/notes.txt'].compress_type, zipfile.ZIP_DEFLATED)
+        self.assertEqual(archive.read('Merger/notes (2).txt'), b'other notes')
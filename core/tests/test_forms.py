@@ -180,7 +180,8 @@ class DocumentFormTest(TestCase):
         document.save()
         
         self.assertEqual(document.title, 'Test Document')
-        self.assertTrue(document.file.name.endswith('test_document.txt'))
+        self.assertEqual(document.original_name, 'test_document.txt')
+        self.assertEqual(document.extension, 'txt')
         
         # Clean up the test file
         if os.path.exists(document.file.path):
@@ -0,0 +1,93 @@
+import datetime
+import tempfile
+
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import fragments
+from ..models import User, Client, Case, Document, Appointment
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class FragmentCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.acme = Client.objects.create(name='Acme', email='acme@example.com')
+        self.globex = Client.objects.create(name='Globex', email='globex@example.com')
+        self.case = Case.objects.create(title='Merger', client=self.acme)
+        self.other_case = Case.objects.create(title='Lease', client=self.globex)
+        self.document = Document.objects.create(
+            title='Brief', case=self.case, file=SimpleUploadedFile('brief.txt', b'brief'),
+        )
+        lawyer = User.objects.create_user('lawyer', 'lawyer@example.com', 'pw')
+        lawyer.groups.add(Group.objects.get_or_create(name='Lawyer')[0])
+        self.client.force_login(lawyer)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [query['sql'] for query in queries]
+
+    def test_case_documents_are_served_from_cache_until_they_change(self):
+        url = reverse('case_detail', args=[self.case.pk])
+        self.get(url)
+        response, queries = self.get(url)
+        self.assertContains(response, 'Brief')
+        self.assertFalse(any('FROM "core_document"' in sql for sql in queries))
+
+        self.document.title = 'Amended brief'
+        self.document.save()
+        self.assertContains(self.get(url)[0], 'Amended brief')
+
+        # Moving the document retires the old case's list as well as the new one's.
+        self.document.case = self.other_case
+        self.document.save()
+        self.assertNotContains(self.get(url)[0], 'Amended brief')
+        self.assertContains(self.get(reverse('case_detail', args=[self.other_case.pk]))[0], 'Amended brief')
+
+        self.document.delete()
+        self.assertNotContains(self.get(reverse('case_detail', args=[self.other_case.pk]))[0], 'Amended brief')
+
+    def test_client_case_list(self):
+        url = reverse('client_detail', args=[self.acme.pk])
+        self.assertContains(self.get(url)[0], 'Merger')
+        self.case.client = self.globex
+        self.case.save()
+        self.assertNotContains(self.get(url)[0], 'Merger')
+        self.assertContains(self.get(reverse('client_detail', args=[self.globex.pk]))[0], 'Merger')
+
+    def test_dashboard_panels(self):
+        url = reverse('dashboard')
+        _, first = self.get(url)
+        response, second = self.get(url)
+        self.assertLess(len(second), len(first))
+        self.assertContains(response, 'Globex')
+
+        self.globex.name = 'Initech'
+        self.globex.save()
+        response = self.get(url)[0]
+        self.assertContains(response, 'Initech')
+        self.assertNotContains(response, 'Globex')
+        self.assertContains(self.get(url + '?q=lease')[0], 'Lease')
+
+    def test_client_appointments_panel(self):
+        self.client.force_login(self.acme.user)
+        url = reverse('dashboard')
+        self.assertContains(self.get(url)[0], 'No appointments booked yet.')
+        Appointment.objects.create(client=self.acme, date=datetime.date(2030, 1, 7), time=datetime.time(9), message='Kickoff')
+        self.assertContains(self.get(url)[0], 'Kickoff')
+
+    def test_stamps_are_bumped_again_on_commit(self):
+        ref = fragments.Ref.of(self.case)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.case.save()
+                during = fragments.stamps([ref])
+        self.assertNotEqual(fragments.stamps([ref]), during)
@@ -0,0 +1,85 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import fragments
+from ..jobs import work, worker_name
+from ..models import User, Client, Job
+from ..search import search_clients
+
+
+class ImportClientsTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        Client.objects.create(name='Existing Client', email='taken@example.com')
+        User.objects.create_user(username='jdoe', email='other@example.com')
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+        return path
+
+    def test_csv_import(self):
+        path = self.write('clients.csv', (
+            'name,email,phone,date_of_birth\n'
+            'john doe,JDoe@Example.com,555-0100,1980-02-03\n'
+            'jane roe,jdoe@other.org,,\n'
+            'dup,taken@example.com,,\n'
+            'bad,not-an-email,,\n'
+            'again,jdoe@example.com,,\n'
+        ))
+        call_command('import_clients', path, batch_size=2, stdout=StringIO())
+
+        john = Client.objects.get(email='jdoe@example.com')
+        self.assertEqual(john.name, 'John Doe')
+        self.assertEqual(john.user.username, 'jdoe_1')
+        self.assertEqual(john.user.first_name, 'John')
+        self.assertFalse(john.user.has_usable_password())
+        self.assertEqual(Client.objects.get(email='jdoe@other.org').user.username, 'jdoe_2')
+        self.assertEqual(list(search_clients(Client.objects.all(), 'jane')), [Client.objects.get(email='jdoe@other.org')])
+
+        with open(path + '.rejected.csv', encoding='utf-8') as handle:
+            rejects = list(csv.DictReader(handle))
+        self.assertEqual([row['email'] for row in rejects], ['taken@example.com', 'not-an-email', 'jdoe@example.com'])
+
+    def test_ndjson_dry_run(self):
+        path = self.write('clients.ndjson', '\n'.join([
+            json.dumps({'name': 'Ann Lee', 'email': 'ann@example.com'}),
+            '{broken',
+        ]))
+        call_command('import_clients', path, dry_run=True, stdout=StringIO())
+        self.assertFalse(Client.objects.filter(email='ann@example.com').exists())
+        with open(path + '.rejected.ndjson', encoding='utf-8') as handle:
+            self.assertIn('Invalid JSON', json.loads(handle.readline())['error'])
+
+    def test_import_is_seen_by_other_processes(self):
+        # A separate connection to the cache stands in for a web worker.
+        other = caches.create_connection('default')
+        key = fragments.Ref('core.client').key
+        before = fragments.stamps([fragments.Ref('core.client')])[0]
+        self.assertEqual(other.get(key), before)
+        path = self.write('clients.csv', 'name,email\nann lee,ann@example.com\n')
+        call_command('import_clients', path, stdout=StringIO())
+        self.assertNotIn(other.get(key), (None, before))
+
+    @override_settings(JOBS_EAGER=False)
+    def test_activation_emails_are_queued(self):
+        path = self.write('clients.csv', 'name,email\nann lee,ann@example.com\nbo chan,bo@example.com\n')
+        out = StringIO()
+        call_command('import_clients', path, base_url='https://firm.example/', stdout=out)
+        self.assertIn('2 activation emails queued', out.getvalue())
+        work(worker_name(), burst=True)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['ann@example.com', 'bo@example.com'])
+        self.assertIn('https://firm.example/', mail.outbox[0].body)
+
+        path = self.write('more.csv', 'name,email\ncy dee,cy@example.com\n')
+        call_command('import_clients', path, no_activation=True, stdout=StringIO())
+        self.assertFalse(Job.objects.filter(status=Job.QUEUED).exists())
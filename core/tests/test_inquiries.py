@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import inquiries
+from ..models import Visitor
+
+
+class InquirySpoolTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = override_settings(VISITOR_SPOOL_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def submit(self, index):
+        inquiries.submit({'name': f'Visitor {index}', 'email': f'v{index}@example.com', 'message': 'Hello'})
+
+    def test_landing_page_spools_without_touching_the_database(self):
+        data = {'name': 'Ann', 'email': 'ann@example.com', 'message': 'Call me'}
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('landing_page'), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Visitor.objects.exists())
+        self.assertGreater(inquiries.pending_bytes(), 0)
+
+        out = StringIO()
+        call_command('flush_visitor_spool', stdout=out)
+        self.assertIn('Flushed 1 inquiries', out.getvalue())
+        visitor = Visitor.objects.get()
+        self.assertEqual((visitor.name, visitor.email), ('Ann', 'ann@example.com'))
+        self.assertIsNotNone(visitor.spool_id)
+        self.assertEqual(inquiries.pending_bytes(), 0)
+
+    def test_flush_inserts_in_batches(self):
+        for index in range(7):
+            self.submit(index)
+        # A lookup of already inserted records and an INSERT per batch.
+        with self.assertNumQueries(6):
+            self.assertEqual(inquiries.flush(batch_size=3), 7)
+        self.assertEqual(Visitor.objects.count(), 7)
+        self.assertEqual(inquiries.flush(), 0)
+
+    def test_interrupted_flush_is_resumed_without_duplicates(self):
+        for index in range(3):
+            self.submit(index)
+        inquiries._rotate(self.directory)
+        [ready] = [name for name in os.listdir(self.directory) if name.startswith('ready-')]
+        path = os.path.join(self.directory, ready)
+        # As if the flusher died after inserting, but before removing, the file.
+        Visitor.objects.bulk_create(inquiries._records(path))
+        with open(path, 'ab') as handle:
+            handle.write(b'{"id": "torn')
+        self.submit(3)
+
+        self.assertEqual(inquiries.flush(), 1)
+        self.assertEqual(Visitor.objects.count(), 4)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['flush.lock'])
+
+    @override_settings(VISITOR_SPOOL_DIR=None)
+    def test_direct_save_without_a_spool(self):
+        self.assertIsNotNone(inquiries.submit({'name': 'Ann', 'email': 'ann@example.com', 'message': 'Hi'}))
+        self.assertEqual(Visitor.objects.count(), 1)
@@ -0,0 +1,94 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import jobs
+from ..models import Job
+
+CALLS = []
+
+
+def record(value):
+    CALLS.append(value)
+
+
+def explode():
+    raise RuntimeError('boom')
+
+
+@override_settings(JOBS_EAGER=False, JOBS_RETRY_BACKOFF=10, JOBS_RETRY_BACKOFF_MAX=60)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_runs_by_priority_then_age(self):
+        jobs.enqueue(record, value='low')
+        jobs.enqueue(record, value='high', priority=5)
+        jobs.enqueue(record, value='later', delay=timedelta(hours=1))
+        self.assertEqual(jobs.work('test', burst=True), 2)
+        self.assertEqual(CALLS, ['high', 'low'])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+        self.assertEqual(Job.objects.get(status=Job.QUEUED).kwargs, {'value': 'later'})
+
+    def test_claim_is_exclusive(self):
+        jobs.enqueue(record, value=1)
+        job = jobs.claim('a')
+        self.assertEqual((job.status, job.locked_by, job.attempts), (Job.RUNNING, 'a', 1))
+        self.assertIsNone(jobs.claim('b'))
+
+    def test_retry_with_backoff_then_fail(self):
+        job = jobs.enqueue(explode, max_attempts=2)
+        before = timezone.now()
+        with self.assertLogs('core.jobs', 'WARNING'):
+            self.assertFalse(jobs.run(jobs.claim('a')))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run(jobs.claim('a'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_unique_and_stale_locks(self):
+        jobs.enqueue(record, value=1, unique=True)
+        jobs.enqueue(record, value=1, unique=True)
+        self.assertEqual(Job.objects.count(), 1)
+
+        jobs.claim('dead-worker')
+        # A running job may have read stale inputs, so it does not absorb a new one.
+        self.assertIsNotNone(jobs.enqueue(record, value=1, unique=True))
+        Job.objects.filter(status=Job.QUEUED).delete()
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), (1, 0))
+        self.assertEqual(jobs.work('test', burst=True), 1)
+        self.assertEqual(CALLS, [1])
+
+    def test_heartbeat_keeps_long_job_locked(self):
+        jobs.enqueue(record, value=1)
+        job = jobs.claim('busy-worker')
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertTrue(jobs.heartbeat(job))
+        self.assertEqual(jobs.requeue_stale(), (0, 0))
+        Job.objects.update(status=Job.QUEUED, locked_by='')
+        self.assertFalse(jobs.heartbeat(job))
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(jobs.enqueue(record, value='now'))
+            self.assertEqual(CALLS, [])
+        self.assertEqual(CALLS, ['now'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_run_workers_burst(self):
+        jobs.enqueue(record, value='x')
+        out = StringIO()
+        call_command('run_workers', processes=1, burst=True, stdout=out)
+        self.assertEqual(CALLS, ['x'])
+        self.assertIn('after 1 jobs', out.getvalue())
@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+from django.test import TestCase, override_settings
+
+from .. import objectcache
+from ..models import Client, Case
+
+
+class ObjectCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        objectcache.clear()
+        # Rows written inside the test's transaction bypass the cache until it commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.acme = Client.objects.create(name='Acme', email='acme@example.com')
+            self.case = Case.objects.create(title='Merger', client=self.acme)
+
+    def test_repeated_lookups_are_served_from_memory(self):
+        self.assertEqual(objectcache.get_case(self.case.pk).client.name, 'Acme')
+        with self.assertNumQueries(0):
+            case = objectcache.get_case(self.case.pk)
+        self.assertEqual((case.title, case.client_id, case.client.user_id), ('Merger', self.acme.pk, self.acme.user_id))
+        self.assertEqual(objectcache.stats()['hits'], 2)
+        self.assertEqual(objectcache.stats()['misses'], 2)
+
+    def test_writes_invalidate(self):
+        objectcache.get_case(self.case.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.case.title = 'Acquisition'
+            self.case.save()
+        self.assertEqual(objectcache.get_case(self.case.pk).title, 'Acquisition')
+
+        # Another process's write only shows up as a new stamp.
+        cache.set(f'fragment:stamp:core.client:{self.acme.pk}', 'elsewhere')
+        Client.objects.filter(pk=self.acme.pk).update(name='Initech')
+        self.assertEqual(objectcache.get_client(self.acme.pk).name, 'Initech')
+
+        pk = self.case.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.case.delete()
+        with self.assertRaises(Http404):
+            objectcache.get_case_or_404(pk)
+
+    def test_uncommitted_writes_are_not_cached(self):
+        with transaction.atomic():
+            self.acme.name = 'Draft'
+            self.acme.save()
+            self.assertEqual(objectcache.get_client(self.acme.pk).name, 'Draft')
+            self.assertEqual(objectcache.stats()['size'], 0)
+
+    @override_settings(OBJECT_CACHE_SIZE=1)
+    def test_size_bound(self):
+        objectcache.get_case(self.case.pk)
+        self.assertEqual(objectcache.stats()['size'], 1)
+        self.assertEqual(objectcache.stats()['evictions'], 1)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_bypassed_without_a_shared_cache(self):
+        objectcache.get_case(self.case.pk)
+        with self.assertNumQueries(2):
+            objectcache.get_case(self.case.pk)
+        self.assertEqual(objectcache.stats()['size'], 0)
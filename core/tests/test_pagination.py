@@ -0,0 +1,57 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Client, Case
+from ..pagination import decode_cursor, encode_cursor, keyset_paginate
+
+User = get_user_model()
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.acme = Client.objects.create(name='Acme', email='acme@example.com')
+        # Several cases share an opened_on date so the id tie-breaker matters.
+        for i in range(7):
+            Case.objects.create(title=f'Case {i}', client=self.acme)
+        Case.objects.filter(title__in=['Case 0', 'Case 1']).update(opened_on=datetime.date(2024, 1, 1))
+
+    def test_walks_every_row_once(self):
+        seen, cursor = [], None
+        while True:
+            page = keyset_paginate(Case.objects.all(), ('-opened_on', '-id'), cursor, per_page=3)
+            seen.extend(case.pk for case in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        expected = list(Case.objects.order_by('-opened_on', '-id').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_is_first_page(self):
+        self.assertIsNone(decode_cursor('not-a-cursor!', 2))
+        page = keyset_paginate(Case.objects.all(), ('-opened_on', '-id'), 'bogus', per_page=3)
+        self.assertEqual(len(page), 3)
+
+    @override_settings(DASHBOARD_PAGE_SIZE=3)
+    def test_dashboard_fetches_one_page(self):
+        lawyer = User.objects.create_user(username='lawyer', password='testpass123')
+        lawyer.groups.add(Group.objects.create(name='Lawyer'))
+        self.client.force_login(lawyer)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(response.context['cases']), 3)
+        self.assertIn('cases_after=', response.context['more_cases_query'])
+        response = self.client.get(reverse('dashboard') + '?' + response.context['more_cases_query'])
+        self.assertEqual(len(response.context['cases']), 3)
+
+    @override_settings(DASHBOARD_PAGE_SIZE=3)
+    def test_tampered_cursor_is_first_page(self):
+        lawyer = User.objects.create_user(username='lawyer', password='testpass123')
+        lawyer.groups.add(Group.objects.create(name='Lawyer'))
+        self.client.force_login(lawyer)
+        response = self.client.get(reverse('dashboard'), {'cases_after': encode_cursor(['zz', 1])})
+        self.assertEqual(response.status_code, 200)
+        first = list(Case.objects.order_by('-opened_on', '-id')[:3])
+        self.assertEqual(list(response.context['cases']), first)
@@ -0,0 +1,47 @@
+from io import StringIO
+
+from django.contrib.auth.models import Group
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import User, Client, Notification
+
+
+class PendingRegistrationTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('root', 'root@example.com', 'testpass123')
+        Group.objects.create(name='Clients')
+        self.pending = []
+        for i in range(5):
+            user = User.objects.create_user(f'user{i}', f'user{i}@example.com', is_active=False)
+            Client.objects.create(user=user, name=f'User {i}', email=f'user{i}@example.com')
+            self.pending.append(user)
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:core_pendingregistration_changelist')
+
+    def test_changelist_lists_only_pending(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+    def test_bulk_approve(self):
+        data = {
+            'action': 'approve_selected',
+            '_selected_action': [user.pk for user in self.pending],
+        }
+        # Constant regardless of how many registrations are selected: one
+        # UPDATE, one membership INSERT, one notification INSERT and one
+        # (deduplicated) send job.
+        with self.assertNumQueries(13):
+            self.client.post(self.url, data)
+        for user in self.pending:
+            user.refresh_from_db()
+            self.assertTrue(user.is_active)
+            self.assertTrue(user.groups.filter(name='Clients').exists())
+        self.assertEqual(Notification.objects.filter(kind='welcome', sent_at__isnull=True).count(), 5)
+        self.assertEqual(mail.outbox, [])
+
+        call_command('send_notifications', batch_size=2, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Client, Case
+from ..principal import get_principal
+
+User = get_user_model()
+
+
+class PrincipalTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lawyer = User.objects.create_user(username='lawyer', password='testpass123')
+        self.lawyer.groups.add(Group.objects.create(name='Lawyer'))
+        self.client_user = User.objects.create_user(username='client', email='client@example.com', password='testpass123')
+        self.client_profile = Client.objects.create(user=self.client_user, name='Client User', email='client@example.com')
+
+    def fresh(self, user):
+        return User.objects.get(pk=user.pk)
+
+    def test_staff_role(self):
+        principal = get_principal(self.fresh(self.lawyer))
+        self.assertTrue(principal.is_staff_role)
+        self.assertIsNone(principal.client_id)
+
+    def test_client_id(self):
+        principal = get_principal(self.fresh(self.client_user))
+        self.assertFalse(principal.is_staff_role)
+        self.assertEqual(principal.client_id, self.client_profile.pk)
+
+    def test_resolved_once_then_cached(self):
+        with self.assertNumQueries(1):
+            user = self.fresh(self.lawyer)
+        with self.assertNumQueries(1):
+            get_principal(user)
+            get_principal(user)
+        with self.assertNumQueries(0):
+            get_principal(User(pk=self.lawyer.pk))
+
+    def test_group_change_invalidates(self):
+        self.assertFalse(get_principal(self.fresh(self.client_user)).is_staff_role)
+        self.client_user.groups.add(Group.objects.get(name='Lawyer'))
+        self.assertTrue(get_principal(self.fresh(self.client_user)).is_staff_role)
+        group = Group.objects.get(name='Lawyer')
+        group.name = 'Paralegal'
+        group.save()
+        self.assertFalse(get_principal(self.fresh(self.client_user)).is_staff_role)
+
+    def test_dashboard_single_role_lookup(self):
+        Case.objects.create(title='Case', client=self.client_profile)
+        self.client.force_login(self.lawyer)
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('dashboard'))
+        role_queries = [q for q in ctx.captured_queries if 'auth_group' in q['sql'] or 'core_user_groups' in q['sql']]
+        self.assertEqual(role_queries, [])
+
+    def test_reassigned_profile_invalidates_previous_user(self):
+        self.assertEqual(get_principal(self.fresh(self.client_user)).client_id, self.client_profile.pk)
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.client_profile.user = other
+        self.client_profile.email = other.email
+        self.client_profile.save()
+        self.assertIsNone(get_principal(self.fresh(self.client_user)).client_id)
+        self.assertEqual(get_principal(self.fresh(other)).client_id, self.client_profile.pk)
+
+    def test_process_local_cache_fails_check(self):
+        from django.test import override_settings
+
+        from ..checks import check_production_cache, check_shared_cache
+
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['core.E001'])
+        self.assertEqual(check_shared_cache(None), [])
+        database = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'core_cache'}
+        with override_settings(CACHES={'default': database}):
+            self.assertEqual([warning.id for warning in check_production_cache(None)], ['core.W002'])
+        redis = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'}
+        with override_settings(CACHES={'default': redis}):
+            self.assertEqual(check_production_cache(None), [])
@@ -0,0 +1,86 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import extraction
+from ..models import Client, Case, Document, Visitor, Appointment
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Budgets must hold regardless of how many rows are listed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser('root', 'root@example.com', 'testpass123')
+        cls.lawyer = User.objects.create_user('lawyer', 'lawyer@example.com', 'testpass123')
+        cls.lawyer.groups.add(Group.objects.create(name='Lawyer'))
+        for i in range(10):
+            client = Client.objects.create(name=f'Client {i}', email=f'client{i}@example.com')
+            case = Case.objects.create(title=f'Case {i}', client=client, lawyer=cls.lawyer)
+            for j in range(3):
+                Document.objects.create(
+                    title=f'Doc {j}', case=case,
+                    file=SimpleUploadedFile(f'doc{j}.txt', b'content'),
+                )
+            Appointment.objects.create(client=client, date='2025-01-01', time='10:00')
+            Visitor.objects.create(name=f'Visitor {i}', email=f'v{i}@example.com', message='Hello')
+        # Extracted text for the full-text search paths.
+        for document in case.document_set.all():
+            extraction.index_document(document.pk)
+        cls.case = case
+        cls.client_profile = client
+
+    def setUp(self):
+        # Measure the cold path: role lookups are not cached yet.
+        cache.clear()
+
+    def test_site_views(self):
+        for user in (self.superuser, self.lawyer):
+            self.client.force_login(user)
+            self.assertQueryBudget('dashboard', reverse('dashboard'))
+            self.assertQueryBudget('case_detail', reverse('case_detail', args=[self.case.pk]))
+            self.assertQueryBudget('client_detail', reverse('client_detail', args=[self.client_profile.pk]))
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.superuser)
+        for model in ('client', 'case', 'document', 'appointment', 'visitor', 'user'):
+            view_name = f'admin:core_{model}_changelist'
+            response = self.assertQueryBudget(view_name, reverse(view_name))
+            self.assertEqual(response.status_code, 200)
+
+    def test_search_variants(self):
+        self.client.force_login(self.superuser)
+        response = self.assertQueryBudget(
+            'case_detail', reverse('case_detail', args=[self.case.pk]), data={'q': 'content'},
+        )
+        self.assertEqual(len(response.context['documents']), 3)
+        view_name = 'admin:core_document_changelist'
+        response = self.assertQueryBudget(view_name, reverse(view_name), data={'q': 'content'})
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+    def test_only_page_reads_are_budgeted(self):
+        self.client.force_login(self.superuser)
+        url = reverse('case_detail', args=[self.case.pk])
+        upload = SimpleUploadedFile('new.txt', b'new content')
+        with self.assertNoLogs('core.middleware', 'WARNING'):
+            response = self.client.post(url, {'title': 'New', 'file': upload})
+        self.assertEqual(response.status_code, 302)
+        with override_settings(QUERY_BUDGETS={'case_detail': 1}):
+            with self.assertLogs('core.middleware', 'WARNING') as logs:
+                self.client.get(url)
+        self.assertIn('case_detail ran', logs.output[0])
+
+    @override_settings(DEBUG=True)
+    def test_debug_header(self):
+        self.client.force_login(self.superuser)
+        response = self.client.get(reverse('dashboard'))
+        self.assertTrue(response['X-DB-Queries'].isdigit())
@@ -0,0 +1,97 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import notifications, reminders
+from ..models import User, Client, Case, Appointment, AppointmentSlot, Notification
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+
+class ReminderTest(TestCase):
+    def setUp(self):
+        self.now = timezone.make_aware(datetime.datetime(2030, 1, 7, 9, 0))
+        self.today = self.now.date()
+        self.lawyer = User.objects.create_user('lawyer', 'lawyer@example.com', 'pw', first_name='Ann')
+        self.lawyer.groups.add(Group.objects.get_or_create(name='Lawyer')[0])
+        self.acme = Client.objects.create(name='Acme', email='acme@example.com')
+        self.merger = Case.objects.create(
+            title='Merger', client=self.acme, lawyer=self.lawyer, due_date=self.today + datetime.timedelta(days=2),
+        )
+        Case.objects.create(title='Closed', client=self.acme, lawyer=self.lawyer, due_date=self.today, status='closed')
+        Case.objects.create(title='Later', client=self.acme, lawyer=self.lawyer, due_date=self.today + datetime.timedelta(days=30))
+        self.meeting = Appointment.objects.create(client=self.acme, date=self.today, time=datetime.time(14))
+        AppointmentSlot.objects.create(appointment=self.meeting, lawyer=self.lawyer, date=self.today, time=datetime.time(14))
+        # Already over, and too far ahead.
+        Appointment.objects.create(client=self.acme, date=self.today, time=datetime.time(8))
+        Appointment.objects.create(client=self.acme, date=self.today + datetime.timedelta(days=2), time=datetime.time(9))
+
+    def test_due_reminders_are_sent_once(self):
+        self.assertEqual(reminders.dispatch(now=self.now), (3, 0, 3))
+        subjects = sorted(message.subject for message in mail.outbox)
+        self.assertEqual(subjects, [
+            'Reminder: Merger is due Jan 09',
+            'Reminder: appointment on Jan 07 at 14:00',
+            'Reminder: appointment on Jan 07 at 14:00',
+        ])
+        self.assertIn('Acme', mail.outbox[0].body)
+
+        self.assertEqual(reminders.dispatch(now=self.now), (0, 3, 0))
+
+        # A moved deadline is a new reminder.
+        self.merger.due_date = self.today + datetime.timedelta(days=1)
+        self.merger.save()
+        self.assertEqual(reminders.dispatch(now=self.now), (1, 2, 1))
+
+    def test_wording_and_date_follow_the_reminder(self):
+        reminders.queue_due(now=self.now)
+        # Moved after queueing: the queued reminders still describe their own deadline.
+        self.merger.due_date = self.today + datetime.timedelta(days=1)
+        self.merger.save()
+        self.meeting.time = datetime.time(16)
+        self.meeting.save()
+        notifications.send_pending()
+        subjects = sorted(message.subject for message in mail.outbox)
+        self.assertEqual(subjects[0], 'Reminder: Merger is due Jan 09')
+        [client_mail] = [message for message in mail.outbox if message.to == ['acme@example.com']]
+        self.assertEqual(client_mail.subject, 'Reminder: appointment on Jan 07 at 14:00')
+        self.assertIn('your appointment on Monday, January 7 at 14:00', client_mail.body)
+        self.assertNotIn('with Acme', client_mail.body)
+        lawyer_bodies = ''.join(message.body for message in mail.outbox if message.to == ['lawyer@example.com'])
+        self.assertIn('appointment with Acme', lawyer_bodies)
+        self.assertIn('due on Wednesday, January 9', lawyer_bodies)
+
+    def test_rows_lost_to_a_concurrent_run_are_not_counted(self):
+        self.assertEqual(reminders.queue_due(now=self.now), (3, 0))
+        existing = reminders._existing
+        # As if another run inserted them after this one looked.
+        with mock.patch.object(reminders, '_existing', side_effect=lambda due, *extra: existing(due, *extra) if extra else set()):
+            self.assertEqual(reminders.queue_due(now=self.now), (0, 3))
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_batches_share_a_connection(self):
+        for index in range(5):
+            Case.objects.create(title=f'Case {index}', client=self.acme, lawyer=self.lawyer, due_date=self.today)
+        CountingBackend.opened = 0
+        queued, skipped, sent = reminders.dispatch(batch_size=4, connection=CountingBackend(), now=self.now)
+        self.assertEqual((queued, sent), (8, 8))
+        self.assertEqual(CountingBackend.opened, 2)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+
+    def test_command_reports_throughput(self):
+        out = StringIO()
+        call_command('send_reminders', stdout=out)
+        self.assertRegex(out.getvalue(), r'Sent \d+ emails in [\d.]+s \(\d+ msg/s\)')
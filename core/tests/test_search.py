@@ -0,0 +1,47 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from ..models import Client, Case
+from ..search import build_match, search_cases, search_clients
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.acme = Client.objects.create(name='Acme Holdings', email='legal@acme.com')
+        self.other = Client.objects.create(name='Jane Roe', email='jane@example.com')
+        self.merger = Case.objects.create(title='Merger review', client=self.acme, description='Antitrust filing')
+        self.lease = Case.objects.create(title='Lease dispute', client=self.other, description='Merger clause in lease')
+
+    def test_build_match_quotes_input(self):
+        self.assertEqual(build_match('foo "bar" OR'), '"foo"* "bar"* "OR"*')
+        self.assertIsNone(build_match('  -- '))
+
+    def test_ranked_case_search(self):
+        results = list(search_cases(Case.objects.all(), 'merger'))
+        self.assertEqual(results, [self.merger, self.lease])
+
+    def test_prefix_and_client_name(self):
+        self.assertEqual(list(search_cases(Case.objects.all(), 'acm')), [self.merger])
+        self.assertEqual(list(search_clients(Client.objects.all(), 'jan')), [self.other])
+
+    def test_client_scope(self):
+        results = search_cases(Case.objects.all(), 'merger', client_id=self.other.pk)
+        self.assertEqual(list(results), [self.lease])
+        self.assertFalse(search_cases(Case.objects.all(), 'acme', client_id=self.acme.pk).exists())
+
+    def test_index_follows_writes(self):
+        self.acme.name = 'Globex Corporation'
+        self.acme.save()
+        self.assertEqual(list(search_cases(Case.objects.all(), 'globex')), [self.merger])
+        self.merger.delete()
+        self.assertFalse(search_cases(Case.objects.all(), 'antitrust').exists())
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM core_case_fts')
+        self.assertFalse(search_cases(Case.objects.all(), 'lease').exists())
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(list(search_cases(Case.objects.all(), 'lease')), [self.lease])
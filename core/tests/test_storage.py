@@ -0,0 +1,125 @@
+import hashlib
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import User, Client, Case, Document, Blob
+from ..storage import ContentAddressedStorage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+    def setUp(self):
+        client = Client.objects.create(name='Acme', email='acme@example.com')
+        self.case = Case.objects.create(title='Case', client=client)
+        self.other_case = Case.objects.create(title='Other', client=client)
+        self.data = b'%PDF-1.4 engagement letter'
+        self.digest = hashlib.sha256(self.data).hexdigest()
+
+    def upload(self, case, name='letter.pdf', data=None):
+        return Document.objects.create(
+            title=name, case=case, file=SimpleUploadedFile(name, data or self.data),
+        )
+
+    def test_duplicates_share_one_blob(self):
+        first = self.upload(self.case)
+        second = self.upload(self.other_case, name='Engagement.PDF')
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(first.file.name, f'blobs/{self.digest[:2]}/{self.digest[2:4]}/{self.digest}')
+        self.assertEqual(second.original_name, 'Engagement.PDF')
+        blob = Blob.objects.get()
+        self.assertEqual((blob.sha256, blob.size, blob.ref_count), (self.digest, len(self.data), 2))
+        with first.file.open('rb') as handle:
+            self.assertEqual(handle.read(), self.data)
+
+    def test_spooled_upload_is_moved(self):
+        upload = TemporaryUploadedFile('big.pdf', 'application/pdf', len(self.data), None)
+        upload.write(self.data)
+        upload.seek(0)
+        document = Document.objects.create(title='Big', case=self.case, file=upload)
+        self.assertEqual(document.blob_id, self.digest)
+        self.assertTrue(os.path.exists(document.file.path))
+
+    def test_same_bytes_under_another_extension(self):
+        first = self.upload(self.case)
+        second = self.upload(self.other_case, name='letter.txt')
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual((second.extension, second.mime_type), ('txt', 'text/plain'))
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_spooled_upload_hashed_on_receipt(self):
+        lawyer = User.objects.create_user(username='lawyer', password='testpass123')
+        lawyer.groups.add(Group.objects.create(name='Lawyer'))
+        self.client.force_login(lawyer)
+        with mock.patch.object(ContentAddressedStorage, '_hash_file') as hash_file:
+            self.client.post(reverse('case_detail', args=[self.case.pk]), {
+                'title': 'Letter', 'file': SimpleUploadedFile('letter.pdf', self.data),
+            })
+        hash_file.assert_not_called()
+        self.assertEqual(Document.objects.get().blob_id, self.digest)
+
+    def test_release_and_prune(self):
+        first = self.upload(self.case)
+        second = self.upload(self.other_case)
+        path = first.file.path
+        first.delete()
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+        call_command('prune_blobs', min_age=0, stdout=StringIO())
+        self.assertTrue(os.path.exists(path))
+
+        second.delete()
+        self.assertEqual(Blob.objects.get().ref_count, 0)
+        call_command('prune_blobs', min_age=0, stdout=StringIO())
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_replacing_file_moves_reference(self):
+        document = self.upload(self.case)
+        document.file = SimpleUploadedFile('new.pdf', b'revised letter')
+        document.save()
+        counts = dict(Blob.objects.values_list('sha256', 'ref_count'))
+        self.assertEqual(counts[self.digest], 0)
+        self.assertEqual(counts[document.blob_id], 1)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class DocumentMetadataTest(TestCase):
+    def setUp(self):
+        client = Client.objects.create(name='Acme', email='acme@example.com')
+        self.case = Case.objects.create(title='Case', client=client)
+
+    def test_recorded_at_upload(self):
+        document = Document.objects.create(title='Scan', case=self.case, file=SimpleUploadedFile('Scan.JPG', b'jpeg bytes'))
+        self.assertEqual(document.size_bytes, 10)
+        self.assertEqual(document.extension, 'jpg')
+        self.assertEqual(document.mime_type, 'image/jpeg')
+        self.assertEqual(document.sha256, hashlib.sha256(b'jpeg bytes').hexdigest())
+
+    def test_backfill(self):
+        document = Document.objects.create(title='Memo', case=self.case, file=SimpleUploadedFile('memo.txt', b'memo'))
+        gone = Document.objects.create(title='Gone', case=self.case, file=SimpleUploadedFile('gone.txt', b'gone'))
+        os.remove(gone.file.path)
+        Document.objects.update(size_bytes=None, mime_type='', extension='', sha256='')
+
+        call_command('backfill_document_metadata', batch_size=1, stdout=StringIO())
+        document.refresh_from_db()
+        self.assertEqual((document.size_bytes, document.extension, document.mime_type), (4, 'txt', 'text/plain'))
+        self.assertEqual(document.sha256, hashlib.sha256(b'memo').hexdigest())
+        self.assertIsNone(Document.objects.get(pk=gone.pk).size_bytes)
+
+    def test_admin_change_form_renders_from_row(self):
+        document = Document.objects.create(title='Scan', case=self.case, file=SimpleUploadedFile('scan.pdf', b'%PDF'))
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'testpass123'))
+        response = self.client.get(reverse('admin:core_document_change', args=[document.pk]))
+        self.assertContains(response, 'PDF')
+        self.assertContains(response, 'Open PDF')
+        self.assertNotContains(response, '<iframe')
@@ -0,0 +1,59 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .. import throttle
+from ..models import Visitor
+
+THROTTLES = {
+    'landing_page': {'ip': (2, 60)},
+    'login': {'ip': (10, 60), 'username': (2, 60)},
+}
+
+
+@override_settings(THROTTLES=THROTTLES, VISITOR_SPOOL_DIR=None)
+class ThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def inquiry(self, **extra):
+        data = {'name': 'Bot', 'email': 'bot@example.com', 'message': 'Hi'}
+        return self.client.post(reverse('landing_page'), data, **extra)
+
+    def test_burst_is_shed_before_the_view(self):
+        self.assertEqual(self.inquiry().status_code, 302)
+        self.assertEqual(self.inquiry().status_code, 302)
+        with self.assertNumQueries(0):
+            response = self.inquiry()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(Visitor.objects.count(), 2)
+        # Buckets are per address, and GETs are never throttled.
+        self.assertEqual(self.inquiry(REMOTE_ADDR='10.0.0.2').status_code, 302)
+        self.assertEqual(self.client.get(reverse('landing_page')).status_code, 200)
+        self.assertEqual(throttle.rejections()['landing_page'], 1)
+
+    def test_login_is_throttled_per_username(self):
+        url = reverse('login')
+        for address in ('10.0.0.1', '10.0.0.2'):
+            self.client.post(url, {'username': 'Ann', 'password': 'x'}, REMOTE_ADDR=address)
+        response = self.client.post(url, {'username': 'ann', 'password': 'x'}, REMOTE_ADDR='10.0.0.3')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.client.post(url, {'username': 'bob', 'password': 'x'}).status_code, 200)
+
+        # Reported through a connection of its own, as from another process.
+        out = StringIO()
+        with mock.patch.object(throttle, 'cache', caches.create_connection('default')):
+            call_command('throttle_stats', stdout=out)
+        self.assertIn('login: 1 rejected', out.getvalue())
+
+    def test_buckets_refill(self):
+        request = RequestFactory().post('/', {'username': 'ann'})
+        self.assertEqual(throttle.take('login', request, now=100), 0)
+        self.assertEqual(throttle.take('login', request, now=100), 0)
+        self.assertAlmostEqual(throttle.take('login', request, now=100.5), 0.5)
+        self.assertEqual(throttle.take('login', request, now=101), 0)
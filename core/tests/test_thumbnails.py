@@ -0,0 +1,80 @@
+import io
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import thumbnails
+from ..jobs import work, worker_name
+from ..models import User, Client, Case, Document, Job
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def png_bytes(size=(1200, 800)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@skipUnless(Image, 'Pillow is not installed')
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, THUMBNAIL_FORMAT='WEBP', THUMBNAIL_SIZE=(320, 320))
+class ThumbnailTest(TestCase):
+    def setUp(self):
+        client = Client.objects.create(name='Acme', email='acme@example.com')
+        self.case = Case.objects.create(title='Case', client=client)
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(self.admin)
+
+    def upload(self, name='exhibit.png', data=None):
+        document = Document.objects.create(
+            title=name, case=self.case, file=SimpleUploadedFile(name, data or png_bytes()),
+        )
+        return document, list(Job.objects.filter(task='core.thumbnails.generate_stored'))
+
+    def test_generated_by_job_next_to_original(self):
+        document, jobs = self.upload()
+        self.assertEqual([job.kwargs for job in jobs], [{'name': document.file.name}])
+        name = thumbnails.thumbnail_name(document.file.name)
+        self.assertEqual(name, document.file.name + '.thumb.webp')
+        self.assertEqual(work(worker_name(), burst=True), 2)  # thumbnail and text extraction
+        with document.file.storage.open(name, 'rb') as handle, Image.open(handle) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (320, 213))
+
+    def test_non_images_are_skipped(self):
+        _, jobs = self.upload('letter.pdf', b'%PDF-1.4')
+        self.assertEqual(jobs, [])
+        _, jobs = self.upload('logo.svg', b'<svg xmlns="http://www.w3.org/2000/svg"/>')
+        self.assertEqual(jobs, [])
+
+    def test_names_keep_original_extension(self):
+        self.assertEqual(thumbnails.thumbnail_name('docs/a.png'), 'docs/a.png.thumb.webp')
+        self.assertNotEqual(thumbnails.thumbnail_name('docs/a.png'), thumbnails.thumbnail_name('docs/a.jpg'))
+
+    def test_view_serves_placeholder_then_cached_thumbnail(self):
+        document, _ = self.upload(data=png_bytes((640, 640)))
+        url = reverse('admin:document_thumbnail', args=[document.pk])
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+        call_command('generate_thumbnails', stdout=StringIO())
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'RIFF'))
+
+    def test_corrupt_image_fails_quietly(self):
+        document, _ = self.upload('broken.jpg', b'not really a jpeg')
+        with self.assertLogs('core.thumbnails', 'WARNING'):
+            self.assertFalse(thumbnails.generate(document.file.storage, document.file.name))
@@ -0,0 +1,107 @@
+import hashlib
+import tempfile
+
+from django.contrib.auth.models import Permission
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import User, Client, Case, Document, UploadSession
+from ..uploads import assemble
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CHUNKED_UPLOAD_TEMP_DIR=tempfile.mkdtemp(), CHUNKED_UPLOAD_CHUNK_SIZE=4)
+class ChunkedUploadTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('root', 'root@example.com', 'testpass123')
+        client = Client.objects.create(name='Acme', email='acme@example.com')
+        self.case = Case.objects.create(title='Discovery', client=client)
+        self.client.force_login(self.admin)
+        self.data = b'0123456789'
+
+    def open_session(self):
+        response = self.client.post(reverse('admin:document_upload_session_create'), {
+            'case': self.case.pk, 'title': 'Bundle', 'filename': 'bundle.pdf', 'size': len(self.data),
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def put_chunk(self, session_id, index, data, digest=None):
+        return self.client.put(
+            reverse('admin:document_upload_chunk', args=[session_id, index]),
+            data=data, content_type='application/octet-stream',
+            HTTP_X_CHUNK_SHA256=digest or hashlib.sha256(data).hexdigest(),
+        )
+
+    def test_out_of_order_resume_and_complete(self):
+        session = self.open_session()
+        self.assertEqual(session['chunk_count'], 3)
+        self.assertEqual(self.put_chunk(session['id'], 2, self.data[8:]).status_code, 200)
+        self.assertEqual(self.put_chunk(session['id'], 0, self.data[:4]).json()['offset'], 4)
+
+        status = self.client.get(reverse('admin:document_upload_session', args=[session['id']])).json()
+        self.assertEqual((status['received'], status['offset']), ([0, 2], 4))
+
+        complete = reverse('admin:document_upload_complete', args=[session['id']])
+        self.assertEqual(self.client.post(complete).status_code, 409)
+        self.put_chunk(session['id'], 1, self.data[4:8])
+        result = self.client.post(complete).json()
+        self.assertEqual(result['sha256'], hashlib.sha256(self.data).hexdigest())
+
+        document = Document.objects.get(pk=result['id'])
+        self.assertEqual((document.title, document.case, document.original_name), ('Bundle', self.case, 'bundle.pdf'))
+        with document.file.open('rb') as handle:
+            self.assertEqual(handle.read(), self.data)
+        self.assertFalse(UploadSession.objects.get().chunks.exists())
+
+    def test_rejects_bad_chunks(self):
+        session = self.open_session()
+        self.assertEqual(self.put_chunk(session['id'], 0, b'0123', digest='0' * 64).status_code, 400)
+        self.assertEqual(self.put_chunk(session['id'], 0, b'012').status_code, 400)
+        self.assertEqual(self.put_chunk(session['id'], 5, b'0123').status_code, 400)
+        self.assertEqual(UploadSession.objects.get().chunks.count(), 0)
+
+    def test_single_request_upload(self):
+        response = self.client.post(reverse('admin:document_upload'), {
+            'case': self.case.pk, 'file': SimpleUploadedFile('memo.txt', b'memo'),
+        })
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(Document.objects.get().title, 'memo.txt')
+
+    def test_concurrent_complete_keeps_first_document(self):
+        session_id = self.open_session()['id']
+        for index in range(3):
+            self.put_chunk(session_id, index, self.data[index * 4:index * 4 + 4])
+        stale = UploadSession.objects.get(pk=session_id)
+        winner = Document.objects.create(title='Bundle', case=self.case, file=SimpleUploadedFile('bundle.pdf', self.data))
+        UploadSession.objects.filter(pk=session_id).update(document=winner)
+        self.assertEqual(assemble(stale), winner)
+        self.assertEqual(Document.objects.count(), 1)
+
+    def test_session_limited_to_visible_cases(self):
+        lawyer = User.objects.create_user('lawyer', 'lawyer@example.com', 'testpass123', is_staff=True)
+        lawyer.user_permissions.add(Permission.objects.get(codename='add_document'))
+        self.client.force_login(lawyer)
+        response = self.client.post(reverse('admin:document_upload_session_create'), {
+            'case': self.case.pk, 'title': 'Bundle', 'filename': 'bundle.pdf', 'size': len(self.data),
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UploadSession.objects.exists())
+
+        self.case.lawyer = lawyer
+        self.case.save()
+        self.assertEqual(self.open_session()['chunk_count'], 3)
+
+    def test_uploads_and_sessions_of_hidden_cases_are_refused(self):
+        session_id = self.open_session()['id']
+        lawyer = User.objects.create_user('lawyer', 'lawyer@example.com', 'testpass123', is_staff=True)
+        lawyer.user_permissions.add(Permission.objects.get(codename='add_document'))
+        self.client.force_login(lawyer)
+        response = self.client.post(reverse('admin:document_upload'), {
+            'case': self.case.pk, 'file': SimpleUploadedFile('memo.txt', b'memo'),
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.put_chunk(session_id, 0, self.data[:4]).status_code, 404)
+        self.assertEqual(self.client.get(reverse('admin:document_upload_session', args=[session_id])).status_code, 404)
+        self.assertEqual(self.client.post(reverse('admin:document_upload_complete', args=[session_id])).status_code, 404)
+        self.assertFalse(Document.objects.exists())
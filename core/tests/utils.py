@@ -0,0 +1,24 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..instrumentation import query_budget
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin that pins the SQL query budget of a view.
+
+    Budgets come from ``settings.QUERY_BUDGETS`` so the limit enforced in the
+    test suite is the same one the middleware reports against at runtime.
+    """
+
+    def assertQueryBudget(self, view_name, url, method='get', **kwargs):
+        budget = query_budget(view_name, method)
+        if budget is None:
+            self.fail(f"No query budget configured for {method.upper()} {view_name!r}")
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, **kwargs)
+        if len(ctx) > budget:
+            queries = '\n'.join(f"{i}. {q['sql']}" for i, q in enumerate(ctx.captured_queries, start=1))
+            self.fail(f"{view_name} ran {len(ctx)} queries, budget is {budget}:\n{queries}")
+        return response
@@ -0,0 +1,84 @@
+"""
+Token-bucket rate limits for anonymous POST endpoints.
+
+``settings.THROTTLES`` maps a URL name to its buckets::
+
+    'login': {'ip': (20, 10), 'username': (5, 2)}
+
+Each bucket holds up to ``burst`` tokens and refills at ``per_minute``. The
+``'ip'`` bucket is keyed on the client address; any other name is a POST
+field (an email address or username), compared case-insensitively. A request
+takes one token from each of its buckets, and is rejected if any is empty.
+
+``ThrottleMiddleware`` runs the check before the view, so a rejected request
+never reaches a password hash or the ORM. Buckets live in the default cache,
+which every worker shares, as ``(tokens, updated)`` pairs, read and written
+with one ``get_many``/``set_many`` each. Two processes racing on one bucket
+may both take the last token, which lets a few extra requests through.
+Rejections are counted per endpoint in the cache too (``rejections``), so
+``throttle_stats`` reports them from its own process.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+REJECTED_KEY = 'throttle:rejected:{}'
+
+
+def _bucket_key(endpoint, scope, value):
+    digest = hashlib.sha256(value.encode()).hexdigest()[:32]
+    return f'throttle:{endpoint}:{scope}:{digest}'
+
+
+def buckets(endpoint, request):
+    """``(cache key, burst, per_minute)`` for each bucket ``request`` draws from."""
+    limits = getattr(settings, 'THROTTLES', {}).get(endpoint, {})
+    for scope, (burst, per_minute) in limits.items():
+        if scope == 'ip':
+            value = request.META.get('REMOTE_ADDR', '')
+        else:
+            value = request.POST.get(scope, '').strip().lower()
+            if not value:
+                continue
+        yield _bucket_key(endpoint, scope, value), burst, per_minute
+
+
+def take(endpoint, request, now=None):
+    """
+    Take a token from each bucket for ``request``.
+
+    Returns 0 if the request may proceed, otherwise the seconds until it
+    could (nothing is taken then).
+    """
+    limits = list(buckets(endpoint, request))
+    if not limits:
+        return 0
+    now = time.time() if now is None else now
+    stored = cache.get_many([key for key, _, _ in limits])
+    updates = {}
+    wait = timeout = 0
+    for key, burst, per_minute in limits:
+        rate = per_minute / 60
+        tokens, updated = stored.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens < 1:
+            wait = max(wait, (1 - tokens) / rate)
+        updates[key] = (tokens - 1, now)
+        # A bucket that has refilled is the same as none, so let it expire then.
+        timeout = max(timeout, math.ceil(burst / rate))
+    if wait:
+        cache.add(REJECTED_KEY.format(endpoint), 0, None)
+        cache.incr(REJECTED_KEY.format(endpoint))
+        return wait
+    cache.set_many(updates, timeout)
+    return 0
+
+
+def rejections():
+    """Requests rejected so far, per throttled endpoint."""
+    endpoints = list(getattr(settings, 'THROTTLES', {}))
+    counts = cache.get_many([REJECTED_KEY.format(endpoint) for endpoint in endpoints])
+    return {endpoint: counts.get(REJECTED_KEY.format(endpoint), 0) for endpoint in endpoints}
@@ -0,0 +1,109 @@
+"""
+Thumbnails for image documents.
+
+A thumbnail is stored next to its original (``<name>.thumb.webp``), so
+documents sharing a content-addressed blob share one thumbnail and
+``prune_blobs`` removes it with the blob. Generation is a background job
+(``core.jobs``) queued with the upload, never run on the request path; until
+the file exists the admin is served a placeholder. ``generate_thumbnails``
+(re)builds them for existing documents.
+
+Pillow is optional: without it no thumbnails are made and the placeholder is
+always shown.
+"""
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+
+from . import jobs
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SUFFIX = '.thumb'
+
+# Image types Pillow cannot open.
+UNSUPPORTED_TYPES = {'image/svg+xml'}
+
+PLACEHOLDER_SVG = (
+    b'<svg xmlns="http://www.w3.org/2000/svg" width="160" height="120" viewBox="0 0 160 120">'
+    b'<rect width="160" height="120" fill="#eee"/>'
+    b'<text x="80" y="64" font-family="sans-serif" font-size="12" fill="#888" text-anchor="middle">'
+    b'Preview pending</text></svg>'
+)
+
+
+def thumbnail_format():
+    return getattr(settings, 'THUMBNAIL_FORMAT', 'WEBP').upper()
+
+
+def thumbnail_name(name):
+    extension = 'jpg' if thumbnail_format() == 'JPEG' else thumbnail_format().lower()
+    # The original extension stays, so a.png and a.jpg get different thumbnails.
+    return f'{name}{THUMBNAIL_SUFFIX}.{extension}'
+
+
+def content_type():
+    return 'image/jpeg' if thumbnail_format() == 'JPEG' else f'image/{thumbnail_format().lower()}'
+
+
+def supports(document):
+    return (
+        bool(document.file)
+        and document.mime_type.startswith('image/')
+        and document.mime_type not in UNSUPPORTED_TYPES
+    )
+
+
+def thumbnail_exists(document):
+    return supports(document) and document.file.storage.exists(thumbnail_name(document.file.name))
+
+
+def generate(storage, name, force=False):
+    """Write the thumbnail for ``name``; returns False when it cannot be made."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return False
+
+    target = thumbnail_name(name)
+    if not force and storage.exists(target):
+        return True
+    size = getattr(settings, 'THUMBNAIL_SIZE', (320, 320))
+    try:
+        with storage.open(name, 'rb') as source, Image.open(source) as image:
+            # Let the JPEG decoder downscale while reading; a 40 MB scan then
+            # never gets fully decoded.
+            image.draft('RGB', size)
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(size)
+            if image.mode not in ('RGB', 'RGBA') or (image.mode == 'RGBA' and thumbnail_format() == 'JPEG'):
+                image = image.convert('RGB')
+            path = storage.path(target)
+            fd, part_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    image.save(out, thumbnail_format(), quality=getattr(settings, 'THUMBNAIL_QUALITY', 80))
+                os.replace(part_path, path)
+            except BaseException:
+                os.remove(part_path)
+                raise
+    except (OSError, Image.DecompressionBombError, SyntaxError, ValueError):
+        logger.warning('Could not generate a thumbnail for %s', name, exc_info=True)
+        return False
+    return True
+
+
+def generate_stored(name):
+    """Job entry point: thumbnail the document file ``name``."""
+    from .models import Document
+
+    # Unreadable images are logged by generate() rather than retried.
+    generate(Document._meta.get_field('file').storage, name)
+
+
+def schedule(document):
+    """Queue thumbnail generation for ``document``."""
+    if supports(document):
+        jobs.enqueue(generate_stored, name=document.file.name, unique=True)
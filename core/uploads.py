@@ -0,0 +1,172 @@
+"""
+Resumable chunked uploads for large case documents.
+
+Protocol (all URLs under the ``document_upload`` admin URL, staff only):
+
+1. ``POST upload/sessions/`` with ``case``, ``title``, ``filename`` and
+   ``size`` opens an ``UploadSession`` and returns its id, the chunk size and
+   the chunk count.
+2. ``PUT upload/sessions/<id>/chunks/<index>/`` with the raw chunk bytes as
+   the body and its hex SHA-256 in ``X-Chunk-SHA256``. Chunks may be sent in
+   any order and in parallel; a chunk whose digest or length does not match is
+   rejected and must be resent.
+3. ``GET upload/sessions/<id>/`` reports the received chunk indexes and the
+   contiguous byte offset acknowledged so far, which is where a client resumes
+   after a dropped connection.
+4. ``POST upload/sessions/<id>/complete/`` assembles the chunks, in one pass,
+   into the content-addressed document storage and creates the ``Document``.
+
+Chunk bodies are read from the request stream straight to disk, so Django
+never holds a whole chunk, let alone the whole file, in memory.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+
+from .models import Document, UploadChunk
+
+READ_SIZE = 64 * 1024
+
+
+class ChunkError(Exception):
+    pass
+
+
+def chunk_dir(session):
+    # Never under MEDIA_ROOT, which may be served publicly.
+    base = getattr(settings, 'CHUNKED_UPLOAD_TEMP_DIR', None) or os.path.join(settings.BASE_DIR, 'var', 'chunks')
+    return os.path.join(base, str(session.pk))
+
+
+def expected_chunk_size(session, index):
+    if index >= session.chunk_count:
+        raise ChunkError(f'Chunk index {index} is out of range (0-{session.chunk_count - 1}).')
+    if index == session.chunk_count - 1:
+        return session.size - session.chunk_size * index
+    return session.chunk_size
+
+
+def store_chunk(session, index, stream, sha256):
+    """Stream one chunk to disk, verifying its length and digest, and record it."""
+    if not sha256:
+        raise ChunkError('X-Chunk-SHA256 header is required.')
+    expected_size = expected_chunk_size(session, index)
+
+    directory = chunk_dir(session)
+    os.makedirs(directory, exist_ok=True)
+    hasher = hashlib.sha256()
+    received = 0
+    fd, part_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while received <= expected_size:
+                data = stream.read(min(READ_SIZE, expected_size + 1 - received))
+                if not data:
+                    break
+                hasher.update(data)
+                out.write(data)
+                received += len(data)
+        if received != expected_size:
+            raise ChunkError(f'Chunk {index} must be {expected_size} bytes, got {received if received <= expected_size else "more"}.')
+        if hasher.hexdigest() != sha256.lower():
+            raise ChunkError(f'Chunk {index} failed checksum verification.')
+        os.replace(part_path, os.path.join(directory, f'{index}.part'))
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    UploadChunk.objects.update_or_create(
+        session=session, index=index,
+        defaults={'size': received, 'sha256': sha256.lower()},
+    )
+
+
+def session_status(session):
+    received = sorted(session.chunks.values_list('index', flat=True))
+    contiguous = 0
+    for expected, index in enumerate(received):
+        if index != expected:
+            break
+        contiguous += 1
+    return {
+        'id': str(session.pk),
+        'size': session.size,
+        'chunk_size': session.chunk_size,
+        'chunk_count': session.chunk_count,
+        'received': received,
+        'offset': min(contiguous * session.chunk_size, session.size),
+        'complete': session.document_id is not None,
+        'document_id': session.document_id,
+    }
+
+
+class _ChunkReader:
+    """Read-only file object presenting the chunk files as one stream."""
+
+    def __init__(self, paths, size):
+        self._paths = iter(paths)
+        self._current = None
+        self.size = size
+
+    def read(self, size=-1):
+        while True:
+            if self._current is None:
+                path = next(self._paths, None)
+                if path is None:
+                    return b''
+                self._current = open(path, 'rb')
+            data = self._current.read(size)
+            if data:
+                return data
+            self._current.close()
+            self._current = None
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+
+def assemble(session):
+    """Join the chunks into a Document. Idempotent once completed."""
+    if session.document_id:
+        return session.document
+    received = set(session.chunks.values_list('index', flat=True))
+    missing = [index for index in range(session.chunk_count) if index not in received]
+    if missing:
+        raise ChunkError(f'Missing chunks: {missing[:20]}')
+
+    directory = chunk_dir(session)
+    reader = _ChunkReader(
+        [os.path.join(directory, f'{index}.part') for index in range(session.chunk_count)],
+        session.size,
+    )
+    try:
+        with transaction.atomic():
+            document = Document(title=session.title, case=session.case)
+            document.file = File(reader, name=session.filename)
+            document.save()
+            # Claim the session only if a concurrent complete has not already;
+            # the loser rolls its Document back and returns the winner's.
+            claimed = type(session).objects.filter(pk=session.pk, document__isnull=True).update(document=document)
+            if not claimed:
+                transaction.set_rollback(True)
+    finally:
+        reader.close()
+    if not claimed:
+        session.refresh_from_db(fields=['document'])
+        return session.document
+    session.document = document
+    discard_chunks(session)
+    return document
+
+
+def discard_chunks(session):
+    shutil.rmtree(chunk_dir(session), ignore_errors=True)
+    session.chunks.all().delete()
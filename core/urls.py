@@ -1,21 +1,29 @@
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import async_views, views
+
+# Read-heavy pages get their async versions on ASGI deployments.
+read_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     # Authentication URLs
     path('register/', views.register, name='register'),
     path('profile/', views.ClientProfileView.as_view(), name='profile'),
+    path('activate/<uidb64>/<token>/', views.ClientActivationView.as_view(), name='activate_account'),
     path('logout/', auth_views.LogoutView.as_view(next_page='login'), name='logout'),
     
     # Application URLs
     path('', views.landing_page, name='landing_page'),
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/', read_views.dashboard, name='dashboard'),
     path('clients/add/', views.client_create, name='client_create'),
     path('cases/add/', views.case_create, name='case_create'),
     path('client/<int:pk>/', views.client_detail, name='client_detail'),
     path('client/<int:pk>/edit/', views.client_update, name='client_update'),
-    path('case/<int:pk>/', views.case_detail, name='case_detail'),
+    path('case/<int:pk>/', read_views.case_detail, name='case_detail'),
     path('case/<int:pk>/edit/', views.case_update, name='case_update'),
+    path('documents/<int:pk>/', read_views.document_download, name='document_download'),
     path('book-appointment/', views.book_appointment, name='book_appointment'),
+    path('calendar/', views.calendar_feeds, name='calendar_feeds'),
+    path('calendar/<str:token>/<slug:feed>.ics', views.calendar_feed, name='calendar_feed'),
 ]
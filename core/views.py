@@ -1,19 +1,29 @@
+from django.conf import settings
 from django.contrib import messages
+from django.http import Http404
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, logout, authenticate
 from django.db import transaction
 from django.db.models import Q
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.views import PasswordResetConfirmView
 from django.views.generic import UpdateView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.utils.functional import SimpleLazyObject
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.contrib.auth.password_validation import validate_password
 
-from .models import Client, Case, Document, Visitor
+from .models import Client, Case, Document, Visitor, Appointment, CalendarToken
 from .forms import ClientRegistrationForm, ClientProfileForm, CaseForm, DocumentForm, VisitorForm, AppointmentForm
+from . import availability, ical, inquiries, objectcache
+from .accounts import activation_token_generator, send_activation_email
 from .decorators import group_required
+from .downloads import serve_document
+from .pagination import KeysetPage, keyset_paginate
+from .principal import get_principal
+from .search import search_cases, search_clients, search_documents
 
 def landing_page(request):
     if request.user.is_authenticated:
@@ -22,7 +32,7 @@ def landing_page(request):
     if request.method == 'POST':
         form = VisitorForm(request.POST)
         if form.is_valid():
-            form.save()
+            inquiries.submit(form.cleaned_data)
             messages.success(request, 'Your message has been sent successfully! We will get back to you shortly.')
             return redirect('landing_page')
     else:
@@ -101,40 +111,83 @@ class ClientProfileView(LoginRequiredMixin, UpdateView):
         messages.success(self.request, 'Profile updated successfully!')
         return super().form_valid(form)
 
-def dashboard(request):
+class ClientActivationView(PasswordResetConfirmView):
+    """Let a staff-provisioned client redeem their activation token and set a password."""
+    token_generator = activation_token_generator
+    reset_url_token = 'set-password'
+    template_name = 'registration/activate.html'
+    success_url = reverse_lazy('login')
+
+    def form_valid(self, form):
+        messages.success(self.request, 'Your password has been set. You can now log in.')
+        return super().form_valid(form)
+
+CASE_ORDERING = ('-opened_on', '-id')
+CLIENT_ORDERING = ('name', 'id')
+
+def _dashboard_panel(queryset, ordering, cursor, ranked=False):
+    per_page = settings.DASHBOARD_PAGE_SIZE
+    if ranked:
+        # Search hits are ordered by relevance, which has no seekable key.
+        if not queryset.ordered:
+            queryset = queryset.order_by(*ordering)
+        return KeysetPage(list(queryset[:per_page]))
+    return keyset_paginate(queryset, ordering, cursor, per_page)
+
+def _more_query(request, param, page):
+    if not page.has_next:
+        return ''
+    params = request.GET.copy()
+    params[param] = page.next_cursor
+    return params.urlencode()
+
+def dashboard_loaders(request, principal):
+    """
+    The independent queries behind the dashboard, as ``name: callable`` pairs.
+
+    ``dashboard`` calls them in turn; the async view runs them concurrently.
+    """
     query = request.GET.get('q')
+    loaders = {'appointments': list, 'documents': list}
     # If user is admin or lawyer, show all cases/clients
-    if request.user.is_superuser or request.user.groups.filter(name__in=['Admin', 'Lawyer']).exists():
-        cases = Case.objects.order_by('-opened_on')
-        clients = Client.objects.order_by('name')
+    if principal.is_staff_role:
+        cases = Case.objects.select_related('client')
+        clients = Client.objects.all()
         if query:
-            cases = cases.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query) |
-                Q(client__name__icontains=query)
-            ).distinct()
-            clients = clients.filter(
-                Q(name__icontains=query) |
-                Q(email__icontains=query)
-            ).distinct()
-    else:
+            cases = search_cases(cases, query)
+            clients = search_clients(clients, query)
+            loaders['documents'] = lambda: search_documents(
+                Document.objects.select_related('case'), query, limit=settings.DASHBOARD_PAGE_SIZE,
+            )
+    elif principal.is_client:
         # If user is a client, only show their own cases and profile
-        try:
-            client = request.user.client_profile
-            cases = Case.objects.filter(client=client).order_by('-opened_on')
-            clients = Client.objects.filter(pk=client.pk)
-            if query:
-                cases = cases.filter(
-                    Q(title__icontains=query) |
-                    Q(description__icontains=query)
-                ).distinct()
-        except Client.DoesNotExist:
-            cases = Case.objects.none()
-            clients = Client.objects.none()
-    context = {
-        'cases': cases,
-        'clients': clients,
+        cases = Case.objects.select_related('client').filter(client_id=principal.client_id)
+        clients = Client.objects.filter(pk=principal.client_id)
+        if query:
+            cases = search_cases(cases, query, client_id=principal.client_id)
+        loaders['appointments'] = lambda: list(Appointment.objects.filter(client_id=principal.client_id))
+    else:
+        cases = Case.objects.none()
+        clients = Client.objects.none()
+    loaders['cases'] = lambda: _dashboard_panel(cases, CASE_ORDERING, request.GET.get('cases_after'), ranked=bool(query))
+    loaders['clients'] = lambda: _dashboard_panel(clients, CLIENT_ORDERING, request.GET.get('clients_after'), ranked=bool(query))
+    return loaders
+
+def lazy_loaders(loaders):
+    """Defer each loader until the template uses its result, which a cached fragment never does."""
+    return {name: SimpleLazyObject(load) for name, load in loaders.items()}
+
+def dashboard_context(request, data):
+    return {
+        **data,
+        'more_cases_query': SimpleLazyObject(lambda: _more_query(request, 'cases_after', data['cases'])),
+        'more_clients_query': SimpleLazyObject(lambda: _more_query(request, 'clients_after', data['clients'])),
     }
+
+def dashboard(request):
+    principal = get_principal(request.user)
+    data = lazy_loaders(dashboard_loaders(request, principal))
+    context = dashboard_context(request, data)
     return render(request, 'dashboard.html', context)
 
 @login_required
@@ -146,6 +199,8 @@ def client_create(request):
             try:
                 client = form.save()
                 messages.success(request, f'Client "{client.name}" has been created successfully.')
+                if send_activation_email(request, client.user):
+                    messages.info(request, f'An activation link is being emailed to {client.email}.')
                 return redirect('dashboard')
             except Exception as e:
                 if 'email' in str(e):
@@ -169,19 +224,29 @@ def case_create(request):
         form = CaseForm()
     return render(request, 'form_template.html', {'form': form, 'title': 'Add New Case'})
 
+def can_view_case(principal, case):
+    """Admins and lawyers see every case; a client only their own."""
+    return principal.is_staff_role or (principal.is_client and case.client_id == principal.client_id)
+
+def case_documents(case_id, document_query=''):
+    if document_query:
+        return search_documents(Document.objects.all(), document_query, case_id=case_id)
+    return list(Document.objects.filter(case_id=case_id))
+
 @login_required
 def case_detail(request, pk):
-    case = get_object_or_404(Case, pk=pk)
-    # Only allow access if admin/lawyer or the client owns the case
-    if not (request.user.is_superuser or request.user.groups.filter(name__in=['Admin', 'Lawyer']).exists() or (hasattr(request.user, 'client_profile') and case.client == request.user.client_profile)):
+    case = objectcache.get_case_or_404(pk)
+    principal = get_principal(request.user)
+    if not can_view_case(principal, case):
         messages.error(request, 'You do not have permission to view this case.')
         return redirect('dashboard')
-    documents = Document.objects.filter(case=case)
+    document_query = request.GET.get('q', '').strip()
+    documents = SimpleLazyObject(lambda: case_documents(case.pk, document_query))
     form = DocumentForm() # Initialize form for GET request
 
     if request.method == 'POST':
         # Ensure only authorized users can upload
-        if request.user.is_superuser or request.user.groups.filter(name__in=['Admin', 'Lawyer']).exists():
+        if principal.is_staff_role:
             form = DocumentForm(request.POST, request.FILES)
             if form.is_valid():
                 document = form.save(commit=False)
@@ -193,15 +258,66 @@ def case_detail(request, pk):
     context = {
         'case': case,
         'documents': documents,
+        'document_query': document_query,
         'form': form,
     }
     return render(request, 'case_detail.html', context)
 
+@login_required
+def document_download(request, pk):
+    document = get_object_or_404(Document.objects.select_related('case'), pk=pk)
+    if not document.file or not can_view_case(get_principal(request.user), document.case):
+        raise Http404
+    return serve_document(request, document, as_attachment='download' in request.GET)
+
+@login_required
+def calendar_feeds(request):
+    principal = get_principal(request.user)
+    if request.method == 'POST':
+        ical.reset_token(request.user)
+        messages.success(request, 'Your calendar links have been replaced. Subscribe again with the new ones.')
+        return redirect('calendar_feeds')
+    token = ical.token_for(request.user)
+    feeds = [feed for feed in ical.FEEDS if ical.feed_querysets(feed, request.user, principal) is not None]
+    urls = [(feed, request.build_absolute_uri(reverse('calendar_feed', args=[token, feed]))) for feed in feeds]
+    return render(request, 'calendar_feeds.html', {'feeds': urls})
+
+def calendar_feed(request, token, feed):
+    """The .ics feed named ``feed``; the secret token authenticates instead of a session."""
+    from django.http import StreamingHttpResponse
+    from django.utils.cache import get_conditional_response
+    from django.utils.http import http_date
+
+    calendar_token = CalendarToken.objects.select_related('user').filter(token=token, user__is_active=True).first()
+    if calendar_token is None:
+        raise Http404
+    user = calendar_token.user
+    querysets = ical.feed_querysets(feed, user, get_principal(user))
+    if querysets is None:
+        raise Http404
+    etag, last_modified = ical.feed_state(*querysets)
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        name = f"{user.get_full_name() or user.username}: {feed}" if feed != 'firm' else 'Law firm calendar'
+        response = StreamingHttpResponse(
+            ical.serialize(name, *querysets, domain=request.get_host().split(':')[0]),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'inline; filename="{feed}.ics"'
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # Clients must revalidate, but may keep the copy for the 304s.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 @login_required
 def client_detail(request, pk):
-    client = get_object_or_404(Client, pk=pk)
+    client = objectcache.get_client_or_404(pk)
+    principal = get_principal(request.user)
     # Only allow access if admin/lawyer or the client is viewing their own profile
-    if not (request.user.is_superuser or request.user.groups.filter(name__in=['Admin', 'Lawyer']).exists() or (hasattr(request.user, 'client_profile') and request.user.client_profile.pk == client.pk)):
+    if not (principal.is_staff_role or principal.client_id == client.pk):
         messages.error(request, 'You do not have permission to view this client.')
         return redirect('dashboard')
     cases = Case.objects.filter(client=client)
@@ -214,7 +330,7 @@ def client_detail(request, pk):
 @login_required
 @group_required('Admin', 'Lawyer')
 def client_update(request, pk):
-    client = get_object_or_404(Client, pk=pk)
+    client = objectcache.get_client_or_404(pk)
     if request.method == 'POST':
         form = ClientProfileForm(request.POST, instance=client)
         if form.is_valid():
@@ -228,7 +344,7 @@ def client_update(request, pk):
 @login_required
 @group_required('Admin', 'Lawyer')
 def case_update(request, pk):
-    case = get_object_or_404(Case, pk=pk)
+    case = objectcache.get_case_or_404(pk)
     if request.method == 'POST':
         form = CaseForm(request.POST, instance=case)
         if form.is_valid():
@@ -242,17 +358,33 @@ def case_update(request, pk):
 @login_required
 def book_appointment(request):
     # Only allow clients to book appointments
-    if not hasattr(request.user, 'client_profile'):
+    principal = get_principal(request.user)
+    if not principal.is_client:
         messages.error(request, 'Only clients can book appointments.')
         return redirect('dashboard')
     if request.method == 'POST':
         form = AppointmentForm(request.POST)
         if form.is_valid():
-            appointment = form.save(commit=False)
-            appointment.client = request.user.client_profile
-            appointment.save()
-            messages.success(request, 'Your appointment has been booked!')
-            return redirect('dashboard')
+            lawyer = form.cleaned_data.get('lawyer')
+            try:
+                availability.book(
+                    principal.client_id,
+                    form.cleaned_data['date'],
+                    form.cleaned_data['time'],
+                    lawyer_id=lawyer.pk if lawyer else None,
+                    message=form.cleaned_data['message'],
+                )
+            except availability.SlotUnavailable as exc:
+                form.add_error('time', str(exc))
+            else:
+                messages.success(request, 'Your appointment has been booked!')
+                return redirect('dashboard')
     else:
-        form = AppointmentForm()
-    return render(request, 'book_appointment.html', {'form': form})
+        # Picking one of the offered slots pre-fills the form.
+        form = AppointmentForm(initial={key: request.GET[key] for key in ('date', 'time', 'lawyer') if key in request.GET})
+    lawyer_id = request.POST.get('lawyer') or request.GET.get('lawyer')
+    slots = availability.free_slots(
+        lawyer_id=int(lawyer_id) if lawyer_id and lawyer_id.isdigit() else None,
+        limit=settings.APPOINTMENT_SLOTS_SHOWN,
+    )
+    return render(request, 'book_appointment.html', {'form': form, 'slots': slots})
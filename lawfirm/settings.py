@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,11 +42,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ThrottleMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.PrincipalMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,6 +67,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.principal',
             ],
         },
     },
@@ -82,6 +87,35 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# Cached principals, fragment and object-cache stamps and throttle buckets
+# must be seen by every process: web workers, run_workers and management
+# commands, and throttling needs atomic add/incr. Production sets REDIS_URL
+# (`manage.py check --deploy` warns otherwise, core.W002). Without it the
+# database cache is used, which is shared but slower; create its table with
+# `manage.py createcachetable`. A per-process backend such as LocMemCache
+# fails the core.E001 system check.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'core_cache',
+        }
+    }
+
+# The test suite gets a throwaway cache per run, outside the database
+TEST_RUNNER = 'core.test_runner.IsolatedCacheRunner'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -130,3 +164,148 @@ MEDIA_ROOT = BASE_DIR / 'media'
 AUTH_USER_MODEL = 'core.User'
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/'
+
+# Seconds a resolved principal (groups + client id) stays in the cache
+PRINCIPAL_CACHE_TIMEOUT = 300
+
+# Dashboard full-text search (SQLite FTS5); at most this many ranked hits per panel
+SEARCH_RESULT_LIMIT = 200
+
+# Characters of extracted text kept per document file (core.extraction)
+DOCUMENT_TEXT_MAX_CHARS = 1_000_000
+
+# Rows per dashboard panel page (keyset paginated)
+DASHBOARD_PAGE_SIZE = 5
+
+# Maximum SQL queries per GET/HEAD request, keyed by resolved URL name; writes
+# such as uploads posted to case_detail are not budgeted. Requests over
+# budget are logged by core.middleware.QueryBudgetMiddleware and the same
+# numbers are enforced by core/tests/test_query_budgets.py. Views with a
+# document search (?q=) include its full-text match and the matched rows.
+QUERY_BUDGETS = {
+    'dashboard': 6,
+    'case_detail': 7,
+    'client_detail': 6,
+    'admin:core_client_changelist': 8,
+    'admin:core_case_changelist': 10,
+    'admin:core_document_changelist': 10,
+    'admin:core_appointment_changelist': 7,
+    'admin:core_visitor_changelist': 8,
+    'admin:core_user_changelist': 7,
+}
+
+# Email (console in development; configure SMTP for production)
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'no-reply@lawfirm.local'
+
+# Absolute base URL for links in emails sent outside a request, such as the
+# activation links of clients created by `manage.py import_clients`
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000/')
+
+# Lifetime of password reset and client activation links, in seconds
+PASSWORD_RESET_TIMEOUT = 60 * 60 * 24 * 3
+
+# Uploads too large for memory are hashed while they are spooled, so the
+# content-addressed storage does not read them again (core.storage)
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'core.storage.HashingUploadHandler',
+]
+
+# Resumable chunked document uploads (core.uploads)
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_SIZE = 10 * 1024 ** 3
+# Where chunks wait for assembly; keep it outside MEDIA_ROOT, which may be
+# served publicly
+CHUNKED_UPLOAD_TEMP_DIR = BASE_DIR / 'var' / 'chunks'
+
+# Image document thumbnails (core.thumbnails; requires Pillow)
+THUMBNAIL_SIZE = (320, 320)
+THUMBNAIL_FORMAT = 'WEBP'
+THUMBNAIL_QUALITY = 80
+
+# How document bytes leave the server once core.views.document_download has
+# checked access: None streams them from Django, 'x-accel-redirect' hands the
+# transfer to nginx and 'x-sendfile' to Apache (mod_xsendfile) or lighttpd
+DOCUMENT_SENDFILE = None
+# nginx `internal` location aliased to MEDIA_ROOT, for X-Accel-Redirect
+DOCUMENT_SENDFILE_PREFIX = '/protected-media/'
+
+# Database job queue (core.jobs, run by `manage.py run_workers`)
+JOBS_WORKERS = 2
+JOBS_POLL_INTERVAL = 1.0
+JOBS_MAX_ATTEMPTS = 5
+# Retry delay in seconds: JOBS_RETRY_BACKOFF * 2**(attempt - 1), capped, plus jitter
+JOBS_RETRY_BACKOFF = 30
+JOBS_RETRY_BACKOFF_MAX = 60 * 60
+# A running job whose lock has not been refreshed for this long is assumed
+# lost and requeued
+JOBS_LOCK_TIMEOUT = 10 * 60
+# How often a worker refreshes the lock of the job it is running; keep it
+# well under JOBS_LOCK_TIMEOUT
+JOBS_HEARTBEAT_INTERVAL = 60
+# How long finished jobs are kept, in seconds
+JOBS_KEEP_DONE = 60 * 60 * 24
+# Run jobs in-process after commit instead of queueing them (development)
+JOBS_EAGER = False
+
+# Route the read-heavy pages to core.async_views (enable when serving via
+# lawfirm.asgi; under WSGI every async view pays for its own event loop)
+ASYNC_VIEWS = False
+# Threads async views use to run independent queries concurrently; 0 runs them
+# one at a time on Django's thread-sensitive executor
+ASYNC_DB_THREADS = 4
+# Threads for blocking storage I/O from async views
+ASYNC_IO_THREADS = 8
+
+# Appointment booking (core.availability). Office hours per weekday
+# (0 = Monday) as 'HH:MM' in TIME_ZONE; days not listed are closed
+OFFICE_HOURS = {weekday: ('09:00', '17:00') for weekday in range(5)}
+# Length of one bookable slot in minutes; slots are aligned to midnight
+APPOINTMENT_SLOT_MINUTES = 30
+# How far ahead clients can book, in days
+APPOINTMENT_BOOKING_DAYS = 60
+# Free slots offered on the booking page
+APPOINTMENT_SLOTS_SHOWN = 12
+
+# How many days of past appointments and due dates the .ics feeds (core.ical) keep
+CALENDAR_FEED_PAST_DAYS = 90
+
+# Reminder windows for send_reminders (core.reminders): lawyers hear about
+# open cases due within this many days, clients and lawyers about
+# appointments starting within this many hours
+REMINDER_CASE_DAYS = 3
+REMINDER_APPOINTMENT_HOURS = 24
+
+# Lifetime of cached template fragments ({% fragment %}, core.fragments); they
+# are retired by version stamps on change, this only bounds superseded entries
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Client and Case rows kept per process by the read-through object cache
+# (core.objectcache); least recently used rows are dropped beyond this
+OBJECT_CACHE_SIZE = 2000
+
+# Token buckets for anonymous POSTs (core.throttle): URL name -> bucket ->
+# (burst, refills per minute). 'ip' is the client address, other buckets
+# are keyed on that POST field. Buckets and rejection counts live in the
+# shared default cache, so the limits hold across all workers and
+# `manage.py throttle_stats` sees every rejection.
+THROTTLES = {
+    'landing_page': {'ip': (5, 2)},
+    'login': {'ip': (20, 10), 'username': (10, 5)},
+    'admin:login': {'ip': (20, 10), 'username': (10, 5)},
+    'register': {'ip': (10, 2), 'email': (3, 1)},
+}
+
+# Landing-page inquiries are saved in their request. Set a directory, such
+# as BASE_DIR / 'var' / 'visitor_spool', to append them there instead and
+# insert them in batches (core.inquiries). That requires running
+# `manage.py flush_visitor_spool --loop` on every web host; without it
+# inquiries never reach the database
+VISITOR_SPOOL_DIR = None
+# The flusher inserts the spool this many seconds after its last flush, or
+# sooner once it holds this many bytes
+VISITOR_SPOOL_INTERVAL = 2
+VISITOR_SPOOL_MAX_BYTES = 256 * 1024
+# Rows per bulk_create
+VISITOR_SPOOL_BATCH_SIZE = 500
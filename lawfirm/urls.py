@@ -25,5 +25,6 @@ urlpatterns = [
     path('', include('core.urls')), 
 ]
 
+# Development only; documents themselves go through core.views.document_download.
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)